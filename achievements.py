@@ -0,0 +1,168 @@
+"""
+LGS Puan Hesaplama Sistemi - Rule-driven achievement engine
+"""
+
+from collections import namedtuple
+from itertools import groupby
+
+import sqlalchemy as sa
+
+from scoring import SUBJECTS, MAX_QUESTIONS
+from study_stats import next_streak, study_day
+
+# check(row, context) is called for rows of its event: 'score' rows get a ScoreContext,
+# 'study_session' rows a StudyContext and 'mock_exam' rows None
+Rule = namedtuple('Rule', ['type', 'event', 'title', 'description', 'badge_icon', 'check'])
+
+# The user's score count including this score, and the score before it (None for the first)
+ScoreContext = namedtuple('ScoreContext', ['count', 'previous_score'])
+
+# The user's consecutive study days up to and including this session's day
+StudyContext = namedtuple('StudyContext', ['streak'])
+
+
+def _full_marks(score):
+    return any((getattr(score, f'{subject}_dogru') or 0) == MAX_QUESTIONS[subject]
+               and not getattr(score, f'{subject}_yanlis') for subject in SUBJECTS)
+
+
+# A rule's bit is its position in this list: only append, never reorder or remove
+RULES = [
+    Rule('first_score', 'score', 'İlk Adım', 'İlk puan hesaplamanızı yaptınız!', 'fas fa-flag',
+         lambda score, context: True),
+    Rule('good_score', 'score', 'İyi Puan', '400+ puan aldınız! Çok iyi gidiyorsunuz!', 'fas fa-medal',
+         lambda score, context: score.total_score >= 400),
+    Rule('high_score', 'score', 'Yüksek Puan Ustası', '450+ puan aldınız! Harika bir başarı!', 'fas fa-trophy',
+         lambda score, context: score.total_score >= 450),
+    Rule('improvement', 'score', 'Gelişim', 'Puanınızı artırdınız!', 'fas fa-chart-line',
+         lambda score, context: context.previous_score is not None and score.total_score > context.previous_score),
+    Rule('ten_scores', 'score', 'Azimli', '10 kez puan hesapladınız!', 'fas fa-redo',
+         lambda score, context: context.count >= 10),
+    Rule('full_marks', 'score', 'Tam İsabet', 'Bir dersin tüm sorularını yanlışsız çözdünüz!', 'fas fa-bullseye',
+         lambda score, context: _full_marks(score)),
+    Rule('first_mock_exam', 'mock_exam', 'İlk Deneme', 'İlk deneme sınavınızı kaydettiniz!', 'fas fa-clipboard-check',
+         lambda exam, context: True),
+    Rule('mock_master', 'mock_exam', 'Deneme Ustası', '80+ doğru cevap! Mükemmel performans!', 'fas fa-star',
+         lambda exam, context: exam.correct_answers >= 80),
+    Rule('no_empty', 'mock_exam', 'Boş Yok', 'Deneme sınavında hiç boş bırakmadınız!', 'fas fa-check-double',
+         lambda exam, context: exam.empty_answers == 0 and exam.correct_answers + exam.wrong_answers > 0),
+    Rule('first_study', 'study_session', 'Çalışmaya Başladın', 'İlk çalışma seansınızı kaydettiniz!', 'fas fa-book-open',
+         lambda study, context: True),
+    Rule('study_marathon', 'study_session', 'Maraton', 'Tek seansta 2 saat çalıştınız!', 'fas fa-hourglass-half',
+         lambda study, context: (study.duration_minutes or 0) >= 120),
+    Rule('study_streak', 'study_session', 'Kararlılık', '5 gün üst üste çalıştınız!', 'fas fa-fire',
+         lambda study, context: context.streak >= 5),
+]
+
+RULE_BITS = {rule.type: 1 << index for index, rule in enumerate(RULES)}
+EVENT_RULES = {
+    event: [(RULE_BITS[rule.type], rule) for rule in RULES if rule.event == event]
+    for event in ('score', 'mock_exam', 'study_session')
+}
+# Earning every rule of an event sets all of these bits; such rows are skipped without evaluating anything
+EVENT_MASKS = {event: sum(bit for bit, _ in rules) for event, rules in EVENT_RULES.items()}
+
+# Columns a streaming backfill reads from each table
+BACKFILL_COLUMNS = {
+    'score': ['total_score'] + [f'{subject}_{kind}' for subject in SUBJECTS for kind in ('dogru', 'yanlis')],
+    'mock_exam': ['correct_answers', 'wrong_answers', 'empty_answers'],
+    'study_session': ['duration_minutes'],
+}
+
+
+def evaluate(event, row, context, earned):
+    """Bits of every rule of event that row satisfies and earned does not have yet"""
+    new = 0
+    if earned & EVENT_MASKS[event] == EVENT_MASKS[event]:
+        return new
+    for bit, rule in EVENT_RULES[event]:
+        if not earned & bit and rule.check(row, context):
+            new |= bit
+    return new
+
+
+def badge_rows(user_id, mask, earned_at=None):
+    """Achievement insert parameters for each rule bit set in mask"""
+    rows = []
+    for rule in RULES:
+        if mask & RULE_BITS[rule.type]:
+            row = {'user_id': user_id, 'achievement_type': rule.type, 'title': rule.title,
+                   'description': rule.description, 'badge_icon': rule.badge_icon}
+            if earned_at is not None:
+                row['earned_at'] = earned_at
+            rows.append(row)
+    return rows
+
+
+def load_masks(connection, achievement_table, user_ids=None):
+    """{user_id: earned bitset} from the achievement table, for user_ids or everyone"""
+    query = sa.select(achievement_table.c.user_id, achievement_table.c.achievement_type)
+    if user_ids is not None:
+        query = query.where(achievement_table.c.user_id.in_(list(user_ids)))
+    masks = {}
+    for user_id, achievement_type in connection.execute(query):
+        masks[user_id] = masks.get(user_id, 0) | RULE_BITS.get(achievement_type, 0)
+    return masks
+
+
+def insert_badges(connection, achievement_table, rows):
+    """Insert badge rows in one statement; a badge another worker already inserted is skipped"""
+    if not rows:
+        return
+    if connection.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    connection.execute(insert(achievement_table).on_conflict_do_nothing(), rows)
+
+
+def backfill(connection, tables, achievement_table, batch_size=5000, utc_offset=0):
+    """Award every badge the stored history has earned, in one streaming pass per table
+
+    tables maps 'score', 'mock_exam' and 'study_session' to their tables. Rows
+    are read in (user_id, created_at) order, yield_per batch_size rows at a
+    time; a badge's earned_at is the created_at of the row that earned it.
+    Study streaks count local days utc_offset hours ahead of UTC.
+    Returns {achievement_type: badges inserted}.
+    """
+    masks = load_masks(connection, achievement_table)
+    awarded = {rule.type: 0 for rule in RULES}
+    pending = []
+
+    def flush():
+        insert_badges(connection, achievement_table, pending)
+        pending.clear()
+
+    for event, table in tables.items():
+        columns = [table.c.user_id, table.c.created_at] + [table.c[name] for name in BACKFILL_COLUMNS[event]]
+        rows = connection.execute(
+            sa.select(*columns).order_by(table.c.user_id, table.c.created_at, table.c.id)
+            .execution_options(yield_per=batch_size)
+        )
+        for user_id, user_rows in groupby(rows, key=lambda row: row.user_id):
+            earned = masks.get(user_id, 0)
+            count, previous_score = 0, None
+            streak, last_day = 0, None
+            for row in user_rows:
+                if earned & EVENT_MASKS[event] == EVENT_MASKS[event]:
+                    break
+                context = None
+                if event == 'score':
+                    count += 1
+                    context = ScoreContext(count, previous_score)
+                    previous_score = row.total_score
+                elif event == 'study_session':
+                    day = study_day(row.created_at, utc_offset)
+                    streak, last_day = next_streak(streak, last_day, day), day
+                    context = StudyContext(streak)
+                new = evaluate(event, row, context, earned)
+                if new:
+                    earned |= new
+                    for badge in badge_rows(user_id, new, row.created_at):
+                        awarded[badge['achievement_type']] += 1
+                        pending.append(badge)
+            masks[user_id] = earned
+            if len(pending) >= batch_size:
+                flush()
+    flush()
+    return awarded
@@ -0,0 +1,344 @@
+"""
+LGS Puan Hesaplama Sistemi - OpenRouter chat completion client
+"""
+
+import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+def extract_content(result):
+    """Return the completion text from a chat-completions response, or None"""
+    if 'choices' in result and len(result['choices']) > 0:
+        return result['choices'][0]['message']['content']
+    return None
+
+
+def completion_payload(model, prompt, stream=False):
+    data = {
+        "model": model,
+        "messages": [
+            {"role": "user", "content": prompt}
+        ],
+        "max_tokens": 800,
+        "temperature": 0.7
+    }
+    if stream:
+        data["stream"] = True
+    return data
+
+
+def set_read_timeout(response, seconds):
+    """Change the read timeout of a streaming response that is already being read"""
+    sock = getattr(getattr(response.raw, 'connection', None), 'sock', None)
+    if sock is not None:
+        sock.settimeout(seconds)
+
+
+class CompletionStream:
+    """Completion text chunks from stream_completion; complete tells whether the answer arrived in full"""
+
+    def __init__(self, chunks):
+        self.complete = False
+        self._chunks = chunks
+
+    def __iter__(self):
+        return self._chunks(self)
+
+
+class BreakerOpen(RuntimeError):
+    """A model's breaker turned the request away when it was about to be sent"""
+
+
+class CircuitBreaker:
+    """Per-model breaker: opens after consecutive failures, probes again after a cool-down
+
+    closed    - requests flow normally
+    open      - requests are skipped until cooldown seconds have passed
+    half_open - a single probe request is let through; its outcome closes or reopens
+
+    allow() takes the probe, so it is only called right before a request is
+    sent; ready() answers the same question without taking it.
+    """
+
+    def __init__(self, failure_threshold=3, cooldown=300):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = 'closed'
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    def ready(self):
+        with self.lock:
+            return self.state == 'closed' or (self.state == 'open' and time.monotonic() - self.opened_at >= self.cooldown)
+
+    def allow(self):
+        with self.lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = 'half_open'
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.state = 'closed'
+            self.consecutive_failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self.lock:
+            self.consecutive_failures += 1
+            if self.state == 'half_open' or self.consecutive_failures >= self.failure_threshold:
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+
+
+class ModelStats:
+    """Request counters and recent latencies for one model, updated from hedging threads"""
+
+    def __init__(self, window=200):
+        self.requests = 0
+        self.successes = 0
+        self.failures = 0
+        self.skipped = 0
+        self.latencies = deque(maxlen=window)
+        self.lock = threading.Lock()
+
+    def record_skip(self):
+        with self.lock:
+            self.skipped += 1
+
+    def record_success(self, latency):
+        with self.lock:
+            self.requests += 1
+            self.successes += 1
+            self.latencies.append(latency)
+
+    def record_failure(self):
+        with self.lock:
+            self.requests += 1
+            self.failures += 1
+
+    def snapshot(self):
+        with self.lock:
+            counts = (self.requests, self.successes, self.failures, self.skipped)
+            latencies = sorted(self.latencies)
+        return {
+            'requests': counts[0],
+            'successes': counts[1],
+            'failures': counts[2],
+            'skipped': counts[3],
+            'latency_p50': round(latencies[len(latencies) // 2], 3) if latencies else None,
+            'latency_p95': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3) if latencies else None
+        }
+
+
+class OpenRouterClient:
+    """Chat-completions client with a keep-alive connection pool and per-model circuit breakers"""
+
+    def __init__(self, base_url, headers, pool_size=16, failure_threshold=3, cooldown=300):
+        self.url = f"{base_url}/chat/completions"
+        self.session = requests.Session()
+        self.session.headers.update(headers)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        # Hedged requests run here; bounded like the connection pool
+        self.executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix='openrouter')
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.breakers = {}
+        self.stats = {}
+        self.lock = threading.Lock()
+
+    def _model(self, model):
+        with self.lock:
+            if model not in self.breakers:
+                self.breakers[model] = CircuitBreaker(self.failure_threshold, self.cooldown)
+                self.stats[model] = ModelStats()
+            return self.breakers[model], self.stats[model]
+
+    def available_models(self, models):
+        """Models whose breaker would let a request through right now (no half-open probe is taken)"""
+        available = []
+        for model in models:
+            breaker, stats = self._model(model)
+            if breaker.ready():
+                available.append(model)
+            else:
+                stats.record_skip()
+        return available
+
+    def _allow(self, model):
+        """Pass the model's breaker right before a request is sent; every True is followed by a _record"""
+        breaker, stats = self._model(model)
+        if breaker.allow():
+            return True
+        stats.record_skip()
+        return False
+
+    def _record(self, model, started, error=None):
+        breaker, stats = self._model(model)
+        if error is None:
+            stats.record_success(time.monotonic() - started)
+            breaker.record_success()
+        else:
+            stats.record_failure()
+            breaker.record_failure()
+            print(f"Error with model {model}: {str(error)}")
+
+    def complete(self, model, prompt, timeout):
+        """Ask a single model for a completion; raises on HTTP or payload errors"""
+        started = time.monotonic()
+        try:
+            response = self.session.post(self.url, json=completion_payload(model, prompt), timeout=timeout)
+            if response.status_code != 200:
+                raise RuntimeError(f"status {response.status_code}")
+            content = extract_content(response.json())
+            if content is None:
+                raise RuntimeError("empty choices")
+        except Exception as model_error:
+            self._record(model, started, model_error)
+            raise
+        self._record(model, started)
+        return content
+
+    def _guarded_complete(self, model, prompt, timeout):
+        # Checked when the pool runs the request, so a queued request cancelled at the deadline never takes a probe
+        if not self._allow(model):
+            raise BreakerOpen(model)
+        return self.complete(model, prompt, timeout)
+
+    def hedged_completion(self, models, prompt, hedge_delay=2.0, deadline=20.0):
+        """Race the models with hedged requests and return the first valid completion
+
+        The first healthy model starts immediately; each further model starts when
+        the previous ones have not answered within hedge_delay, or as soon as one
+        of them fails. Returns None once every model failed or the deadline passed;
+        requests still in flight are abandoned and end at their own timeout.
+        """
+        start = time.monotonic()
+        pending = {}
+        remaining_models = self.available_models(models)
+        if not remaining_models:
+            return None
+
+        def launch():
+            model = remaining_models.pop(0)
+            timeout = max(0.1, deadline - (time.monotonic() - start))
+            future = self.executor.submit(self._guarded_complete, model, prompt, timeout)
+            pending[future] = model
+
+        launch()
+        while pending:
+            elapsed = time.monotonic() - start
+            if elapsed >= deadline:
+                break
+            wait_for = deadline - elapsed
+            if remaining_models:
+                wait_for = min(wait_for, hedge_delay)
+
+            done, _ = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+            failed = False
+            for future in done:
+                pending.pop(future)
+                try:
+                    return future.result()
+                except Exception:
+                    failed = True
+
+            # Hedge: start the next model after a failure or a quiet hedge_delay
+            if remaining_models and (failed or not done):
+                launch()
+
+        for future in pending:
+            future.cancel()
+        return None
+
+    def stream_completion(self, models, prompt, first_chunk_timeout=5.0, timeout=60.0):
+        """Stream completion text chunks from the first healthy model that starts streaming
+
+        Models are tried in order until one sends its first chunk within
+        first_chunk_timeout; after that the answer is relayed as it arrives, with
+        timeout as both the read timeout and the overall budget. Returns a
+        CompletionStream: iterate it for the chunks (none when no model started
+        in time), then check its complete flag, which is only set when the model
+        finished with [DONE].
+        """
+        return CompletionStream(lambda stream: self._stream_chunks(stream, models, prompt, first_chunk_timeout, timeout))
+
+    def _stream_chunks(self, stream, models, prompt, first_chunk_timeout, timeout):
+        for model in self.available_models(models):
+            if not self._allow(model):
+                continue
+            started = False
+            request_start = time.monotonic()
+            try:
+                with self.session.post(self.url, json=completion_payload(model, prompt, stream=True), stream=True,
+                                       timeout=(first_chunk_timeout, first_chunk_timeout)) as response:
+                    if response.status_code != 200:
+                        raise RuntimeError(f"status {response.status_code}")
+                    for line in response.iter_lines(decode_unicode=True):
+                        elapsed = time.monotonic() - request_start
+                        # Keep-alive comments must not hold a model that never starts answering
+                        if elapsed > timeout or (not started and elapsed > first_chunk_timeout):
+                            break
+                        if not line or not line.startswith('data: '):
+                            continue
+                        payload = line[len('data: '):]
+                        if payload == '[DONE]':
+                            stream.complete = started
+                            break
+                        choices = json.loads(payload).get('choices') or []
+                        content = choices[0].get('delta', {}).get('content') if choices else None
+                        if content:
+                            if not started:
+                                # Latency for streams is time to first token
+                                self._record(model, request_start)
+                                # The model is answering: pauses between chunks may now last up to timeout
+                                set_read_timeout(response, timeout)
+                            started = True
+                            yield content
+                if not started:
+                    raise RuntimeError("no content before first chunk timeout")
+            except Exception as model_error:
+                if not started:
+                    self._record(model, request_start, model_error)
+                else:
+                    print(f"Stream from model {model} interrupted: {str(model_error)}")
+            if started:
+                return
+
+    def connection_stats(self):
+        """New TCP/TLS connections vs requests across the pool (reuse = requests without a handshake)"""
+        connections = requests_sent = 0
+        for adapter in set(self.session.adapters.values()):
+            for key in list(adapter.poolmanager.pools.keys()):
+                pool = adapter.poolmanager.pools.get(key)
+                if pool is not None:
+                    connections += pool.num_connections
+                    requests_sent += pool.num_requests
+        return {
+            'connections_opened': connections,
+            'requests': requests_sent,
+            'reused': max(0, requests_sent - connections)
+        }
+
+    def metrics(self):
+        with self.lock:
+            models = list(self.breakers)
+        return {
+            'connections': self.connection_stats(),
+            'models': {
+                model: {**self.stats[model].snapshot(), 'breaker': self.breakers[model].state}
+                for model in models
+            }
+        }
@@ -0,0 +1,146 @@
+"""
+LGS Puan Hesaplama Sistemi - Incremental per-user score analytics
+"""
+
+from datetime import datetime
+
+from scoring import SUBJECTS
+
+# Score history points kept per user; the dashboard charts only show the latest ones
+DEFAULT_WINDOW = 50
+
+
+def new_aggregate():
+    """Aggregate of a user with no scores"""
+    return {
+        'count': 0,
+        'total_score_sum': 0.0,
+        'best_score': None,
+        'last_created_at': None,
+        'subjects': {subject: {'sum': 0, 'first': 0, 'last': 0} for subject in SUBJECTS},
+        # Last window + 1 points, so every shown point has its previous score for the trend
+        'recent': []
+    }
+
+
+def apply_score(aggregate, score, window=DEFAULT_WINDOW):
+    """Return a new aggregate with score folded in; score must not be older than the newest one
+
+    score is any object with the Score columns as attributes (model instance or
+    result row). A fresh dict is returned so JSON columns see the change.
+    """
+    count = aggregate['count'] + 1
+    subjects = {}
+    for subject in SUBJECTS:
+        dogru = getattr(score, f'{subject}_dogru') or 0
+        previous = aggregate['subjects'][subject]
+        subjects[subject] = {
+            'sum': previous['sum'] + dogru,
+            'first': dogru if count == 1 else previous['first'],
+            'last': dogru
+        }
+
+    recent = aggregate['recent'] + [{
+        'date': score.created_at.strftime('%Y-%m-%d'),
+        'score': score.total_score
+    }]
+    best = aggregate['best_score']
+    return {
+        'count': count,
+        'total_score_sum': aggregate['total_score_sum'] + score.total_score,
+        'best_score': score.total_score if best is None else max(best, score.total_score),
+        'last_created_at': score.created_at.isoformat(),
+        'subjects': subjects,
+        'recent': recent[-(window + 1):]
+    }
+
+
+def is_in_order(aggregate, created_at):
+    """Whether a score created at created_at can be appended without a rebuild"""
+    last = aggregate['last_created_at']
+    return last is None or created_at >= datetime.fromisoformat(last)
+
+
+def build_aggregate(scores, window=DEFAULT_WINDOW):
+    """Fold scores ordered by created_at into a fresh aggregate"""
+    aggregate = new_aggregate()
+    for score in scores:
+        aggregate = apply_score(aggregate, score, window)
+    return aggregate
+
+
+def aggregate_payload(aggregate, window=DEFAULT_WINDOW):
+    """/analytics response body for an aggregate with at least one score"""
+    count = aggregate['count']
+    recent = aggregate['recent']
+    return {
+        'success': True,
+        'score_history': [{'date': point['date'], 'score': point['score']} for point in recent[-window:]],
+        'subject_performance': {
+            subject: {
+                'average': stats['sum'] / count,
+                'trend': 'up' if count > 1 and stats['last'] > stats['first'] else 'down'
+            }
+            for subject, stats in aggregate['subjects'].items()
+        },
+        'improvement_trend': [
+            {'date': current['date'], 'improvement': current['score'] - previous['score']}
+            for previous, current in zip(recent, recent[1:])
+        ][-window:],
+        'summary': {
+            'total_attempts': count,
+            'best_score': aggregate['best_score'],
+            'average_score': round(aggregate['total_score_sum'] / count, 2)
+        }
+    }
+
+
+def full_scan_payload(user_scores, window=DEFAULT_WINDOW):
+    """Reference /analytics body computed from the whole score history (oldest first)
+
+    This is the computation the route did on every request before aggregates;
+    history and trend are cut to the same window so the two can be compared.
+    """
+    analytics_data = {
+        'success': True,
+        'score_history': [{'date': score.created_at.strftime('%Y-%m-%d'), 'score': score.total_score} for score in user_scores],
+        'subject_performance': {},
+        'improvement_trend': []
+    }
+
+    for subject in SUBJECTS:
+        scores = [getattr(score, f'{subject}_dogru', 0) for score in user_scores]
+        analytics_data['subject_performance'][subject] = {
+            'average': sum(scores) / len(scores) if scores else 0,
+            'trend': 'up' if len(scores) > 1 and scores[-1] > scores[0] else 'down'
+        }
+
+    for i in range(1, len(user_scores)):
+        improvement = user_scores[i].total_score - user_scores[i-1].total_score
+        analytics_data['improvement_trend'].append({
+            'date': user_scores[i].created_at.strftime('%Y-%m-%d'),
+            'improvement': improvement
+        })
+
+    analytics_data['score_history'] = analytics_data['score_history'][-window:]
+    analytics_data['improvement_trend'] = analytics_data['improvement_trend'][-window:]
+    return analytics_data
+
+
+def compare_payloads(expected, actual, tolerance=1e-9):
+    """List of human-readable differences between two /analytics bodies"""
+    differences = []
+    for key in ('score_history', 'improvement_trend'):
+        if len(expected[key]) != len(actual[key]):
+            differences.append(f"{key}: {len(expected[key])} points != {len(actual[key])}")
+            continue
+        for position, (left, right) in enumerate(zip(expected[key], actual[key])):
+            value_key = 'score' if key == 'score_history' else 'improvement'
+            if left['date'] != right['date'] or abs(left[value_key] - right[value_key]) > tolerance:
+                differences.append(f"{key}[{position}]: {left} != {right}")
+
+    for subject, stats in expected['subject_performance'].items():
+        other = actual['subject_performance'].get(subject)
+        if other is None or other['trend'] != stats['trend'] or abs(other['average'] - stats['average']) > tolerance:
+            differences.append(f"subject_performance.{subject}: {stats} != {other}")
+    return differences
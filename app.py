@@ -1,46 +1,245 @@
+import csv
+import hashlib
+import io
 import os
-from datetime import datetime
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for, send_from_directory
+import sys
+from collections import defaultdict
+from contextlib import contextmanager
+from itertools import chain, groupby
+from datetime import datetime, timedelta
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, send_from_directory, Response, stream_with_context, g, has_app_context
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask_sqlalchemy.session import Session
+import sqlalchemy as sa
 from functools import wraps
-import requests
 import json
 from urllib.parse import urlparse
 import sqlite3
+import threading
+import time
+import atexit
+import click
+import numpy as np
+from scoring import (SUBJECTS, MAX_QUESTIONS, BATCH_COLUMNS, calculate_score, calculate_scores_batch,
+                     rows_to_array, validate_batch, batch_results_to_dicts)
+from importer import DEFAULT_CHUNK_SIZE, detect_format, iter_rows, import_scores
+from percentile import GLOBAL_COHORT, PercentileIndex
+from leaderboard import Leaderboard, city_cohort
+from cache import TTLCache
+from jobs import JobRunner
+from writebehind import BufferUnavailable, WriteBehindBuffer
+from passwords import HasherBusy, PasswordHasher
+from achievements import ScoreContext, StudyContext, evaluate, badge_rows, load_masks, insert_badges, backfill as backfill_badges
+from migrations import Migrations, add_column, create_index, drop_index, widen_column
+from schools import FILTER_FIELDS, SchoolIndex
+from catalog import build_catalog, catalog_version, load_catalog
+from placement import NO_SCHOOL, simulate_placement
+from analytics import apply_score, is_in_order, build_aggregate, aggregate_payload, full_scan_payload, compare_payloads
+from study_stats import (study_day, apply_session, build_stats, stats_payload, is_in_order as is_session_in_order,
+                         full_scan_payload as full_scan_study_payload, compare_payloads as compare_study_payloads)
+from forecast import (default_target_date, new_state as new_forecast_state, apply_score as apply_forecast_score,
+                      forecast_payload, iter_state_batches, batch_rows as forecast_batch_rows,
+                      full_scan_payload as full_scan_forecast, compare_payloads as compare_forecasts)
 
 app = Flask(__name__)
 
-# Database configuration - SQLite for all environments
+# Database configuration: DATABASE_URL (PostgreSQL on Render) or a local SQLite file
+def normalize_database_url(url):
+    """Map Render/Heroku postgres:// URLs (no longer accepted by SQLAlchemy) to the psycopg2 driver"""
+    for scheme in ('postgres://', 'postgresql://'):
+        if url.startswith(scheme):
+            return 'postgresql+psycopg2://' + url[len(scheme):]
+    return url
 
-# Use a writable directory for SQLite in production
-if os.environ.get('RENDER'):
-    # On Render, use /tmp directory which is writable
-    db_path = '/tmp/lgs_database.db'
+if os.environ.get('DATABASE_URL'):
+    app.config['SQLALCHEMY_DATABASE_URI'] = normalize_database_url(os.environ['DATABASE_URL'])
+    db_path = None
+    print(f"Using database: {sa.engine.make_url(app.config['SQLALCHEMY_DATABASE_URI']).render_as_string(hide_password=True)}")
 else:
-    # Local development
-    db_path = 'lgs_database.db'
+    # Use a writable directory for SQLite in production
+    if os.environ.get('RENDER'):
+        # On Render, use /tmp directory which is writable
+        db_path = '/tmp/lgs_database.db'
+    else:
+        # Local development
+        db_path = 'lgs_database.db'
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    print(f"Using SQLite database at: {db_path}")
 
-app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
-print(f"Using SQLite database at: {db_path}")
+is_sqlite = app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite')
+
+# Connection pool per worker process (pool_size connections kept open, max_overflow extra under load)
+pool_options = {
+    'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+    'max_overflow': int(os.environ.get('DB_POOL_OVERFLOW', 10))
+}
+
+app.config['SQLITE_PRAGMAS'] = {}
+if not is_sqlite:
+    # Pre-ping drops connections the server closed while idle; recycle replaces them before server-side timeouts
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        **pool_options,
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+        'pool_pre_ping': True,
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    }
+elif os.environ.get('SQLITE_TUNING', '1') != '0':
+    # SQLite performance profile, applied to every new connection; SQLITE_TUNING=0 keeps SQLite's defaults.
+    # WAL lets readers run next to the single writer, and busy_timeout makes writers wait instead of failing.
+    app.config['SQLITE_PRAGMAS'] = {
+        'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+        'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 10000)),
+        'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+        'cache_size': int(os.environ.get('SQLITE_CACHE_SIZE', -32000)),
+        'temp_store': 'MEMORY'
+    }
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        **pool_options,
+        'connect_args': {
+            # Python-side wait for locks (seconds) and per-connection prepared statement cache
+            'timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 10000)) / 1000,
+            'cached_statements': int(os.environ.get('SQLITE_STATEMENT_CACHE', 256))
+        }
+    }
+
+# Optional read replica for read-only routes (see read_replica); same pool settings as the primary
+if os.environ.get('DATABASE_REPLICA_URL'):
+    app.config['SQLALCHEMY_BINDS'] = {
+        'replica': {'url': normalize_database_url(os.environ['DATABASE_REPLICA_URL']), **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})}
+    }
+# Seconds after a user's own write during which their reads stay on the primary (replication lag)
+app.config['REPLICA_STICKY_SECONDS'] = float(os.environ.get('REPLICA_STICKY_SECONDS', 5))
+
+@sa.event.listens_for(sa.engine.Engine, 'connect')
+def apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """Apply SQLITE_PRAGMAS on each new SQLite connection (other databases are left alone)"""
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    for name, value in app.config['SQLITE_PRAGMAS'].items():
+        cursor.execute(f'PRAGMA {name}={value}')
+    cursor.close()
 
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'lgs-puan-hesaplama-secret-key-2024')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['PERCENTILE_SNAPSHOT'] = os.environ.get('PERCENTILE_SNAPSHOT', os.path.join(app.instance_path, 'percentiles.npz'))
+# Seconds between a worker's percentile index catching up with scores written elsewhere, and the Score ids below the
+# highest one read that each percentile and leaderboard catch-up reads again (ids are assigned at insert but become
+# visible at commit)
+app.config['PERCENTILE_SYNC_SECONDS'] = float(os.environ.get('PERCENTILE_SYNC_SECONDS', 2))
+app.config['SCORE_CATCH_UP_IDS'] = int(os.environ.get('SCORE_CATCH_UP_IDS', 1000))
+# Compiled national school catalog (see build-school-catalog); sample schools are used when missing
+app.config['SCHOOL_CATALOG'] = os.environ.get('SCHOOL_CATALOG', os.path.join(app.instance_path, 'schools.npz'))
+# Seconds between a worker checking whether another process loaded a new school catalog
+app.config['SCHOOL_CATALOG_CHECK_SECONDS'] = float(os.environ.get('SCHOOL_CATALOG_CHECK_SECONDS', 30))
+# Score history points returned by /analytics (older points only count towards the aggregates)
+app.config['ANALYTICS_WINDOW'] = int(os.environ.get('ANALYTICS_WINDOW', 50))
+# Daily study buckets returned by /study-stats, and the hours local study days (streaks) are ahead of UTC
+app.config['STUDY_STATS_DAYS'] = int(os.environ.get('STUDY_STATS_DAYS', 30))
+app.config['STUDY_DAY_UTC_OFFSET'] = float(os.environ.get('STUDY_DAY_UTC_OFFSET', 3))
+# Score forecasts: half-life in days of a score's weight in the trend, days over which a trend levels off,
+# band coverage, and the target date for users without an active study plan (unset: the next June 15)
+app.config['FORECAST_HALF_LIFE_DAYS'] = float(os.environ.get('FORECAST_HALF_LIFE_DAYS', 60))
+app.config['FORECAST_DAMPING_DAYS'] = float(os.environ.get('FORECAST_DAMPING_DAYS', 90))
+app.config['FORECAST_CONFIDENCE'] = float(os.environ.get('FORECAST_CONFIDENCE', 0.8))
+app.config['LGS_EXAM_DATE'] = os.environ.get('LGS_EXAM_DATE')
+# Score, study session and mock exam inserts: 'off' commits per request, 'group' waits for a
+# shared batch commit, 'async' answers once the row is queued (lost if the worker is killed)
+app.config['WRITE_BEHIND'] = os.environ.get('WRITE_BEHIND', 'off')
+app.config['WRITE_BEHIND_BATCH'] = int(os.environ.get('WRITE_BEHIND_BATCH', 500))
+app.config['WRITE_BEHIND_WINDOW'] = float(os.environ.get('WRITE_BEHIND_WINDOW', 0.005))
+app.config['WRITE_BEHIND_QUEUE'] = int(os.environ.get('WRITE_BEHIND_QUEUE', 10000))
+# Seconds a 'group' request waits for its commit before writing synchronously (or failing, if the commit is under way)
+app.config['WRITE_BEHIND_FLUSH_TIMEOUT'] = float(os.environ.get('WRITE_BEHIND_FLUSH_TIMEOUT', 5))
+# Per-user JSON response cache for dashboard reads, keyed by the user's data version (RESPONSE_CACHE=0 disables it)
+app.config['RESPONSE_CACHE'] = os.environ.get('RESPONSE_CACHE', '1') != '0'
+app.config['RESPONSE_CACHE_SIZE'] = int(os.environ.get('RESPONSE_CACHE_SIZE', 4096))
+app.config['RESPONSE_CACHE_TTL'] = int(os.environ.get('RESPONSE_CACHE_TTL', 3600))
+# Most recent mock exams carried by /dashboard/data (GET /mock-exam still returns them all)
+app.config['DASHBOARD_RECENT_EXAMS'] = int(os.environ.get('DASHBOARD_RECENT_EXAMS', 10))
+# Seconds between a worker's leaderboard catching up with scores written elsewhere, and the longest /leaderboard page
+app.config['LEADERBOARD_SYNC_SECONDS'] = float(os.environ.get('LEADERBOARD_SYNC_SECONDS', 2))
+app.config['LEADERBOARD_MAX_LIMIT'] = int(os.environ.get('LEADERBOARD_MAX_LIMIT', 100))
+# Per-worker cache of each user's earned achievements as a bitset, so awarding badges needs no lookup
+app.config['ACHIEVEMENT_CACHE_SIZE'] = int(os.environ.get('ACHIEVEMENT_CACHE_SIZE', 100000))
+app.config['ACHIEVEMENT_CACHE_TTL'] = int(os.environ.get('ACHIEVEMENT_CACHE_TTL', 3600))
+# Password hashing: Werkzeug method for new hashes (others are upgraded at the next login), pool processes
+# (0 hashes in the request thread), hashes running or queued per route (kept below the worker's threads so
+# other routes always find one), seconds a request may wait for a slot before its 503, and the pool's nice
+# value so a login storm cannot starve other routes of CPU
+app.config['PASSWORD_HASH_METHOD'] = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+app.config['PASSWORD_HASH_PROCESSES'] = int(os.environ.get('PASSWORD_HASH_PROCESSES', 1))
+app.config['PASSWORD_HASH_LIMITS'] = {
+    'login': int(os.environ.get('PASSWORD_HASH_LOGIN_LIMIT', 4)),
+    'register': int(os.environ.get('PASSWORD_HASH_REGISTER_LIMIT', 2))
+}
+app.config['PASSWORD_HASH_WAIT'] = float(os.environ.get('PASSWORD_HASH_WAIT', 0))
+app.config['PASSWORD_HASH_RETRY_AFTER'] = int(os.environ.get('PASSWORD_HASH_RETRY_AFTER', 1))
+app.config['PASSWORD_HASH_NICE'] = int(os.environ.get('PASSWORD_HASH_NICE', 10))
+# Comma-separated usernames allowed to read operational statistics (see admin_required)
+app.config['ADMIN_USERNAMES'] = {name.strip() for name in os.environ.get('ADMIN_USERNAMES', '').split(',') if name.strip()}
+
+class RoutingSession(Session):
+    """Session that sends plain SELECTs of read_replica requests to the replica engine
+
+    Flushes, DML statements and SELECT ... FOR UPDATE always use the primary.
+    """
 
-db = SQLAlchemy(app)
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and has_app_context() and g.get('use_replica')
+                and 'replica' in self._db.engines
+                and (clause is None or (isinstance(clause, sa.Select) and clause._for_update_arg is None))):
+            return self._db.engines['replica']
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+db = SQLAlchemy(app, session_options={'class_': RoutingSession})
 
 # OpenRouter API configuration
 OPENROUTER_API_KEY = os.environ.get('OPENROUTER_API_KEY', "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")
 OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
 
+# Free models, in order of preference
+OPENROUTER_MODELS = [
+    'qwen/qwen-2.5-72b-instruct:free',
+    'qwen/qwen-2.5-14b-instruct:free',
+    'google/gemma-2-9b-it:free',
+    'mistralai/mistral-7b-instruct:free',
+    'meta-llama/llama-3.2-3b-instruct:free'
+]
+# Seconds before the next model is raced, and overall budget before the fallback text
+app.config['AI_HEDGE_DELAY'] = float(os.environ.get('AI_HEDGE_DELAY', 2.0))
+app.config['AI_DEADLINE'] = float(os.environ.get('AI_DEADLINE', 20.0))
+# Streaming mode: seconds a model may take to send its first token before the next one is tried
+app.config['AI_STREAM_FIRST_CHUNK_TIMEOUT'] = float(os.environ.get('AI_STREAM_FIRST_CHUNK_TIMEOUT', 5.0))
+# Circuit breaker: consecutive failures before a model is skipped, and seconds before it is probed again
+app.config['AI_BREAKER_THRESHOLD'] = int(os.environ.get('AI_BREAKER_THRESHOLD', 3))
+app.config['AI_BREAKER_COOLDOWN'] = int(os.environ.get('AI_BREAKER_COOLDOWN', 300))
+# Recommendation cache: seconds an answer is reused, and bucket widths for the key
+app.config['AI_CACHE_TTL'] = int(os.environ.get('AI_CACHE_TTL', 6 * 3600))
+app.config['AI_CACHE_SIZE'] = int(os.environ.get('AI_CACHE_SIZE', 2048))
+app.config['AI_CACHE_SCORE_STEP'] = 10
+# Background recommendation jobs: concurrent upstream calls per worker, and seconds before a running job is retried
+app.config['AI_JOB_WORKERS'] = int(os.environ.get('AI_JOB_WORKERS', 2))
+app.config['AI_JOB_LEASE'] = int(os.environ.get('AI_JOB_LEASE', 120))
+# Job event streams: seconds one may stay open, and how many a worker serves at once (each holds a request thread);
+# clients turned away or timed out poll /ai-recommendations/jobs/<id> instead
+app.config['AI_JOB_STREAM_SECONDS'] = float(os.environ.get('AI_JOB_STREAM_SECONDS', 15))
+app.config['AI_JOB_STREAMS'] = int(os.environ.get('AI_JOB_STREAMS', 2))
+app.config['AI_CACHE_PERCENTILE_STEP'] = 5
+
 # Database Models
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=True)
-    password_hash = db.Column(db.String(120), nullable=False)
+    # Leaderboard cohort, named like School.city
+    city = db.Column(db.String(100), nullable=True)
+    password_hash = db.Column(db.String(255), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     last_login = db.Column(db.DateTime, default=datetime.utcnow)
+    # Incremented whenever rows behind the user's cached responses change (see VERSIONED_MODELS)
+    data_version = db.Column(db.Integer, default=0)
     scores = db.relationship('Score', backref='user', lazy=True, cascade='all, delete-orphan')
     study_sessions = db.relationship('StudySession', backref='user', lazy=True, cascade='all, delete-orphan')
 
@@ -63,6 +262,23 @@ class Score(db.Model):
     percentile = db.Column(db.Float, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (db.Index('ix_score_user_created', 'user_id', 'created_at'),)
+
+class UserAnalytics(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    data = db.Column(db.JSON, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class UserStudyStats(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    data = db.Column(db.JSON, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class UserForecast(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    data = db.Column(db.JSON, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 class StudySession(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -72,28 +288,52 @@ class StudySession(db.Model):
     difficulty_level = db.Column(db.String(20))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (db.Index('ix_study_session_user_created', 'user_id', 'created_at'),)
+
 class AIRecommendation(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     recommendation_type = db.Column(db.String(50), nullable=False)
     content = db.Column(db.Text, nullable=False)
+    cache_key = db.Column(db.String(64), index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class RecommendationJob(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    recommendation_type = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending', index=True)
+    result = db.Column(db.Text)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    __table_args__ = (db.Index('ix_recommendation_job_user_type_status', 'user_id', 'recommendation_type', 'status'),)
 
 class School(db.Model):
     id = db.Column(db.Integer, primary_key=True)
+    code = db.Column(db.String(20), index=True)
     name = db.Column(db.String(200), nullable=False)
     city = db.Column(db.String(100), nullable=False)
     district = db.Column(db.String(100), nullable=False)
     school_type = db.Column(db.String(50), nullable=False)
-    min_score = db.Column(db.Float, nullable=False)
+    min_score = db.Column(db.Float, nullable=False, index=True)
     max_score = db.Column(db.Float, nullable=False)
     quota = db.Column(db.Integer, nullable=False)
+    cutoffs = db.Column(db.JSON)
     description = db.Column(db.Text)
     website = db.Column(db.String(200))
     phone = db.Column(db.String(20))
     address = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+class SchoolCatalog(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.String(64), nullable=False)
+    school_count = db.Column(db.Integer, nullable=False)
+    loaded_at = db.Column(db.DateTime, default=datetime.utcnow)
+
 class MockExam(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -106,6 +346,8 @@ class MockExam(db.Model):
     subject_scores = db.Column(db.JSON)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (db.Index('ix_mock_exam_user_created', 'user_id', 'created_at'),)
+
 class StudyPlan(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -117,6 +359,8 @@ class StudyPlan(db.Model):
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (db.Index('ix_study_plan_user_active', 'user_id', 'is_active'),)
+
 class Achievement(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -126,6 +370,44 @@ class Achievement(db.Model):
     badge_icon = db.Column(db.String(50), nullable=False)
     earned_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # One badge per type per user; concurrent awards of the same badge are dropped by the database
+    __table_args__ = (db.Index('ix_achievement_user_type', 'user_id', 'achievement_type', unique=True),)
+
+# Tables whose rows feed the per-user cached responses (see cached_per_user)
+VERSIONED_MODELS = (Score, UserAnalytics, UserStudyStats, UserForecast, MockExam, Achievement, StudyPlan)
+
+def bump_data_versions(connection, user_ids=None):
+    """Invalidate the cached responses of the given users (every user when None)"""
+    users = User.__table__
+    statement = sa.update(users).values(data_version=sa.func.coalesce(users.c.data_version, 0) + 1)
+    if user_ids is not None:
+        statement = statement.where(users.c.id.in_(sorted(user_ids)))
+    connection.execute(statement)
+
+@sa.event.listens_for(RoutingSession, 'after_flush')
+def bump_versions_on_flush(flush_session, flush_context):
+    """Bump data_version for users whose versioned rows were written, inside the same transaction"""
+    user_ids = {
+        row.user_id for row in chain(flush_session.new, flush_session.dirty, flush_session.deleted)
+        if isinstance(row, VERSIONED_MODELS)
+    }
+    if user_ids:
+        bump_data_versions(flush_session.connection(), user_ids)
+
+password_hasher = PasswordHasher(
+    app.config['PASSWORD_HASH_METHOD'],
+    processes=app.config['PASSWORD_HASH_PROCESSES'],
+    limits=app.config['PASSWORD_HASH_LIMITS'],
+    wait=app.config['PASSWORD_HASH_WAIT'],
+    nice=app.config['PASSWORD_HASH_NICE']
+)
+atexit.register(password_hasher.shutdown, wait=False)
+
+def hasher_busy_response():
+    """503 for a login or registration turned away by the hashing limit; Retry-After spreads the retries"""
+    return (jsonify({'success': False, 'message': 'Sistem şu anda çok yoğun, lütfen birkaç saniye sonra tekrar deneyin'}),
+            503, {'Retry-After': str(app.config['PASSWORD_HASH_RETRY_AFTER'])})
+
 # Authentication decorator
 def login_required(f):
     @wraps(f)
@@ -135,42 +417,360 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def admin_required(f):
+    """Allow only the users listed in ADMIN_USERNAMES"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if 'user_id' not in session:
+            return redirect(url_for('login'))
+        if session.get('username') not in app.config['ADMIN_USERNAMES']:
+            return jsonify({'success': False, 'message': 'Bu sayfaya erişim yetkiniz yok'}), 403
+        return f(*args, **kwargs)
+    return decorated_function
+
+def read_replica(f):
+    """Serve a route's GET reads from the replica, unless the user wrote something moments ago"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if request.method == 'GET' and time.time() - session.get('last_write_at', 0) > app.config['REPLICA_STICKY_SECONDS']:
+            g.use_replica = True
+        return f(*args, **kwargs)
+    return decorated_function
+
+response_cache = TTLCache(maxsize=app.config['RESPONSE_CACHE_SIZE'], ttl=app.config['RESPONSE_CACHE_TTL'])
+response_cache_stats = {'not_modified': 0}
+
+def user_data_version(user_id):
+    return db.session.execute(sa.select(User.data_version).where(User.id == user_id)).scalar() or 0
+
+def local_today():
+    return study_day(datetime.utcnow(), app.config['STUDY_DAY_UTC_OFFSET'])
+
+def cached_per_user(f):
+    """Cache a GET route's JSON per user and data version, and answer If-None-Match with 304
+
+    Only successful JSON responses are kept; routes set g.skip_response_cache
+    when they fall back to sample data.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if request.method != 'GET' or not app.config['RESPONSE_CACHE']:
+            return f(*args, **kwargs)
+        try:
+            version = user_data_version(session['user_id'])
+        except Exception as e:
+            print(f"Response cache version error: {e}")
+            db.session.rollback()
+            return f(*args, **kwargs)
+
+        # The local day is part of the key: streaks shown as current end once a day passes without study
+        key = (request.full_path, session['user_id'], version, local_today().isoformat())
+        etag = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()[:24]
+        if request.if_none_match.contains(etag):
+            response_cache_stats['not_modified'] += 1
+            response = Response(status=304)
+        else:
+            body = response_cache.get(key)
+            if body is not None:
+                response = Response(body, mimetype='application/json')
+            else:
+                response = f(*args, **kwargs)
+                if (response.status_code != 200 or not response.is_json or g.get('skip_response_cache')
+                        or response.get_json().get('success') is False):
+                    return response
+                if user_data_version(session['user_id']) != version:
+                    # The route itself wrote (e.g. built a missing aggregate); the next read gets the new version
+                    return response
+                response_cache.set(key, response.get_data())
+        response.set_etag(etag)
+        # Browsers revalidate on every load; an unchanged version makes that a bodyless 304
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+    return decorated_function
+
 # Helper Functions
-def calculate_score(data):
-    """Calculate LGS score based on correct and wrong answers"""
-    coefficients = {
-        'turkce': 4.35,
-        'matematik': 4.26,
-        'fen': 4.13,
-        'inkilap': 1.67,
-        'din': 1.90,
-        'ingilizce': 1.51
-    }
-    
-    # Calculate nets (3 wrong answers cancel 1 correct answer)
-    nets = {}
-    for subject in coefficients.keys():
-        dogru = data.get(f'{subject}_dogru', 0)
-        yanlis = data.get(f'{subject}_yanlis', 0)
-        nets[subject] = max(0, dogru - (yanlis / 3))
-    
-    # Calculate weighted score
-    weighted_score = sum(nets[subject] * coefficients[subject] for subject in coefficients.keys())
+_percentile_index = None
+_percentile_index_lock = threading.Lock()
+_percentile_synced_at = 0.0
+
+def percentile_rows(after_id=0):
+    """(score id, total score, created_at) of the scores with an id above after_id, in id order"""
+    return db.session.execute(
+        sa.select(Score.id, Score.total_score, Score.created_at).where(Score.id > after_id).order_by(Score.id)
+        .execution_options(yield_per=10000)
+    )
+
+def build_percentile_index():
+    """Build the percentile index with one streaming scan of the Score table"""
+    return PercentileIndex.build(percentile_rows(), app.config['SCORE_CATCH_UP_IDS'])
+
+def get_percentile_index(catch_up=False):
+    """Return this worker's percentile index, loading the snapshot or scanning the DB once and catching up every few seconds
+
+    Scores committed by this worker are added right after their commit;
+    catching up reads the Score rows past the index's last id (see
+    PercentileIndex), so it also counts scores written after the snapshot,
+    by other workers and by imports. catch_up=True does it now.
+    """
+    global _percentile_index, _percentile_synced_at
+    with _percentile_index_lock:
+        if _percentile_index is None:
+            snapshot = app.config['PERCENTILE_SNAPSHOT']
+            index = PercentileIndex.load(snapshot, app.config['SCORE_CATCH_UP_IDS']) if os.path.exists(snapshot) else None
+            # Snapshots from before ids were recorded cannot be caught up; scan instead
+            _percentile_index = index or build_percentile_index()
+            _percentile_synced_at = 0.0
+        if catch_up or time.monotonic() - _percentile_synced_at >= app.config['PERCENTILE_SYNC_SECONDS']:
+            _percentile_index.sync(percentile_rows(_percentile_index.last_id - _percentile_index.window))
+            _percentile_synced_at = time.monotonic()
+    return _percentile_index
+
+_leaderboard = None
+_leaderboard_lock = threading.Lock()
+_leaderboard_synced_at = 0.0
+
+def latest_score_rows(after_id=None):
+    """(score id, user id, total score, created_at, city) of every user's latest score, or of scores after after_id"""
+    if after_id is not None:
+        return db.session.execute(
+            sa.select(Score.id, Score.user_id, Score.total_score, Score.created_at, User.city)
+            .join(User, User.id == Score.user_id).where(Score.id > after_id).order_by(Score.id)
+        )
+    ranked = sa.select(
+        Score.id, Score.user_id, Score.total_score, Score.created_at,
+        sa.func.row_number().over(partition_by=Score.user_id, order_by=(Score.created_at.desc(), Score.id.desc())).label('position')
+    ).subquery()
+    return db.session.execute(
+        sa.select(ranked.c.id, ranked.c.user_id, ranked.c.total_score, ranked.c.created_at, User.city)
+        .join(User, User.id == ranked.c.user_id).where(ranked.c.position == 1)
+        .execution_options(yield_per=10000)
+    )
+
+def get_leaderboard():
+    """Return this worker's leaderboard, building it from the database once and catching up every few seconds
+
+    Scores committed by this worker are applied right after their commit;
+    catching up reads the Score rows from SCORE_CATCH_UP_IDS below the highest
+    id seen, so it also picks up other workers' scores and imports (and the
+    city of users whose first score was applied here), including scores whose
+    transaction committed after one with a higher id. Applying a row twice
+    changes nothing.
+    """
+    global _leaderboard, _leaderboard_synced_at
+    with _leaderboard_lock:
+        if _leaderboard is None:
+            last_id = db.session.execute(sa.select(sa.func.max(Score.id))).scalar() or 0
+            _leaderboard = Leaderboard.build(latest_score_rows(), last_id)
+            _leaderboard_synced_at = time.monotonic()
+        elif time.monotonic() - _leaderboard_synced_at >= app.config['LEADERBOARD_SYNC_SECONDS']:
+            _leaderboard.sync(latest_score_rows(max(0, _leaderboard.last_id - app.config['SCORE_CATCH_UP_IDS'])))
+            _leaderboard_synced_at = time.monotonic()
+    return _leaderboard
+
+def warm_leaderboard():
+    try:
+        with app.app_context():
+            get_leaderboard()
+    except Exception as e:
+        print(f"Leaderboard build error: {e}")
+
+_school_index = None
+_school_index_lock = threading.Lock()
+_school_catalog_id = None
+_school_catalog_checked_at = 0.0
+
+def latest_school_catalog_id():
+    return db.session.execute(sa.select(sa.func.max(SchoolCatalog.id))).scalar()
+
+def load_school_index():
+    """Build the school index from the School table and swap it in atomically"""
+    global _school_index, _school_catalog_id, _school_catalog_checked_at
+    catalog_id = latest_school_catalog_id()
+    index = SchoolIndex(db.session.execute(sa.select(
+        School.id, School.name, School.city, School.district, School.school_type, School.min_score, School.quota
+    )))
+    # Readers keep whichever index they already hold; new requests see the new one
+    _school_index = index
+    _school_catalog_id = catalog_id
+    _school_catalog_checked_at = time.monotonic()
+    return index
+
+def get_school_index():
+    """Return this worker's school index, loading it on first use
+
+    Every few seconds the latest SchoolCatalog row is compared with the one
+    the index was built from, so a catalog loaded by another process (a
+    deploy's init-db or load-school-catalog) reaches running workers.
+    """
+    global _school_catalog_checked_at
+    with _school_index_lock:
+        if _school_index is None:
+            load_school_index()
+        elif time.monotonic() - _school_catalog_checked_at >= app.config['SCHOOL_CATALOG_CHECK_SECONDS']:
+            if latest_school_catalog_id() != _school_catalog_id:
+                load_school_index()
+            else:
+                _school_catalog_checked_at = time.monotonic()
+    return _school_index
+
+def analyze_subjects(latest_score):
+    """Split subjects into weak (<60%) and strong (>80%) by correct answer rate"""
+    weak_subjects = []
+    strong_subjects = []
     
-    # Add constant and ensure score is within bounds
-    total_score = max(100, min(500, 194.65 + weighted_score))
+    for subject in SUBJECTS:
+        dogru = getattr(latest_score, f'{subject}_dogru', 0)
+        max_q = MAX_QUESTIONS[subject]
+        success_rate = (dogru / max_q) * 100 if max_q > 0 else 0
+        
+        if success_rate < 60:
+            weak_subjects.append(f"{subject.title()}: %{success_rate:.1f}")
+        elif success_rate > 80:
+            strong_subjects.append(f"{subject.title()}: %{success_rate:.1f}")
     
-    # Calculate percentile (simplified normal distribution)
-    mean, std_dev = 300, 50
-    z_score = (total_score - mean) / std_dev
-    percentile = max(0.01, min(99.99, 100 * (1 / (1 + pow(2.718, -1.702 * z_score)))))
+    return weak_subjects, strong_subjects
+
+def recommendation_profile(latest_score, weak_subjects, strong_subjects):
+    """Bucketed view of a student that both the AI prompt and its cache key are built from
+
+    Answers are shared by every student in the same buckets, so the prompt
+    must not carry anything finer than the key (exact score, percentile or
+    success rates).
+    """
+    score_step = app.config['AI_CACHE_SCORE_STEP']
+    percentile_step = app.config['AI_CACHE_PERCENTILE_STEP']
+    return {
+        'score': int(round(latest_score.total_score / score_step) * score_step),
+        'percentile': int(round(latest_score.percentile / percentile_step) * percentile_step),
+        'weak': [s.split(':')[0] for s in weak_subjects],
+        'strong': [s.split(':')[0] for s in strong_subjects]
+    }
+
+def build_recommendation_prompt(profile, recommendation_type):
+    """Create the AI prompt based on the user's (bucketed) performance"""
+    weak_subjects, strong_subjects = profile['weak'], profile['strong']
+    if recommendation_type == "study_plan":
+        prompt = f"""
+        LGS öğrencisi için kişiselleştirilmiş çalışma planı oluştur.
+
+        Öğrenci Bilgileri:
+        - Toplam Puan: yaklaşık {profile['score']}
+        - Yüzdelik Dilim: yaklaşık %{profile['percentile']}
+        - Zayıf Dersler: {', '.join(weak_subjects) if weak_subjects else 'Yok'}
+        - Güçlü Dersler: {', '.join(strong_subjects) if strong_subjects else 'Yok'}
+
+        Lütfen:
+        1. Haftalık çalışma programı öner
+        2. Zayıf derslere odaklanma stratejileri ver
+        3. Güçlü dersleri koruma önerileri sun
+        4. Motivasyonel tavsiyeler ekle
+
+        Türkçe olarak, pratik ve uygulanabilir öneriler ver.
+        """
+    elif recommendation_type == "improvement":
+        prompt = f"""
+        LGS öğrencisi için gelişim önerileri oluştur.
+
+        Mevcut Durum:
+        - Puan: yaklaşık {profile['score']}/500
+        - Yüzdelik: yaklaşık %{profile['percentile']}
+        - Gelişim Gereken Alanlar: {', '.join(weak_subjects)}
+
+        Her zayıf ders için:
+        1. Spesifik çalışma teknikleri
+        2. Kaynak önerileri
+        3. Pratik egzersizler
+        4. Zaman yönetimi
+
+        Kısa ve öz, Türkçe yanıt ver.
+        """
+    else:  # motivation
+        prompt = f"""
+        LGS öğrencisi için motivasyonel mesaj oluştur.
+
+        Öğrenci Durumu:
+        - Puan: yaklaşık {profile['score']}
+        - Başarı Oranı: yaklaşık %{profile['percentile']}
+
+        Pozitif, destekleyici ve motive edici bir mesaj yaz.
+        Başarıları vurgula, gelişim alanlarını umut verici şekilde sun.
+        Türkçe, samimi bir dille yaz.
+        """
     
+    return prompt
+
+def openrouter_headers():
     return {
-        'total_score': round(total_score, 2),
-        'percentile': round(percentile, 2),
-        'nets': {k: round(v, 2) for k, v in nets.items()}
+        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
+        "Content-Type": "application/json",
+        "HTTP-Referer": "http://localhost:5000",
+        "X-Title": "LGS Puan Hesaplama Sistemi"
     }
 
+# One pooled keep-alive client per worker, shared by all requests and jobs.
+# Created on first use so workers that never call the AI do not import requests.
+_openrouter = None
+_openrouter_lock = threading.Lock()
+
+def get_openrouter():
+    """Return this worker's OpenRouter client, creating it on first use"""
+    global _openrouter
+    if _openrouter is None:
+        with _openrouter_lock:
+            if _openrouter is None:
+                from ai_client import OpenRouterClient
+                _openrouter = OpenRouterClient(
+                    OPENROUTER_BASE_URL,
+                    openrouter_headers(),
+                    failure_threshold=app.config['AI_BREAKER_THRESHOLD'],
+                    cooldown=app.config['AI_BREAKER_COOLDOWN']
+                )
+    return _openrouter
+
+def request_ai_recommendation(prompt):
+    """Ask OpenRouter for a completion; returns None when no model answered in time"""
+    # Race the models with hedged requests; first valid answer wins
+    return get_openrouter().hedged_completion(
+        OPENROUTER_MODELS,
+        prompt,
+        hedge_delay=app.config['AI_HEDGE_DELAY'],
+        deadline=app.config['AI_DEADLINE']
+    )
+
+recommendation_cache = TTLCache(maxsize=app.config['AI_CACHE_SIZE'], ttl=app.config['AI_CACHE_TTL'])
+recommendation_cache_stats = {'memory_hits': 0, 'db_hits': 0, 'misses': 0}
+
+def recommendation_cache_key(profile, recommendation_type):
+    """Hash of the prompt inputs, bucketed so similar students share an answer (see recommendation_profile)"""
+    parts = [
+        recommendation_type,
+        ','.join(profile['weak']),
+        ','.join(profile['strong']),
+        str(profile['score']),
+        str(profile['percentile'])
+    ]
+    return hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()
+
+def get_cached_recommendation(cache_key):
+    """Look the key up in the in-process cache, then in the AIRecommendation table"""
+    content = recommendation_cache.get(cache_key)
+    if content is not None:
+        recommendation_cache_stats['memory_hits'] += 1
+        return content
+    
+    cutoff = datetime.utcnow() - timedelta(seconds=app.config['AI_CACHE_TTL'])
+    cached = AIRecommendation.query.filter(
+        AIRecommendation.cache_key == cache_key,
+        AIRecommendation.created_at >= cutoff
+    ).order_by(AIRecommendation.created_at.desc()).first()
+    if cached:
+        recommendation_cache_stats['db_hits'] += 1
+        recommendation_cache.set(cache_key, cached.content)
+        return cached.content
+    
+    recommendation_cache_stats['misses'] += 1
+    return None
+
 def get_ai_recommendation(user_scores, recommendation_type="study_plan"):
     """Get AI-powered recommendations using OpenRouter API"""
     try:
@@ -179,117 +779,13 @@ def get_ai_recommendation(user_scores, recommendation_type="study_plan"):
         if not latest_score:
             return "Henüz puan hesaplaması yapmadınız. Lütfen önce bir deneme sınavı sonucunuzu girin."
         
-        # Create prompt based on user's performance
-        weak_subjects = []
-        strong_subjects = []
-        
-        subjects = ['turkce', 'matematik', 'fen', 'inkilap', 'din', 'ingilizce']
-        max_questions = {'turkce': 20, 'matematik': 20, 'fen': 20, 'inkilap': 10, 'din': 10, 'ingilizce': 10}
-        
-        for subject in subjects:
-            dogru = getattr(latest_score, f'{subject}_dogru', 0)
-            max_q = max_questions[subject]
-            success_rate = (dogru / max_q) * 100 if max_q > 0 else 0
-            
-            if success_rate < 60:
-                weak_subjects.append(f"{subject.title()}: %{success_rate:.1f}")
-            elif success_rate > 80:
-                strong_subjects.append(f"{subject.title()}: %{success_rate:.1f}")
-        
-        if recommendation_type == "study_plan":
-            prompt = f"""
-            LGS öğrencisi için kişiselleştirilmiş çalışma planı oluştur.
-            
-            Öğrenci Bilgileri:
-            - Toplam Puan: {latest_score.total_score}
-            - Yüzdelik Dilim: %{latest_score.percentile}
-            - Zayıf Dersler: {', '.join(weak_subjects) if weak_subjects else 'Yok'}
-            - Güçlü Dersler: {', '.join(strong_subjects) if strong_subjects else 'Yok'}
-            
-            Lütfen:
-            1. Haftalık çalışma programı öner
-            2. Zayıf derslere odaklanma stratejileri ver
-            3. Güçlü dersleri koruma önerileri sun
-            4. Motivasyonel tavsiyeler ekle
-            
-            Türkçe olarak, pratik ve uygulanabilir öneriler ver.
-            """
-        elif recommendation_type == "improvement":
-            prompt = f"""
-            LGS öğrencisi için gelişim önerileri oluştur.
-            
-            Mevcut Durum:
-            - Puan: {latest_score.total_score}/500
-            - Yüzdelik: %{latest_score.percentile}
-            - Gelişim Gereken Alanlar: {', '.join(weak_subjects)}
-            
-            Her zayıf ders için:
-            1. Spesifik çalışma teknikleri
-            2. Kaynak önerileri
-            3. Pratik egzersizler
-            4. Zaman yönetimi
-            
-            Kısa ve öz, Türkçe yanıt ver.
-            """
-        else:  # motivation
-            prompt = f"""
-            LGS öğrencisi için motivasyonel mesaj oluştur.
-            
-            Öğrenci Durumu:
-            - Puan: {latest_score.total_score}
-            - Başarı Oranı: %{latest_score.percentile}
-            
-            Pozitif, destekleyici ve motive edici bir mesaj yaz.
-            Başarıları vurgula, gelişim alanlarını umut verici şekilde sun.
-            Türkçe, samimi bir dille yaz.
-            """
-        
-        # List of free models to try
-        free_models = [
-            'qwen/qwen-2.5-72b-instruct:free',
-            'qwen/qwen-2.5-14b-instruct:free',
-            'google/gemma-2-9b-it:free',
-            'mistralai/mistral-7b-instruct:free',
-            'meta-llama/llama-3.2-3b-instruct:free'
-        ]
+        weak_subjects, strong_subjects = analyze_subjects(latest_score)
+        profile = recommendation_profile(latest_score, weak_subjects, strong_subjects)
+        prompt = build_recommendation_prompt(profile, recommendation_type)
         
-        headers = {
-            "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-            "Content-Type": "application/json",
-            "HTTP-Referer": "http://localhost:5000",
-            "X-Title": "LGS Puan Hesaplama Sistemi"
-        }
-        
-        # Try each model until one works
-        for model in free_models:
-            try:
-                data = {
-                    "model": model,
-                    "messages": [
-                        {"role": "user", "content": prompt}
-                    ],
-                    "max_tokens": 800,
-                    "temperature": 0.7
-                }
-                
-                response = requests.post(
-                    f"{OPENROUTER_BASE_URL}/chat/completions",
-                    headers=headers,
-                    json=data,
-                    timeout=30
-                )
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    if 'choices' in result and len(result['choices']) > 0:
-                        return result['choices'][0]['message']['content']
-                else:
-                    print(f"Model {model} failed with status {response.status_code}")
-                    continue
-                    
-            except Exception as model_error:
-                print(f"Error with model {model}: {str(model_error)}")
-                continue
+        content = request_ai_recommendation(prompt)
+        if content is not None:
+            return content
         
         # If all models fail, return a fallback response
         return generate_fallback_recommendation(latest_score, recommendation_type, weak_subjects, strong_subjects)
@@ -365,6 +861,7 @@ def register():
         data = request.get_json()
         username = data.get('username', '').strip()
         email = data.get('email', '').strip()
+        city = (data.get('city') or '').strip()
         password = data.get('password', '')
         
         if not username or not password:
@@ -376,10 +873,18 @@ def register():
         if email and User.query.filter_by(email=email).first():
             return jsonify({'success': False, 'message': 'Bu e-posta adresi zaten kayıtlı'})
         
+        # Give the connection back while the hash runs; a registration burst would otherwise hold the whole pool
+        db.session.rollback()
+        try:
+            password_hash = password_hasher.hash(password, 'register')
+        except HasherBusy:
+            return hasher_busy_response()
+        
         user = User(
             username=username,
             email=email if email else None,
-            password_hash=generate_password_hash(password)
+            city=city or None,
+            password_hash=password_hash
         )
         
         try:
@@ -402,11 +907,28 @@ def login():
         password = data.get('password', '')
         
         user = User.query.filter_by(username=username).first()
+        password_hash = user.password_hash if user else None
+        # Same as register: no pooled connection is held while the hash runs
+        db.session.rollback()
+        
+        try:
+            valid = password_hash is not None and password_hasher.verify(password_hash, password, 'login')
+        except HasherBusy:
+            return hasher_busy_response()
         
-        if user and check_password_hash(user.password_hash, password):
+        if valid:
+            upgraded_hash = None
+            if password_hasher.needs_rehash(password_hash):
+                # Hashing parameters changed since this hash was made; the password is known now, so upgrade it
+                try:
+                    upgraded_hash = password_hasher.hash(password, 'login')
+                except HasherBusy:
+                    pass
             session['user_id'] = user.id
             session['username'] = user.username
             user.last_login = datetime.utcnow()
+            if upgraded_hash:
+                user.password_hash = upgraded_hash
             db.session.commit()
             return jsonify({'success': True, 'message': 'Giriş başarılı'})
         else:
@@ -444,13 +966,10 @@ def calculate():
         data = request.get_json()
         
         # Validate input data
-        subjects = ['turkce', 'matematik', 'fen', 'inkilap', 'din', 'ingilizce']
-        max_questions = {'turkce': 20, 'matematik': 20, 'fen': 20, 'inkilap': 10, 'din': 10, 'ingilizce': 10}
-        
-        for subject in subjects:
+        for subject in SUBJECTS:
             dogru = data.get(f'{subject}_dogru', 0)
             yanlis = data.get(f'{subject}_yanlis', 0)
-            max_q = max_questions[subject]
+            max_q = MAX_QUESTIONS[subject]
             
             if dogru < 0 or yanlis < 0 or dogru > max_q or yanlis > max_q:
                 return jsonify({'success': False, 'message': f'{subject.title()} için geçersiz değer'})
@@ -460,6 +979,8 @@ def calculate():
         
         # Calculate score
         result = calculate_score(data)
+        percentile_index = get_percentile_index()
+        result['percentile'] = percentile_index.percentile(result['total_score'])
         
         # Save to database
         score = Score(
@@ -480,8 +1001,7 @@ def calculate():
             percentile=result['percentile']
         )
         
-        db.session.add(score)
-        db.session.commit()
+        save_new_rows(score)
         
         return jsonify({
             'success': True,
@@ -493,40 +1013,226 @@ def calculate():
         db.session.rollback()
         return jsonify({'success': False, 'message': f'Hesaplama hatası: {str(e)}'})
 
+MAX_BATCH_ROWS = 100000
+
+@app.route('/calculate/batch', methods=['POST'])
+@login_required
+def calculate_batch():
+    """Score many result rows in one call without saving them"""
+    try:
+        data = request.get_json()
+        rows = data.get('rows', []) if data else []
+
+        if not rows:
+            return jsonify({'success': False, 'message': 'Hesaplanacak satır bulunamadı'})
+
+        if len(rows) > MAX_BATCH_ROWS:
+            return jsonify({'success': False, 'message': f'Tek seferde en fazla {MAX_BATCH_ROWS} satır hesaplanabilir'})
+
+        # Rows may be /calculate-style dicts or plain lists of 12 counts
+        if any(not isinstance(row, dict) and len(row) != len(BATCH_COLUMNS) for row in rows):
+            return jsonify({'success': False, 'message': f'Her satır {len(BATCH_COLUMNS)} değer içermelidir'})
+        counts = rows_to_array(rows)
+
+        valid = validate_batch(counts)
+        results = [None] * len(rows)
+        valid_indices = np.flatnonzero(valid)
+        batch = calculate_scores_batch(counts[valid])
+        batch['percentile'] = get_percentile_index().percentiles(batch['total_score'])
+        for index, result in zip(valid_indices.tolist(), batch_results_to_dicts(batch)):
+            results[index] = result
+
+        return jsonify({
+            'success': True,
+            'results': results,
+            'invalid_rows': np.flatnonzero(~valid).tolist(),
+            'message': f'{len(valid_indices)} satır başarıyla hesaplandı'
+        })
+
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Hesaplama hatası: {str(e)}'})
+
+@app.route('/import/scores', methods=['POST'])
+@login_required
+def import_scores_upload():
+    """Stream an uploaded CSV/NDJSON file of results into the user's score history"""
+    try:
+        upload = request.files.get('file')
+        if not upload:
+            return jsonify({'success': False, 'message': 'Dosya bulunamadı'})
+
+        fmt = request.form.get('format') or detect_format(upload.filename or '')
+        stream = io.TextIOWrapper(upload.stream, encoding='utf-8-sig')
+
+        # Uploaded rows always belong to the logged-in user
+        rows = ({**row, 'user_id': session['user_id']} if isinstance(row, dict) else row for row in iter_rows(stream, fmt))
+        with db.engine.connect() as connection:
+            stats = import_scores(rows, connection, Score.__table__, default_user_id=session['user_id'],
+                                  percentile_index=get_percentile_index(),
+                                  on_commit=lambda: get_percentile_index(catch_up=True))
+        if stats['imported']:
+            rebuild_user_analytics(session['user_id'])
+            rebuild_user_forecast(session['user_id'])
+            db.session.commit()
+
+        return jsonify({
+            'success': True,
+            **stats,
+            'message': f"{stats['imported']} sonuç içe aktarıldı, {stats['rejected']} satır reddedildi"
+        })
+
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'İçe aktarma hatası: {str(e)}'})
+
+@app.cli.command('import-scores')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']), default=None, help='Dosya formatı (varsayılan: uzantıdan)')
+@click.option('--user-id', type=int, default=None, help='user_id sütunu olmayan satırlar için kullanıcı')
+@click.option('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='Transaction başına satır sayısı')
+def import_scores_command(path, fmt, user_id, chunk_size):
+    """Bulk import exam results from a CSV or NDJSON file"""
+    with open(path, encoding='utf-8-sig', newline='') as stream:
+        with db.engine.connect() as connection:
+            stats = import_scores(iter_rows(stream, fmt or detect_format(path)), connection, Score.__table__,
+                                  default_user_id=user_id, chunk_size=chunk_size,
+                                  percentile_index=get_percentile_index(),
+                                  on_commit=lambda: get_percentile_index(catch_up=True))
+    if stats['imported']:
+        # Imported rows may be older than existing ones and span many users
+        rebuild_all_analytics()
+        rebuild_all_forecasts()
+
+    print(f"Imported {stats['imported']} rows, rejected {stats['rejected']} in {stats['elapsed_seconds']}s")
+    for error in stats['errors']:
+        print(f"  row {error['row']}: {error['message']}")
+
+@app.route('/percentile')
+@login_required
+def percentile_lookup():
+    """Empirical percentile of a score within a cohort (global or 'date:YYYY-MM-DD')"""
+    score = request.args.get('score', type=float)
+    cohort = request.args.get('cohort', GLOBAL_COHORT)
+
+    if score is None:
+        return jsonify({'success': False, 'message': 'Puan gerekli'})
+
+    percentile_index = get_percentile_index()
+    return jsonify({
+        'success': True,
+        'score': score,
+        'cohort': cohort,
+        'cohort_size': percentile_index.size(cohort),
+        'percentile': percentile_index.percentile(score, cohort)
+    })
+
+@app.route('/leaderboard')
+@login_required
+def leaderboard():
+    """Top students by their latest score and the caller's rank, across everyone or within one city"""
+    try:
+        limit = min(max(request.args.get('limit', 10, type=int), 0), app.config['LEADERBOARD_MAX_LIMIT'])
+        city = request.args.get('city', '').strip()
+        cohort = city_cohort(city) if city else GLOBAL_COHORT
+
+        board = get_leaderboard()
+        leaders = board.top(limit, cohort)
+        usernames = {}
+        if leaders:
+            usernames = dict(db.session.execute(
+                sa.select(User.id, User.username).where(User.id.in_([user_id for _, user_id, _ in leaders]))
+            ).all())
+        return jsonify({
+            'success': True,
+            'cohort': cohort,
+            'total': board.size(cohort),
+            'leaders': [{'rank': rank, 'username': usernames.get(user_id), 'score': score} for rank, user_id, score in leaders],
+            'me': board.rank(session['user_id'], cohort)
+        })
+    except Exception as e:
+        print(f"Leaderboard error: {e}")
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': 'Sıralama geçici olarak kullanılamıyor.'
+        })
+
+@app.cli.command('build-percentiles')
+@click.option('--output', type=click.Path(dir_okay=False), default=None, help='Snapshot dosyası (varsayılan: PERCENTILE_SNAPSHOT)')
+def build_percentiles_command(output):
+    """Rebuild the percentile snapshot from the Score table"""
+    output = output or app.config['PERCENTILE_SNAPSHOT']
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    percentile_index = build_percentile_index()
+    percentile_index.save(output)
+    print(f"Percentile snapshot written to {output} ({percentile_index.size()} scores, {len(percentile_index.histograms)} cohorts)")
+
+NO_SCORE_MESSAGE = 'Henüz puan hesaplaması yapmadınız. Lütfen önce bir deneme sınavı sonucunuzu girin.'
+
+def generate_recommendation(user_id, recommendation_type):
+    """Serve a recommendation from the cache or the model and record it
+
+    Returns (recommendation, cached); recommendation is None when the user
+    has no score yet.
+    """
+    # Get user's latest score for context
+    latest_score = Score.query.filter_by(user_id=user_id).order_by(Score.created_at.desc()).first()
+    if not latest_score:
+        return None, False
+    
+    weak_subjects, strong_subjects = analyze_subjects(latest_score)
+    profile = recommendation_profile(latest_score, weak_subjects, strong_subjects)
+    cache_key = recommendation_cache_key(profile, recommendation_type)
+    
+    recommendation = get_cached_recommendation(cache_key)
+    if recommendation is not None:
+        return recommendation, True
+    
+    # Get AI recommendation (with fallback)
+    prompt = build_recommendation_prompt(profile, recommendation_type)
+    recommendation = request_ai_recommendation(prompt)
+    if recommendation is not None:
+        recommendation_cache.set(cache_key, recommendation)
+    else:
+        # Fallback text is saved for history but never served from the cache
+        cache_key = None
+        recommendation = generate_fallback_recommendation(latest_score, recommendation_type, weak_subjects, strong_subjects)
+    
+    save_recommendation(user_id, recommendation_type, recommendation, cache_key)
+    return recommendation, False
+
+def save_recommendation(user_id, recommendation_type, recommendation, cache_key):
+    """Save to database if AIRecommendation model exists"""
+    try:
+        ai_rec = AIRecommendation(
+            user_id=user_id,
+            recommendation_type=recommendation_type,
+            content=recommendation,
+            cache_key=cache_key
+        )
+        db.session.add(ai_rec)
+        db.session.commit()
+    except Exception as db_error:
+        db.session.rollback()
+        print(f"Database save error: {db_error}")
+        # Continue without saving to database
+
 @app.route('/ai-recommendations')
 @login_required
 def ai_recommendations():
     try:
         recommendation_type = request.args.get('type', 'study_plan')
+        recommendation, cached = generate_recommendation(session['user_id'], recommendation_type)
         
-        # Get user's recent scores for context
-        user_scores = Score.query.filter_by(user_id=session['user_id']).order_by(Score.created_at.desc()).limit(5).all()
-        
-        if not user_scores:
+        if recommendation is None:
             return jsonify({
                 'success': False,
-                'recommendation': 'Henüz puan hesaplaması yapmadınız. Lütfen önce bir deneme sınavı sonucunuzu girin.'
+                'recommendation': NO_SCORE_MESSAGE
             })
         
-        # Get AI recommendation (with fallback)
-        recommendation = get_ai_recommendation(user_scores, recommendation_type)
-        
-        # Save to database if AIRecommendation model exists
-        try:
-            ai_rec = AIRecommendation(
-                user_id=session['user_id'],
-                recommendation_type=recommendation_type,
-                content=recommendation
-            )
-            db.session.add(ai_rec)
-            db.session.commit()
-        except Exception as db_error:
-            print(f"Database save error: {db_error}")
-            # Continue without saving to database
-        
         return jsonify({
             'success': True,
-            'recommendation': recommendation
+            'recommendation': recommendation,
+            'cached': cached
         })
     except Exception as e:
         print(f"AI recommendations error: {e}")
@@ -535,61 +1241,643 @@ def ai_recommendations():
             'recommendation': 'Öneri sistemi geçici olarak kullanılamıyor. Lütfen daha sonra tekrar deneyin.'
         })
 
+def sse_event(data, event=None):
+    """Format one Server-Sent Events message"""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+def iter_text_chunks(text, size=80):
+    """Split ready-made text into stream-sized pieces, keeping line breaks"""
+    for line in text.splitlines(keepends=True):
+        for start in range(0, len(line), size):
+            yield line[start:start + size]
+
+@app.route('/ai-recommendations/stream')
+@login_required
+def ai_recommendations_stream():
+    """Stream a recommendation to the browser as Server-Sent Events
+
+    Cached answers and the fallback text are sent in chunks too, so the client
+    always handles the same 'delta' messages followed by a 'done' event.
+    """
+    recommendation_type = request.args.get('type', 'study_plan')
+    user_id = session['user_id']
+    
+    def stream():
+        latest_score = Score.query.filter_by(user_id=user_id).order_by(Score.created_at.desc()).first()
+        if not latest_score:
+            yield sse_event({'message': NO_SCORE_MESSAGE}, event='failed')
+            return
+        
+        weak_subjects, strong_subjects = analyze_subjects(latest_score)
+        profile = recommendation_profile(latest_score, weak_subjects, strong_subjects)
+        cache_key = recommendation_cache_key(profile, recommendation_type)
+        
+        cached = get_cached_recommendation(cache_key)
+        if cached is not None:
+            for chunk in iter_text_chunks(cached):
+                yield sse_event({'delta': chunk})
+            yield sse_event({'cached': True, 'complete': True}, event='done')
+            return
+        
+        prompt = build_recommendation_prompt(profile, recommendation_type)
+        parts = []
+        completion = get_openrouter().stream_completion(
+            OPENROUTER_MODELS,
+            prompt,
+            first_chunk_timeout=app.config['AI_STREAM_FIRST_CHUNK_TIMEOUT'],
+            timeout=app.config['AI_DEADLINE']
+        )
+        for chunk in completion:
+            parts.append(chunk)
+            yield sse_event({'delta': chunk})
+        
+        if parts and not completion.complete:
+            # Cut off mid-answer: the client keeps what it got, but it is neither cached nor saved
+            yield sse_event({'cached': False, 'complete': False}, event='done')
+            return
+        if parts:
+            recommendation = ''.join(parts)
+            recommendation_cache.set(cache_key, recommendation)
+        else:
+            # Fallback text is saved for history but never served from the cache
+            cache_key = None
+            recommendation = generate_fallback_recommendation(latest_score, recommendation_type, weak_subjects, strong_subjects)
+            for chunk in iter_text_chunks(recommendation):
+                yield sse_event({'delta': chunk})
+        
+        save_recommendation(user_id, recommendation_type, recommendation, cache_key)
+        yield sse_event({'cached': False, 'complete': True}, event='done')
+    
+    return Response(stream_with_context(stream()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def run_recommendation_job(job_id):
+    """Job handler: claim a pending job, generate its recommendation and store the result"""
+    claimed = RecommendationJob.query.filter_by(id=job_id, status='pending').update({
+        'status': 'running',
+        'attempts': RecommendationJob.attempts + 1,
+        'started_at': datetime.utcnow()
+    }, synchronize_session=False)
+    db.session.commit()
+    if not claimed:
+        # Another worker took it, or it already finished
+        return
+    
+    job = db.session.get(RecommendationJob, job_id)
+    try:
+        recommendation, _ = generate_recommendation(job.user_id, job.recommendation_type)
+        job.status = 'done' if recommendation is not None else 'failed'
+        job.result = recommendation if recommendation is not None else NO_SCORE_MESSAGE
+    except Exception as e:
+        db.session.rollback()
+        job = db.session.get(RecommendationJob, job_id)
+        job.status = 'failed'
+        job.result = 'Öneri sistemi geçici olarak kullanılamıyor. Lütfen daha sonra tekrar deneyin.'
+        print(f"Recommendation job {job_id} error: {e}")
+    job.finished_at = datetime.utcnow()
+    db.session.commit()
+
+recommendation_jobs = JobRunner(app, run_recommendation_job, max_workers=app.config['AI_JOB_WORKERS'], name='ai-jobs')
+
+def job_lease_cutoff():
+    """Jobs running since before this have outlived their lease; their worker is presumed dead"""
+    return datetime.utcnow() - timedelta(seconds=app.config['AI_JOB_LEASE'])
+
+def resume_stale_jobs():
+    """Requeue jobs left pending or stuck running by a restarted worker"""
+    RecommendationJob.query.filter(
+        RecommendationJob.status == 'running',
+        RecommendationJob.started_at < job_lease_cutoff()
+    ).update({'status': 'pending'}, synchronize_session=False)
+    db.session.commit()
+    
+    for (job_id,) in db.session.query(RecommendationJob.id).filter_by(status='pending'):
+        recommendation_jobs.submit(job_id)
+
+def reclaim_expired_job(job):
+    """Put a job back to pending once its lease has run out, so a killed worker cannot hold it forever"""
+    if job.status == 'running' and job.started_at is not None and job.started_at < job_lease_cutoff():
+        # Only if nobody finished or reclaimed it meanwhile
+        RecommendationJob.query.filter_by(id=job.id, status='running', started_at=job.started_at).update(
+            {'status': 'pending'}, synchronize_session=False)
+        db.session.commit()
+        db.session.refresh(job)
+    return job
+
+def serialize_job(job):
+    return {
+        'id': job.id,
+        'type': job.recommendation_type,
+        'status': job.status,
+        'recommendation': job.result if job.status in ('done', 'failed') else None
+    }
+
+@app.route('/ai-recommendations/jobs', methods=['POST'])
+@login_required
+def create_recommendation_job():
+    try:
+        data = request.get_json(silent=True) or {}
+        recommendation_type = data.get('type', request.args.get('type', 'study_plan'))
+        
+        # Reuse the user's in-flight job for the same type
+        job = RecommendationJob.query.filter(
+            RecommendationJob.user_id == session['user_id'],
+            RecommendationJob.recommendation_type == recommendation_type,
+            RecommendationJob.status.in_(('pending', 'running'))
+        ).first()
+        
+        if not job:
+            job = RecommendationJob(user_id=session['user_id'], recommendation_type=recommendation_type)
+            db.session.add(job)
+            db.session.commit()
+        else:
+            reclaim_expired_job(job)
+        
+        if job.status == 'pending':
+            recommendation_jobs.submit(job.id)
+        
+        return jsonify({'success': True, 'job': serialize_job(job)}), 202
+    except Exception as e:
+        db.session.rollback()
+        print(f"Recommendation job error: {e}")
+        return jsonify({'success': False, 'message': 'Öneri isteği oluşturulamadı'})
+
+def get_user_job(job_id):
+    return RecommendationJob.query.filter_by(id=job_id, user_id=session['user_id']).first()
+
+@app.route('/ai-recommendations/jobs/<int:job_id>')
+@login_required
+def recommendation_job_status(job_id):
+    job = get_user_job(job_id)
+    if not job:
+        return jsonify({'success': False, 'message': 'İş bulunamadı'}), 404
+    
+    reclaim_expired_job(job)
+    if job.status == 'pending':
+        # Pick up jobs orphaned by a worker restart
+        recommendation_jobs.submit(job.id)
+    
+    return jsonify({'success': True, 'job': serialize_job(job)})
+
+job_streams = threading.BoundedSemaphore(app.config['AI_JOB_STREAMS'])
+
+@app.route('/ai-recommendations/jobs/<int:job_id>/events')
+@login_required
+def recommendation_job_events(job_id):
+    """Server-Sent Events stream that emits the job once it has finished
+
+    Open streams are capped per worker (AI_JOB_STREAMS) and in time
+    (AI_JOB_STREAM_SECONDS); past either the client gets a 'timeout' event
+    and polls the job instead.
+    """
+    job = get_user_job(job_id)
+    if not job:
+        return jsonify({'success': False, 'message': 'İş bulunamadı'}), 404
+    
+    user_id = session['user_id']
+    reclaim_expired_job(job)
+    if job.status == 'pending':
+        recommendation_jobs.submit(job.id)
+    
+    def stream():
+        if not job_streams.acquire(blocking=False):
+            yield f"event: timeout\ndata: {json.dumps({'id': job_id})}\n\n"
+            return
+        try:
+            deadline = time.monotonic() + app.config['AI_JOB_STREAM_SECONDS']
+            while time.monotonic() < deadline:
+                with app.app_context():
+                    current = RecommendationJob.query.filter_by(id=job_id, user_id=user_id).first()
+                    payload = serialize_job(current)
+                if payload['status'] in ('done', 'failed'):
+                    yield f"event: done\ndata: {json.dumps(payload)}\n\n"
+                    return
+                yield f": {payload['status']}\n\n"
+                time.sleep(0.5)
+            yield f"event: timeout\ndata: {json.dumps({'id': job_id})}\n\n"
+        finally:
+            job_streams.release()
+    
+    return Response(stream(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/ai-recommendations/cache-stats')
+@admin_required
+def ai_recommendation_cache_stats():
+    return jsonify({
+        'success': True,
+        **recommendation_cache_stats,
+        'memory': recommendation_cache.stats()
+    })
+
+@app.route('/ai-recommendations/client-stats')
+@admin_required
+def ai_client_stats():
+    return jsonify({
+        'success': True,
+        **get_openrouter().metrics()
+    })
+
+@app.route('/cache-stats')
+@admin_required
+def cache_stats():
+    """Hit ratio of this worker's per-user response cache (304s count as hits)"""
+    stats = response_cache.stats()
+    not_modified = response_cache_stats['not_modified']
+    requests_served = stats['hits'] + stats['misses'] + not_modified
+    return jsonify({
+        'success': True,
+        'response_cache': {
+            **stats,
+            'not_modified': not_modified,
+            'overall_hit_ratio': round((stats['hits'] + not_modified) / requests_served, 4) if requests_served else 0.0
+        }
+    })
+
+@app.route('/hash-stats')
+@admin_required
+def hash_stats():
+    """Password hashing load in this worker: calls, rejections, queue and hash times per route"""
+    return jsonify({
+        'success': True,
+        **password_hasher.metrics()
+    })
+
+# Columns the study statistics are folded from
+STUDY_STATS_COLUMNS = [StudySession.user_id, StudySession.subject, StudySession.duration_minutes, StudySession.created_at]
+
+# Columns the analytics aggregates are folded from
+ANALYTICS_COLUMNS = [Score.user_id, Score.total_score, Score.created_at] + [getattr(Score, f'{subject}_dogru') for subject in SUBJECTS]
+
+def rebuild_user_analytics(user_id):
+    """Recompute a user's analytics aggregate from their full score history"""
+    scores = db.session.execute(
+        sa.select(*ANALYTICS_COLUMNS).where(Score.user_id == user_id).order_by(Score.created_at.asc(), Score.id.asc())
+    )
+    aggregate = build_aggregate(scores, app.config['ANALYTICS_WINDOW'])
+    row = db.session.get(UserAnalytics, user_id)
+    if row is None:
+        row = UserAnalytics(user_id=user_id, data=aggregate)
+        db.session.add(row)
+    else:
+        row.data = aggregate
+    return row
+
+def record_score_analytics(score):
+    """Fold a flushed score into its user's aggregate inside the caller's transaction"""
+    row = db.session.get(UserAnalytics, score.user_id, with_for_update=True)
+    if row is None or not is_in_order(row.data, score.created_at):
+        # No aggregate yet, or a back-dated score: recompute from history once
+        return rebuild_user_analytics(score.user_id)
+    row.data = apply_score(row.data, score, app.config['ANALYTICS_WINDOW'])
+    return row
+
+def rebuild_user_study_stats(user_id):
+    """Recompute a user's study statistics from their full session history"""
+    study_sessions = db.session.execute(
+        sa.select(*STUDY_STATS_COLUMNS).where(StudySession.user_id == user_id)
+        .order_by(StudySession.created_at.asc(), StudySession.id.asc())
+    )
+    stats = build_stats(study_sessions, app.config['STUDY_STATS_DAYS'], app.config['STUDY_DAY_UTC_OFFSET'])
+    row = db.session.get(UserStudyStats, user_id)
+    if row is None:
+        row = UserStudyStats(user_id=user_id, data=stats)
+        db.session.add(row)
+    else:
+        row.data = stats
+    return row
+
+def record_study_stats(study_session):
+    """Fold a flushed study session into its user's statistics inside the caller's transaction"""
+    row = db.session.get(UserStudyStats, study_session.user_id, with_for_update=True)
+    if row is None or not is_session_in_order(row.data, study_session.created_at):
+        return rebuild_user_study_stats(study_session.user_id)
+    row.data = apply_session(row.data, study_session, app.config['STUDY_STATS_DAYS'], app.config['STUDY_DAY_UTC_OFFSET'])
+    return row
+
+# Columns forecast states are folded from, in iter_state_batches order
+FORECAST_COLUMNS = [Score.user_id, Score.total_score, Score.created_at] + [
+    sa.func.coalesce(getattr(Score, column), 0).label(column) for column in BATCH_COLUMNS]
+
+def forecast_target(user_id):
+    """Date a user's score is forecast for: their active study plan's target, else the exam date"""
+    target = db.session.scalar(sa.select(StudyPlan.target_date).where(StudyPlan.user_id == user_id, StudyPlan.is_active).limit(1))
+    return target or default_forecast_target()
+
+def default_forecast_target():
+    if app.config['LGS_EXAM_DATE']:
+        return datetime.strptime(app.config['LGS_EXAM_DATE'], '%Y-%m-%d').date()
+    return default_target_date(local_today())
+
+def project_forecast(state, target_date):
+    return forecast_payload(state, target_date, app.config['FORECAST_DAMPING_DAYS'], app.config['FORECAST_CONFIDENCE'])
+
+def store_forecast(user_id, data, row=None):
+    if row is None:
+        row = UserForecast(user_id=user_id, data=data)
+        db.session.add(row)
+    else:
+        row.data = data
+    return row
+
+def rebuild_user_forecast(user_id):
+    """Recompute a user's forecast state from their full score history"""
+    state = new_forecast_state()
+    for score in db.session.execute(sa.select(*FORECAST_COLUMNS).where(Score.user_id == user_id)):
+        state = apply_forecast_score(state, score, app.config['FORECAST_HALF_LIFE_DAYS'])
+    target_date = forecast_target(user_id)
+    data = {'target_date': target_date.isoformat(), 'state': state, 'forecast': project_forecast(state, target_date)}
+    return store_forecast(user_id, data, db.session.get(UserForecast, user_id))
+
+def record_score_forecast(score):
+    """Fold a flushed score into its user's forecast state and re-project it inside the caller's transaction"""
+    row = db.session.get(UserForecast, score.user_id, with_for_update=True)
+    if row is None:
+        return rebuild_user_forecast(score.user_id)
+    state = apply_forecast_score(row.data['state'], score, app.config['FORECAST_HALF_LIFE_DAYS'])
+    target_date = datetime.strptime(row.data['target_date'], '%Y-%m-%d').date()
+    row.data = {'target_date': row.data['target_date'], 'state': state, 'forecast': project_forecast(state, target_date)}
+    return row
+
+def retarget_forecast(user_id, target_date):
+    """Re-project a user's stored forecast for a new target date (a new study plan)"""
+    row = db.session.get(UserForecast, user_id, with_for_update=True)
+    if row is None:
+        return rebuild_user_forecast(user_id)
+    state = row.data['state']
+    row.data = {'target_date': target_date.isoformat(), 'state': state, 'forecast': project_forecast(state, target_date)}
+    return row
+
+def user_analytics(user_id):
+    """Stored analytics aggregate of a user, built once for users from before aggregates existed"""
+    row = db.session.get(UserAnalytics, user_id)
+    if row is None:
+        # The build writes, so it reads the history (and a row the replica has not caught up with) from the primary
+        g.use_replica = False
+        row = rebuild_user_analytics(user_id)
+        db.session.commit()
+    return row.data
+
+def user_forecast(user_id):
+    """Stored forecast of a user (None without scores), built once for users from before forecasts existed"""
+    row = db.session.get(UserForecast, user_id)
+    if row is None:
+        g.use_replica = False
+        row = rebuild_user_forecast(user_id)
+        db.session.commit()
+    return row.data['forecast']
+
+# Achievement rule events for each kind of new row (see achievements.RULES)
+ACHIEVEMENT_EVENTS = {Score: 'score', MockExam: 'mock_exam', StudySession: 'study_session'}
+earned_achievements = TTLCache(maxsize=app.config['ACHIEVEMENT_CACHE_SIZE'], ttl=app.config['ACHIEVEMENT_CACHE_TTL'])
+
+def score_context(score, aggregate):
+    """Achievement context of a flushed score: the user's score count and the score before it in (created_at, id) order
+
+    That is the order analytics.is_in_order and the badge backfill use, so a
+    back-dated score is compared with the score that precedes it in time,
+    not with the latest one.
+    """
+    recent = aggregate['recent']
+    if is_in_order(aggregate, score.created_at):
+        # The score is the last one folded into the aggregate
+        return ScoreContext(aggregate['count'], recent[-2]['score'] if len(recent) > 1 else None)
+    previous_score = db.session.scalar(
+        sa.select(Score.total_score).where(
+            Score.user_id == score.user_id,
+            sa.or_(Score.created_at < score.created_at, sa.and_(Score.created_at == score.created_at, Score.id < score.id))
+        ).order_by(Score.created_at.desc(), Score.id.desc()).limit(1)
+    )
+    return ScoreContext(aggregate['count'], previous_score)
+
+def award_achievements(rows, contexts):
+    """Evaluate every achievement rule for new rows in one pass and insert the badges they earn in one statement
+
+    Earned sets come from the per-worker bitset cache; users missing from it
+    are loaded together in one query. Returns the updated bitsets, which the
+    caller caches once the transaction has committed.
+    """
+    events = sorted(((row, ACHIEVEMENT_EVENTS[type(row)]) for row in rows if type(row) in ACHIEVEMENT_EVENTS),
+                    key=lambda event: event[0].created_at)
+    if not events:
+        return {}
+    masks = {}
+    for user_id in {row.user_id for row, _ in events}:
+        masks[user_id] = earned_achievements.get(user_id)
+    missing = [user_id for user_id, mask in masks.items() if mask is None]
+    if missing:
+        loaded = load_masks(db.session.connection(), Achievement.__table__, missing)
+        for user_id in missing:
+            masks[user_id] = loaded.get(user_id, 0)
+
+    badges = []
+    for row, event in events:
+        new = evaluate(event, row, contexts.get(row), masks[row.user_id])
+        if new:
+            masks[row.user_id] |= new
+            badges.extend(badge_rows(row.user_id, new, row.created_at))
+    if badges:
+        insert_badges(db.session.connection(), Achievement.__table__, badges)
+        # Core inserts skip the after_flush hook, and study sessions alone would not bump the version
+        bump_data_versions(db.session.connection(), {badge['user_id'] for badge in badges})
+    return masks
+
+def commit_new_rows(rows):
+    """Insert new Score/StudySession/MockExam rows, their analytics, forecasts, study statistics and badges in one transaction"""
+    db.session.add_all(rows)
+    db.session.flush()
+    scores = sorted((row for row in rows if isinstance(row, Score)), key=lambda row: row.created_at)
+    contexts = {}
+    for score in scores:
+        contexts[score] = score_context(score, record_score_analytics(score).data)
+        record_score_forecast(score)
+    for study_session in sorted((row for row in rows if isinstance(row, StudySession)), key=lambda row: row.created_at):
+        contexts[study_session] = StudyContext(record_study_stats(study_session).data['streak'])
+    masks = award_achievements(rows, contexts)
+    db.session.commit()
+    for user_id, mask in masks.items():
+        earned_achievements.set(user_id, mask)
+    if scores:
+        percentile_index = get_percentile_index()
+        for score in scores:
+            percentile_index.add(score.total_score, score.created_at, score.id)
+        if _leaderboard is not None:
+            for score in scores:
+                _leaderboard.update(score.user_id, score.id, score.total_score, score.created_at)
+
+def write_behind_batch(batch):
+    """Group commit: every queued submission of the batch in a single transaction"""
+    try:
+        commit_new_rows([row for rows in batch for row in rows])
+    except Exception:
+        db.session.rollback()
+        raise
+
+write_buffer = None
+if app.config['WRITE_BEHIND'] in ('group', 'async'):
+    write_buffer = WriteBehindBuffer(
+        app, write_behind_batch,
+        max_batch=app.config['WRITE_BEHIND_BATCH'],
+        window=app.config['WRITE_BEHIND_WINDOW'],
+        maxsize=app.config['WRITE_BEHIND_QUEUE']
+    )
+    # Flush whatever is still queued when the worker shuts down
+    atexit.register(write_buffer.close)
+
+def save_new_rows(*rows):
+    """Persist rows now, or through the write-behind buffer when it is enabled
+
+    Timestamps are taken here so buffered rows keep their request time. A full
+    or stalled buffer falls back to a synchronous commit instead of blocking the
+    request; a group commit still running after WRITE_BEHIND_FLUSH_TIMEOUT
+    raises TimeoutError, as the rows may yet be written.
+    """
+    now = datetime.utcnow()
+    if 'replica' in app.config['SQLALCHEMY_BINDS']:
+        # Keeps this user's next reads on the primary (see read_replica)
+        session['last_write_at'] = time.time()
+    for row in rows:
+        if row.created_at is None:
+            row.created_at = now
+    if write_buffer is not None:
+        try:
+            write_buffer.submit(list(rows), wait=app.config['WRITE_BEHIND'] == 'group', timeout=0.05,
+                                flush_timeout=app.config['WRITE_BEHIND_FLUSH_TIMEOUT'])
+            return
+        except BufferUnavailable as e:
+            print(f"Write-behind unavailable ({e}), committing synchronously")
+    commit_new_rows(list(rows))
+
+@contextmanager
+def read_snapshot(reader):
+    """Transaction on reader in which every read sees the same snapshot; held for one rebuild chunk only"""
+    with reader.begin():
+        if reader.dialect.name == 'sqlite':
+            # pysqlite only opens transactions for writes
+            reader.exec_driver_sql('BEGIN')
+        yield reader
+
+def store_rebuilt_rows(table, rows, snapshot):
+    """Write one chunk of a bulk rebuild in its own transaction; returns (written, skipped)
+
+    rows are the rebuilt (user_id, data) of a range of users and snapshot the
+    {user_id: data} stored for them when their source rows were read. A row
+    that no longer matches its snapshot was written by a request meanwhile
+    and already holds newer data, so it is left as it is.
+    """
+    if not rows:
+        return 0, 0
+    if db.engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    chunk_users = table.c.user_id.between(rows[0][0], rows[-1][0])
+    current = dict(db.session.execute(sa.select(table.c.user_id, table.c.data).where(chunk_users).with_for_update()).all())
+    now = datetime.utcnow()
+    updates, inserts = [], []
+    for user_id, data in rows:
+        if current.get(user_id) != snapshot.get(user_id):
+            continue
+        if user_id in current:
+            updates.append({'rebuilt_user_id': user_id, 'data': data, 'updated_at': now})
+        else:
+            inserts.append({'user_id': user_id, 'data': data, 'updated_at': now})
+    if updates:
+        db.session.execute(sa.update(table).where(table.c.user_id == sa.bindparam('rebuilt_user_id')), updates)
+    if inserts:
+        # A row first stored after the lock above is newer than this one
+        db.session.execute(insert(table).on_conflict_do_nothing(), inserts)
+    db.session.commit()
+    return len(updates) + len(inserts), len(rows) - len(updates) - len(inserts)
+
+def rebuild_per_user(model, source_user_id, read_chunk, batch_size):
+    """Rebuild a per-user table (user_id, data) chunk by chunk without deleting it; returns the users written
+
+    Users are taken in id ranges covering about batch_size source rows.
+    read_chunk(reader, in_range) returns the rebuilt (user_id, data) rows of a
+    range in user order, in_range(column) being the range filter. It runs in
+    a short snapshot together with the read of the stored rows it replaces,
+    then the chunk is written and committed (see store_rebuilt_rows).
+    """
+    table = model.__table__
+    engine = db.engine
+    if engine.dialect.name == 'postgresql':
+        engine = engine.execution_options(isolation_level='REPEATABLE READ')
+    written = skipped = 0
+    after = 0
+    with engine.connect() as reader:
+        while True:
+            with read_snapshot(reader):
+                upto = reader.scalar(sa.select(source_user_id).where(source_user_id > after)
+                                     .order_by(source_user_id).offset(batch_size).limit(1))
+
+                def in_range(column):
+                    return column > after if upto is None else sa.and_(column > after, column <= upto)
+
+                rows = read_chunk(reader, in_range)
+                snapshot = dict(reader.execute(sa.select(table.c.user_id, table.c.data).where(in_range(table.c.user_id))).all())
+            chunk_written, chunk_skipped = store_rebuilt_rows(table, rows, snapshot)
+            written += chunk_written
+            skipped += chunk_skipped
+            if upto is None:
+                break
+            after = upto
+    bump_data_versions(db.session.connection())
+    db.session.commit()
+    if skipped:
+        print(f"Kept {skipped} {table.name} rows updated during the rebuild")
+    return written
+
+def rebuild_all_analytics(batch_size=5000):
+    """Recompute every user's aggregate in ordered passes over the Score table, batch_size scores at a time"""
+    window = app.config['ANALYTICS_WINDOW']
+
+    def read_chunk(reader, in_range):
+        scores = reader.execute(
+            sa.select(*ANALYTICS_COLUMNS).where(in_range(Score.user_id)).order_by(Score.user_id, Score.created_at, Score.id)
+        )
+        return [(user_id, build_aggregate(user_scores, window)) for user_id, user_scores in groupby(scores, key=lambda score: score.user_id)]
+
+    return rebuild_per_user(UserAnalytics, Score.user_id, read_chunk, batch_size)
+
+SAMPLE_ANALYTICS = {
+    'score_history': [
+        {'date': '2024-01-15', 'score': 320},
+        {'date': '2024-01-20', 'score': 350},
+        {'date': '2024-01-25', 'score': 380}
+    ],
+    'subject_performance': {
+        'turkce': {'average': 15, 'trend': 'up'},
+        'matematik': {'average': 12, 'trend': 'up'},
+        'fen': {'average': 14, 'trend': 'up'}
+    },
+    'improvement_trend': [
+        {'date': '2024-01-20', 'improvement': 30},
+        {'date': '2024-01-25', 'improvement': 30}
+    ]
+}
+
 @app.route('/analytics')
 @login_required
+@read_replica
+@cached_per_user
 def analytics():
     try:
         try:
-            user_scores = Score.query.filter_by(user_id=session['user_id']).order_by(Score.created_at.asc()).all()
-            
-            analytics_data = {
-                'success': True,
-                'score_history': [{'date': score.created_at.strftime('%Y-%m-%d'), 'score': score.total_score} for score in user_scores],
-                'subject_performance': {},
-                'improvement_trend': []
-            }
-            
-            if user_scores:
-                # Calculate subject performance
-                subjects = ['turkce', 'matematik', 'fen', 'inkilap', 'din', 'ingilizce']
-                for subject in subjects:
-                    scores = [getattr(score, f'{subject}_dogru', 0) for score in user_scores]
-                    analytics_data['subject_performance'][subject] = {
-                        'average': sum(scores) / len(scores) if scores else 0,
-                        'trend': 'up' if len(scores) > 1 and scores[-1] > scores[0] else 'down'
-                    }
-                
-                # Calculate improvement trend
-                if len(user_scores) > 1:
-                    for i in range(1, len(user_scores)):
-                        improvement = user_scores[i].total_score - user_scores[i-1].total_score
-                        analytics_data['improvement_trend'].append({
-                            'date': user_scores[i].created_at.strftime('%Y-%m-%d'),
-                            'improvement': improvement
-                        })
-            else:
-                # Return sample data if no scores
-                analytics_data.update({
-                    'score_history': [
-                        {'date': '2024-01-15', 'score': 320},
-                        {'date': '2024-01-20', 'score': 350},
-                        {'date': '2024-01-25', 'score': 380}
-                    ],
-                    'subject_performance': {
-                        'turkce': {'average': 15, 'trend': 'up'},
-                        'matematik': {'average': 12, 'trend': 'up'},
-                        'fen': {'average': 14, 'trend': 'up'}
-                    },
-                    'improvement_trend': [
-                        {'date': '2024-01-20', 'improvement': 30},
-                        {'date': '2024-01-25', 'improvement': 30}
-                    ]
-                })
-            
-            return jsonify(analytics_data)
+            # Users from before aggregates existed are built once, then reads stay O(1)
+            aggregate = user_analytics(session['user_id'])
+
+            if aggregate['count']:
+                return jsonify({**aggregate_payload(aggregate, app.config['ANALYTICS_WINDOW']),
+                                'forecast': user_forecast(session['user_id'])})
+
+            # Return sample data if no scores
+            return jsonify({'success': True, **SAMPLE_ANALYTICS})
             
         except Exception as db_error:
             print(f"Analytics query error: {db_error}")
+            db.session.rollback()
+            g.skip_response_cache = True
             # Return sample analytics data
             return jsonify({
                 'success': True,
@@ -618,6 +1906,124 @@ def analytics():
             'message': 'Analitik sistemi geçici olarak kullanılamıyor.'
         })
 
+@app.cli.command('rebuild-analytics')
+@click.option('--user-id', type=int, default=None, help='Yalnızca bu kullanıcının özetini yeniden oluştur')
+def rebuild_analytics_command(user_id):
+    """Recompute analytics aggregates from the Score table"""
+    if user_id is not None:
+        rebuild_user_analytics(user_id)
+        db.session.commit()
+        print(f"Rebuilt analytics for user {user_id}")
+    else:
+        print(f"Rebuilt analytics for {rebuild_all_analytics()} users")
+
+@app.cli.command('check-analytics')
+@click.option('--user-id', type=int, default=None, help='Yalnızca bu kullanıcıyı kontrol et')
+def check_analytics_command(user_id):
+    """Compare stored analytics aggregates with a full scan of each user's scores"""
+    window = app.config['ANALYTICS_WINDOW']
+    if user_id is not None:
+        user_ids = [user_id]
+    else:
+        user_ids = db.session.scalars(sa.select(Score.user_id).distinct().order_by(Score.user_id)).all()
+
+    mismatched = 0
+    for checked_user in user_ids:
+        user_scores = Score.query.filter_by(user_id=checked_user).order_by(Score.created_at.asc(), Score.id.asc()).all()
+        row = db.session.get(UserAnalytics, checked_user)
+        if row is None:
+            differences = ['aggregate missing'] if user_scores else []
+        elif row.data['count'] != len(user_scores):
+            differences = [f"count: {len(user_scores)} scores != {row.data['count']}"]
+        elif user_scores:
+            differences = compare_payloads(full_scan_payload(user_scores, window), aggregate_payload(row.data, window))
+        else:
+            differences = []
+
+        if differences:
+            mismatched += 1
+            print(f"User {checked_user}:")
+            for difference in differences[:10]:
+                print(f"  {difference}")
+
+    print(f"Checked {len(user_ids)} users, {mismatched} mismatched")
+    if mismatched:
+        raise click.ClickException('Analytics aggregates are out of date; run "flask rebuild-analytics"')
+
+def rebuild_all_forecasts(batch_size=65536):
+    """Nightly batch: refit every user's forecast in vectorized passes over the Score table, batch_size scores at a time
+
+    Each range of users' scores becomes per-user trend sums with numpy group
+    reductions and is projected to every user's target date at once. Like
+    the other rebuilds (see rebuild_per_user) a range is read in a short
+    snapshot and committed on its own, so no transaction spans the run and
+    it works in any journal mode; a forecast changed after its range was read
+    already holds newer data and is left as it is.
+    """
+    default_target = default_forecast_target()
+
+    def read_chunk(reader, in_range):
+        targets = dict(reader.execute(
+            sa.select(StudyPlan.user_id, StudyPlan.target_date).where(StudyPlan.is_active, in_range(StudyPlan.user_id))
+        ).all())
+        scores = reader.execute(
+            sa.select(*FORECAST_COLUMNS).where(in_range(Score.user_id)).order_by(Score.user_id, Score.created_at, Score.id)
+        )
+        rows = []
+        for states in iter_state_batches(scores, app.config['FORECAST_HALF_LIFE_DAYS'], batch_size):
+            target_dates = [targets.get(user_id, default_target) for user_id in states['user_id'].tolist()]
+            rows.extend(forecast_batch_rows(states, target_dates, app.config['FORECAST_DAMPING_DAYS'],
+                                            app.config['FORECAST_CONFIDENCE']))
+        return rows
+
+    return rebuild_per_user(UserForecast, Score.user_id, read_chunk, batch_size)
+
+@app.cli.command('rebuild-forecasts')
+@click.option('--user-id', type=int, default=None, help='Yalnızca bu kullanıcının tahminini yeniden oluştur')
+@click.option('--batch-size', type=int, default=65536, show_default=True, help='Tek vektörel adımda işlenen puan sayısı')
+def rebuild_forecasts_command(user_id, batch_size):
+    """Refit score forecasts from the Score table (run nightly)"""
+    if user_id is not None:
+        rebuild_user_forecast(user_id)
+        db.session.commit()
+        print(f"Rebuilt forecast for user {user_id}")
+    else:
+        start = time.perf_counter()
+        users = rebuild_all_forecasts(batch_size)
+        print(f"Rebuilt forecasts for {users} users in {time.perf_counter() - start:.1f}s")
+
+@app.cli.command('check-forecasts')
+@click.option('--user-id', type=int, default=None, help='Yalnızca bu kullanıcıyı kontrol et')
+def check_forecasts_command(user_id):
+    """Compare stored forecasts with a fit over each user's full score history"""
+    if user_id is not None:
+        user_ids = [user_id]
+    else:
+        user_ids = db.session.scalars(sa.select(Score.user_id).distinct().order_by(Score.user_id)).all()
+
+    mismatched = 0
+    for checked_user in user_ids:
+        user_scores = db.session.execute(sa.select(*FORECAST_COLUMNS).where(Score.user_id == checked_user)).all()
+        row = db.session.get(UserForecast, checked_user)
+        if row is None:
+            differences = ['forecast missing'] if user_scores else []
+        else:
+            target_date = datetime.strptime(row.data['target_date'], '%Y-%m-%d').date()
+            expected = full_scan_forecast(user_scores, target_date, app.config['FORECAST_HALF_LIFE_DAYS'],
+                                          app.config['FORECAST_DAMPING_DAYS'], app.config['FORECAST_CONFIDENCE'])
+            differences = compare_forecasts(expected, row.data['forecast'])
+            if target_date != forecast_target(checked_user):
+                differences.append(f"target_date: {forecast_target(checked_user)} != {target_date}")
+        if differences:
+            mismatched += 1
+            print(f"User {checked_user}:")
+            for difference in differences[:10]:
+                print(f"  {difference}")
+
+    print(f"Checked {len(user_ids)} users, {mismatched} mismatched")
+    if mismatched:
+        raise click.ClickException('Forecasts are out of date; run "flask rebuild-forecasts"')
+
 @app.route('/study-session', methods=['POST'])
 @login_required
 def log_study_session():
@@ -632,8 +2038,7 @@ def log_study_session():
             difficulty_level=data.get('difficulty', 'medium')
         )
         
-        db.session.add(session_log)
-        db.session.commit()
+        save_new_rows(session_log)
         
         return jsonify({'success': True, 'message': 'Çalışma seansı kaydedildi'})
         
@@ -641,8 +2046,87 @@ def log_study_session():
         db.session.rollback()
         return jsonify({'success': False, 'message': f'Kayıt hatası: {str(e)}'})
 
+@app.route('/study-stats')
+@login_required
+@read_replica
+@cached_per_user
+def study_stats():
+    """Study minutes per subject and per day, and current/longest streaks, from the stored statistics"""
+    try:
+        row = db.session.get(UserStudyStats, session['user_id'])
+        if row is None:
+            # Users from before statistics existed are built once, then reads stay O(1). The build writes, so
+            # it reads the sessions (and a row the replica has not caught up with) from the primary
+            g.use_replica = False
+            row = rebuild_user_study_stats(session['user_id'])
+            db.session.commit()
+        return jsonify(stats_payload(row.data, local_today(), app.config['STUDY_STATS_DAYS']))
+    except Exception as e:
+        print(f"Study stats error: {e}")
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': 'Çalışma istatistikleri geçici olarak kullanılamıyor.'
+        })
+
+def rebuild_all_study_stats(batch_size=5000):
+    """Recompute every user's study statistics in ordered passes over the StudySession table, batch_size sessions at a time"""
+    days, utc_offset = app.config['STUDY_STATS_DAYS'], app.config['STUDY_DAY_UTC_OFFSET']
+
+    def read_chunk(reader, in_range):
+        study_sessions = reader.execute(
+            sa.select(*STUDY_STATS_COLUMNS).where(in_range(StudySession.user_id))
+            .order_by(StudySession.user_id, StudySession.created_at, StudySession.id)
+        )
+        return [(user_id, build_stats(user_sessions, days, utc_offset))
+                for user_id, user_sessions in groupby(study_sessions, key=lambda study_session: study_session.user_id)]
+
+    return rebuild_per_user(UserStudyStats, StudySession.user_id, read_chunk, batch_size)
+
+@app.cli.command('rebuild-study-stats')
+@click.option('--user-id', type=int, default=None, help='Yalnızca bu kullanıcının istatistiklerini yeniden oluştur')
+def rebuild_study_stats_command(user_id):
+    """Recompute study statistics from the StudySession table"""
+    if user_id is not None:
+        rebuild_user_study_stats(user_id)
+        db.session.commit()
+        print(f"Rebuilt study statistics for user {user_id}")
+    else:
+        print(f"Rebuilt study statistics for {rebuild_all_study_stats()} users")
+
+@app.cli.command('check-study-stats')
+@click.option('--user-id', type=int, default=None, help='Yalnızca bu kullanıcıyı kontrol et')
+def check_study_stats_command(user_id):
+    """Compare stored study statistics with a full scan of each user's sessions"""
+    days, utc_offset = app.config['STUDY_STATS_DAYS'], app.config['STUDY_DAY_UTC_OFFSET']
+    today = local_today()
+    if user_id is not None:
+        user_ids = [user_id]
+    else:
+        user_ids = db.session.scalars(sa.select(StudySession.user_id).distinct().order_by(StudySession.user_id)).all()
+
+    mismatched = 0
+    for checked_user in user_ids:
+        user_sessions = StudySession.query.filter_by(user_id=checked_user).all()
+        row = db.session.get(UserStudyStats, checked_user)
+        if row is None:
+            differences = ['statistics missing'] if user_sessions else []
+        else:
+            differences = compare_study_payloads(full_scan_study_payload(user_sessions, today, days, utc_offset),
+                                                 stats_payload(row.data, today, days))
+        if differences:
+            mismatched += 1
+            print(f"User {checked_user}:")
+            for difference in differences[:10]:
+                print(f"  {difference}")
+
+    print(f"Checked {len(user_ids)} users, {mismatched} mismatched")
+    if mismatched:
+        raise click.ClickException('Study statistics are out of date; run "flask rebuild-study-stats"')
+
 @app.route('/school-recommendations')
 @login_required
+@read_replica
 def school_recommendations():
     try:
         user_score = request.args.get('score', type=float)
@@ -660,19 +2144,8 @@ def school_recommendations():
         
         # Get school recommendations based on score
         try:
-            target_schools = School.query.filter(
-                School.min_score <= user_score + 20,
-                School.min_score >= user_score - 50
-            ).order_by(School.min_score.desc()).limit(10).all()
-            
-            safe_schools = School.query.filter(
-                School.min_score <= user_score - 10
-            ).order_by(School.min_score.desc()).limit(5).all()
-            
-            reach_schools = School.query.filter(
-                School.min_score > user_score,
-                School.min_score <= user_score + 50
-            ).order_by(School.min_score.asc()).limit(5).all()
+            filters = {parameter: request.args.get(parameter) for parameter, _ in FILTER_FIELDS}
+            bands = get_school_index().recommend(user_score, filters)
         except Exception as db_error:
             print(f"School query error: {db_error}")
             # Return sample data if database query fails
@@ -694,12 +2167,7 @@ def school_recommendations():
         return jsonify({
             'success': True,
             'user_score': user_score,
-            'target_schools': [{'name': s.name, 'city': s.city, 'district': s.district,
-                              'type': s.school_type, 'min_score': s.min_score, 'quota': s.quota} for s in target_schools],
-            'safe_schools': [{'name': s.name, 'city': s.city, 'district': s.district,
-                            'type': s.school_type, 'min_score': s.min_score, 'quota': s.quota} for s in safe_schools],
-            'reach_schools': [{'name': s.name, 'city': s.city, 'district': s.district,
-                              'type': s.school_type, 'min_score': s.min_score, 'quota': s.quota} for s in reach_schools]
+            **bands
         })
     except Exception as e:
         print(f"School recommendations error: {e}")
@@ -708,8 +2176,43 @@ def school_recommendations():
             'error': 'Okul önerileri geçici olarak kullanılamıyor. Lütfen daha sonra tekrar deneyin.'
         })
 
+def serialize_mock_exam(e):
+    return {
+        'id': e.id,
+        'name': e.exam_name,
+        'total_questions': e.total_questions,
+        'correct_answers': e.correct_answers,
+        'wrong_answers': e.wrong_answers,
+        'empty_answers': e.empty_answers,
+        'time_spent': e.time_spent,
+        'date': e.created_at.strftime('%Y-%m-%d')
+    }
+
+def serialize_study_plan(plan):
+    return {
+        'id': plan.id,
+        'name': plan.plan_name,
+        'target_score': plan.target_score,
+        'target_date': plan.target_date.strftime('%Y-%m-%d'),
+        'daily_study_hours': plan.daily_study_hours,
+        'subjects_focus': plan.subjects_focus,
+        'created_at': plan.created_at.strftime('%Y-%m-%d')
+    }
+
+def serialize_achievement(a):
+    return {
+        'id': a.id,
+        'type': a.achievement_type,
+        'title': a.title,
+        'description': a.description,
+        'badge_icon': a.badge_icon,
+        'earned_at': a.earned_at.strftime('%Y-%m-%d')
+    }
+
 @app.route('/mock-exam', methods=['GET', 'POST'])
 @login_required
+@read_replica
+@cached_per_user
 def mock_exam():
     try:
         if request.method == 'POST':
@@ -727,8 +2230,7 @@ def mock_exam():
                     time_spent=data.get('time_spent', 0),
                     subject_scores=data.get('subject_scores', {})
                 )
-                db.session.add(mock_exam)
-                db.session.commit()
+                save_new_rows(mock_exam)
                 
                 return jsonify({'success': True, 'message': 'Deneme sınavı kaydedildi'})
             except Exception as db_error:
@@ -741,19 +2243,11 @@ def mock_exam():
             
             return jsonify({
                 'success': True,
-                'exams': [{
-                    'id': e.id,
-                    'name': e.exam_name,
-                    'total_questions': e.total_questions,
-                    'correct_answers': e.correct_answers,
-                    'wrong_answers': e.wrong_answers,
-                    'empty_answers': e.empty_answers,
-                    'time_spent': e.time_spent,
-                    'date': e.created_at.strftime('%Y-%m-%d')
-                } for e in exams]
+                'exams': [serialize_mock_exam(e) for e in exams]
             })
         except Exception as db_error:
             print(f"Mock exam query error: {db_error}")
+            g.skip_response_cache = True
             return jsonify({
                 'success': True,
                 'exams': [
@@ -770,6 +2264,7 @@ def mock_exam():
 
 @app.route('/study-plan', methods=['GET', 'POST'])
 @login_required
+@cached_per_user
 def study_plan():
     try:
         if request.method == 'POST':
@@ -790,6 +2285,7 @@ def study_plan():
                     is_active=True
                 )
                 db.session.add(plan)
+                retarget_forecast(session['user_id'], plan.target_date)
                 db.session.commit()
                 
                 return jsonify({'success': True, 'message': 'Çalışma planı oluşturuldu'})
@@ -805,15 +2301,7 @@ def study_plan():
             if active_plan:
                 return jsonify({
                     'success': True,
-                    'plan': {
-                        'id': active_plan.id,
-                        'name': active_plan.plan_name,
-                        'target_score': active_plan.target_score,
-                        'target_date': active_plan.target_date.strftime('%Y-%m-%d'),
-                        'daily_study_hours': active_plan.daily_study_hours,
-                        'subjects_focus': active_plan.subjects_focus,
-                        'created_at': active_plan.created_at.strftime('%Y-%m-%d')
-                    }
+                    'plan': serialize_study_plan(active_plan)
                 })
             else:
                 # Return sample plan if no active plan
@@ -838,6 +2326,7 @@ def study_plan():
                 })
         except Exception as db_error:
             print(f"Study plan query error: {db_error}")
+            g.skip_response_cache = True
             return jsonify({
                 'success': True,
                 'plan': {
@@ -866,23 +2355,19 @@ def study_plan():
 
 @app.route('/achievements')
 @login_required
+@read_replica
+@cached_per_user
 def achievements():
     try:
         try:
             user_achievements = Achievement.query.filter_by(user_id=session['user_id']).order_by(Achievement.earned_at.desc()).all()
             return jsonify({
                 'success': True,
-                'achievements': [{
-                    'id': a.id,
-                    'type': a.achievement_type,
-                    'title': a.title,
-                    'description': a.description,
-                    'badge_icon': a.badge_icon,
-                    'earned_at': a.earned_at.strftime('%Y-%m-%d')
-                } for a in user_achievements]
+                'achievements': [serialize_achievement(a) for a in user_achievements]
             })
         except Exception as db_error:
             print(f"Achievement query error: {db_error}")
+            g.skip_response_cache = True
             # Return sample achievements
             return jsonify({
                 'success': True,
@@ -899,54 +2384,52 @@ def achievements():
             'message': 'Başarılar sistemi geçici olarak kullanılamıyor.'
         })
 
-def check_achievements(user_id, action_type, data):
-    """Check and award achievements based on user actions"""
-    achievements_to_add = []
-    
-    if action_type == 'score_calculation':
-        score = data.get('total_score', 0)
-        if score >= 450:
-            achievements_to_add.append({
-                'type': 'high_score',
-                'title': 'Yüksek Puan Ustası',
-                'description': '450+ puan aldınız! Harika bir başarı!',
-                'badge_icon': 'fas fa-trophy'
-            })
-        elif score >= 400:
-            achievements_to_add.append({
-                'type': 'good_score',
-                'title': 'İyi Puan',
-                'description': '400+ puan aldınız! Çok iyi gidiyorsunuz!',
-                'badge_icon': 'fas fa-medal'
-            })
-    
-    elif action_type == 'mock_exam':
-        correct_answers = data.get('correct_answers', 0)
-        if correct_answers >= 80:
-            achievements_to_add.append({
-                'type': 'mock_master',
-                'title': 'Deneme Ustası',
-                'description': '80+ doğru cevap! Mükemmel performans!',
-                'badge_icon': 'fas fa-star'
-            })
-    
-    # Add achievements to database
-    for achievement_data in achievements_to_add:
-        # Check if user already has this achievement
-        existing = Achievement.query.filter_by(
-            user_id=user_id,
-            achievement_type=achievement_data['type']
-        ).first()
-        
-        if not existing:
-            achievement = Achievement(
-                user_id=user_id,
-                achievement_type=achievement_data['type'],
-                title=achievement_data['title'],
-                description=achievement_data['description'],
-                badge_icon=achievement_data['badge_icon']
-            )
-            db.session.add(achievement)
+@app.route('/dashboard/data')
+@login_required
+@read_replica
+@cached_per_user
+def dashboard_data():
+    """Everything the dashboard shows after page load, read in one session instead of one request per panel"""
+    user_id = session['user_id']
+    try:
+        aggregate = user_analytics(user_id)
+        if aggregate['count']:
+            analytics_data = {**aggregate_payload(aggregate, app.config['ANALYTICS_WINDOW']), 'forecast': user_forecast(user_id)}
+        else:
+            analytics_data = {**SAMPLE_ANALYTICS, 'summary': None, 'forecast': None}
+
+        active_plan = StudyPlan.query.filter_by(user_id=user_id, is_active=True).first()
+        exams = (MockExam.query.filter_by(user_id=user_id).order_by(MockExam.created_at.desc())
+                 .limit(app.config['DASHBOARD_RECENT_EXAMS']).all())
+        user_achievements = Achievement.query.filter_by(user_id=user_id).order_by(Achievement.earned_at.desc()).all()
+
+        return jsonify({
+            **analytics_data,
+            'success': True,
+            'plan': serialize_study_plan(active_plan) if active_plan else None,
+            'exams': [serialize_mock_exam(e) for e in exams],
+            'achievements': [serialize_achievement(a) for a in user_achievements]
+        })
+    except Exception as e:
+        print(f"Dashboard data error: {e}")
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': 'Panel verileri geçici olarak kullanılamıyor.'
+        })
+
+@app.cli.command('backfill-achievements')
+@click.option('--batch-size', type=int, default=5000, show_default=True, help='Akış halinde okunan ve toplu eklenen satır sayısı')
+def backfill_achievements_command(batch_size):
+    """Award the badges earned by all stored scores, mock exams and study sessions"""
+    tables = {event: model.__table__ for model, event in ACHIEVEMENT_EVENTS.items()}
+    with db.engine.begin() as connection:
+        awarded = backfill_badges(connection, tables, Achievement.__table__, batch_size, app.config['STUDY_DAY_UTC_OFFSET'])
+        bump_data_versions(connection)
+    earned_achievements.clear()
+    for achievement_type, count in awarded.items():
+        print(f"{achievement_type:<16} {count}")
+    print(f"Awarded {sum(awarded.values())} achievements")
 
 def populate_sample_schools():
     """Populate database with sample schools"""
@@ -975,6 +2458,117 @@ def populate_sample_schools():
         
         db.session.commit()
 
+def sync_school_catalog(force=False):
+    """Upsert the compiled school catalog by school code unless its version is already loaded
+
+    Schools keep their id across catalog versions: a code already in the table
+    updates that row, new codes are inserted and schools missing from the
+    catalog (or without a code) are deleted.
+    """
+    path = app.config['SCHOOL_CATALOG']
+    version = catalog_version(path)
+    start = time.perf_counter()
+    schools = School.__table__
+    with db.engine.begin() as connection:
+        loaded = connection.scalar(sa.select(SchoolCatalog.version).order_by(SchoolCatalog.id.desc()).limit(1))
+        if loaded == version and not force:
+            return False
+        # One transaction; readers see the old or the new catalog
+        _, rows = load_catalog(path)
+        existing_ids = defaultdict(list)
+        last_id = 0
+        for school_id, code in connection.execute(sa.select(schools.c.id, schools.c.code).order_by(schools.c.id)):
+            existing_ids[code].append(school_id)
+            last_id = school_id
+        updates, inserts = [], []
+        for row in rows:
+            if row['code'] and existing_ids[row['code']]:
+                updates.append({**row, 'school_id': existing_ids[row['code']].pop(0)})
+            else:
+                inserts.append(row)
+        if updates:
+            connection.execute(schools.update().where(schools.c.id == sa.bindparam('school_id')), updates)
+        if inserts:
+            connection.execute(schools.insert(), inserts)
+        # Deleted after the inserts so SQLite does not hand a removed school's id to a new one
+        kept_ids = [row['school_id'] for row in updates]
+        connection.execute(sa.delete(schools).where(schools.c.id <= last_id, schools.c.id.not_in(kept_ids)))
+        connection.execute(SchoolCatalog.__table__.insert().values(version=version, school_count=len(rows)))
+    print(f"Loaded school catalog {version[:12]} ({len(updates)} updated, {len(inserts)} added) in {time.perf_counter() - start:.2f}s")
+    return True
+
+@app.cli.command('build-school-catalog')
+@click.argument('source', type=click.Path(exists=True, dir_okay=False))
+@click.option('--output', type=click.Path(dir_okay=False), default=None, help='Derlenmiş katalog (varsayılan: SCHOOL_CATALOG)')
+def build_school_catalog_command(source, output):
+    """Compile a CSV/JSON school catalog and load it into the School table"""
+    output = output or app.config['SCHOOL_CATALOG']
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    try:
+        version, count = build_catalog(source, output)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    print(f"Compiled {count} schools to {output} (version {version[:12]})")
+    if os.path.abspath(output) == os.path.abspath(app.config['SCHOOL_CATALOG']):
+        sync_school_catalog()
+        load_school_index()
+
+@app.cli.command('load-school-catalog')
+@click.option('--force', is_flag=True, help='Sürüm aynı olsa bile yeniden yükle')
+def load_school_catalog_command(force):
+    """Load the compiled school catalog into the School table"""
+    if not os.path.exists(app.config['SCHOOL_CATALOG']):
+        raise click.ClickException(f"Catalog not found: {app.config['SCHOOL_CATALOG']}")
+    if not sync_school_catalog(force=force):
+        print('School catalog is up to date')
+
+@app.cli.command('simulate-placement')
+@click.argument('cohort', type=click.Path(exists=True, dir_okay=False))
+@click.option('--output', type=click.Path(dir_okay=False), default=None, help='Tahmini taban puanları CSV dosyası (varsayılan: ekrana)')
+@click.option('--by-region', is_flag=True, help='Her ili ayrı bir süreçte bağımsız pazar olarak simüle et')
+@click.option('--processes', type=int, default=None, help='Bölgesel simülasyon için süreç sayısı')
+def simulate_placement_command(cohort, output, by_region, processes):
+    """Place a cohort (score, tercih_1..tercih_N school codes) and predict school cutoffs"""
+    schools = db.session.execute(sa.select(School.id, School.code, School.name, School.city, School.quota).order_by(School.id)).all()
+    # Preferences may name schools by catalog code or by id
+    school_index = {str(school.id): index for index, school in enumerate(schools)}
+    school_index.update({school.code: index for index, school in enumerate(schools) if school.code})
+
+    scores, preferences = [], []
+    with open(cohort, encoding='utf-8-sig', newline='') as f:
+        reader = csv.DictReader(f)
+        columns = sorted((column for column in reader.fieldnames if column.startswith('tercih_')), key=lambda column: int(column[7:]))
+        for number, row in enumerate(reader, start=1):
+            try:
+                scores.append(float(row['score']))
+            except (KeyError, TypeError, ValueError):
+                raise click.ClickException(f'Aday satırı {number} geçersiz: puan yok')
+            choices = [school_index.get(row[column].strip(), NO_SCHOOL) for column in columns if row[column]]
+            preferences.append([choice for choice in choices if choice != NO_SCHOOL])
+
+    width = max((len(choices) for choices in preferences), default=0)
+    preference_array = np.full((len(preferences), max(1, width)), NO_SCHOOL, dtype=np.int32)
+    for student, choices in enumerate(preferences):
+        preference_array[student, :len(choices)] = choices
+
+    start = time.perf_counter()
+    result = simulate_placement(scores, preference_array, [school.quota for school in schools],
+                                school_regions=[school.city for school in schools] if by_region else None,
+                                processes=processes)
+    print(f"Placed {len(scores) - result['unplaced']} of {len(scores)} students in {time.perf_counter() - start:.1f}s")
+
+    stream = open(output, 'w', encoding='utf-8', newline='') if output else sys.stdout
+    try:
+        writer = csv.writer(stream)
+        writer.writerow(['code', 'name', 'city', 'quota', 'placed', 'predicted_cutoff'])
+        for index, school in enumerate(schools):
+            cutoff = result['cutoffs'][index]
+            writer.writerow([school.code or school.id, school.name, school.city, school.quota,
+                             int(result['placed'][index]), '' if np.isnan(cutoff) else f'{cutoff:.2f}'])
+    finally:
+        if output:
+            stream.close()
+
 # Initialize database
 def create_tables():
     with app.app_context():
@@ -1033,25 +2627,117 @@ def sitemap_xml():
     
     return Response(sitemap_xml, mimetype='application/xml')
 
-# Initialize database on app startup (for both dev and production)
+# Versioned schema changes for existing databases; fresh ones get the same schema from create_all.
+# Every column or index added to a model after the first deploy needs a migration here.
+schema_migrations = Migrations()
+
+@schema_migrations.register(1, 'indexes for per-user query patterns')
+def per_user_indexes(connection):
+    create_index(connection, 'ix_score_user_created', 'score', ['user_id', 'created_at'])
+    create_index(connection, 'ix_study_session_user_created', 'study_session', ['user_id', 'created_at'])
+    create_index(connection, 'ix_recommendation_job_user_type_status', 'recommendation_job', ['user_id', 'recommendation_type', 'status'])
+    create_index(connection, 'ix_school_min_score', 'school', ['min_score'])
+    create_index(connection, 'ix_mock_exam_user_created', 'mock_exam', ['user_id', 'created_at'])
+    create_index(connection, 'ix_study_plan_user_active', 'study_plan', ['user_id', 'is_active'])
+    # Made unique by migration 3, once duplicate badges are gone
+    create_index(connection, 'ix_achievement_user_type', 'achievement', ['user_id', 'achievement_type'])
+
+@schema_migrations.register(2, 'school catalog code index')
+def school_code_index(connection):
+    add_column(connection, 'school', 'code', sa.String(20))
+    add_column(connection, 'school', 'cutoffs', sa.JSON())
+    create_index(connection, 'ix_school_code', 'school', ['code'])
+
+@schema_migrations.register(3, 'unique achievement per user and type')
+def unique_achievements(connection):
+    """Drop duplicate badges (keeping the first) and make the user/type index unique"""
+    achievements = sa.table('achievement', sa.column('id'), sa.column('user_id'), sa.column('achievement_type'))
+    first_ids = sa.select(sa.func.min(achievements.c.id)).group_by(achievements.c.user_id, achievements.c.achievement_type)
+    connection.execute(sa.delete(achievements).where(achievements.c.id.not_in(first_ids)))
+    drop_index(connection, 'ix_achievement_user_type')
+    create_index(connection, 'ix_achievement_user_type', 'achievement', ['user_id', 'achievement_type'], unique=True)
+
+@schema_migrations.register(4, 'ai recommendation cache key index')
+def recommendation_cache_key_index(connection):
+    add_column(connection, 'ai_recommendation', 'cache_key', sa.String(64))
+    create_index(connection, 'ix_ai_recommendation_cache_key', 'ai_recommendation', ['cache_key'])
+
+@schema_migrations.register(5, 'user data version')
+def user_data_version_column(connection):
+    add_column(connection, 'user', 'data_version', sa.Integer())
+
+@schema_migrations.register(6, 'user city')
+def user_city_column(connection):
+    add_column(connection, 'user', 'city', sa.String(100))
+
+@schema_migrations.register(7, 'wider password hashes')
+def password_hash_length(connection):
+    """scrypt hashes (PASSWORD_HASH_METHOD) are longer than the original 120 characters"""
+    widen_column(connection, 'user', 'password_hash', sa.String(255))
+
+def run_migrations():
+    for migration in schema_migrations.upgrade(db.engine):
+        print(f"Applied migration {migration.version}: {migration.name}")
+
+@app.cli.command('migrate')
+@click.option('--status', is_flag=True, help='Yalnızca uygulanmış/bekleyen migration listesini göster')
+def migrate_command(status):
+    """Apply pending schema migrations"""
+    if status:
+        for migration, applied in schema_migrations.status(db.engine):
+            print(f"{migration.version:>4}  {'applied' if applied else 'pending':<8} {migration.name}")
+        return
+    db.create_all()
+    run_migrations()
+
 def init_db():
+    """Create the schema, apply migrations and seed the school catalog; returns False on failure"""
     try:
         with app.app_context():
             # Ensure database directory exists
-            db_dir = os.path.dirname(db_path)
+            db_dir = os.path.dirname(db_path) if db_path else None
             if db_dir and not os.path.exists(db_dir):
                 os.makedirs(db_dir, exist_ok=True)
             
             db.create_all()
-            populate_sample_schools()
-            print(f"Database initialized successfully at: {db_path}")
+            run_migrations()
+            if os.path.exists(app.config['SCHOOL_CATALOG']):
+                sync_school_catalog()
+            else:
+                populate_sample_schools()
+            print(f"Database initialized successfully at: {db_path or db.engine.url.render_as_string(hide_password=True)}")
+        return True
     except Exception as e:
         print(f"Database initialization error: {e}")
+        return False
+
+@app.cli.command('init-db')
+def init_db_command():
+    """Create tables, apply migrations and load the school catalog or sample schools (run once per deploy)"""
+    if not init_db():
+        raise click.ClickException('Veritabanı hazırlanamadı')
+
+def create_app():
+    """WSGI entry point ('gunicorn app:create_app()'): per-worker startup only
 
-# Initialize database on import (for production servers like Gunicorn)
-init_db()
+    The database is prepared once by `flask init-db` (gunicorn.conf.py runs it
+    before forking), so a worker only starts its password hashing processes
+    (before any request thread exists), requeues interrupted AI jobs and starts
+    building the leaderboard in the background here; the school and percentile
+    indexes are loaded by the first request that needs them.
+    """
+    try:
+        password_hasher.start()
+        with app.app_context():
+            resume_stale_jobs()
+        threading.Thread(target=warm_leaderboard, name='leaderboard-build', daemon=True).start()
+    except Exception as e:
+        print(f"Worker startup error: {e}")
+    return app
 
 if __name__ == '__main__':
+    init_db()
+    create_app()
     port = int(os.environ.get('PORT', 5000))
     debug = not os.environ.get('RENDER')  # Production mode if on Render
     app.run(debug=debug, host='0.0.0.0', port=port)
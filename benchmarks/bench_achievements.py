@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Benchmark: achievement awarding per write, and a backfill over a million rows
+
+Live: POST /calculate, /mock-exam and /study-session in turn for a set of
+users. "lookup" swaps in the old approach (one Achievement query per
+satisfied rule, then one ORM insert per badge), "engine" is award_achievements
+with the bitset cache. Reports statements and milliseconds per write.
+
+Backfill: a history of [rows] rows (70% scores, 20% mock exams, 10% study
+sessions) across [users] users is evaluated by the streaming backfill. The
+per-row lookup approach is timed on 1% of the users and extrapolated.
+
+Usage: python benchmarks/bench_achievements.py [rows] [users]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BENCH_DIR = tempfile.mkdtemp(prefix='lgs-bench-')
+os.environ.setdefault('DATABASE_URL', f'sqlite:///{BENCH_DIR}/lgs_database.db')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_batch_scoring import random_counts
+from scoring import BATCH_COLUMNS
+
+LIVE_USERS = 50
+LIVE_ROUNDS = 20
+
+
+def main():
+    total_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    users = int(sys.argv[2]) if len(sys.argv) > 2 else 10_000
+
+    import app as app_module
+    from app import app, db, sa, Achievement, MockExam, Score, StudySession, User, init_db
+    from achievements import EVENT_RULES, ScoreContext, StudyContext, backfill
+    from study_stats import next_streak, study_day
+    from importer import import_scores
+    init_db()
+
+    def lookup_award(rows, contexts):
+        """The old way: one existence query per satisfied rule, one ORM insert per new badge"""
+        for row in rows:
+            event = app_module.ACHIEVEMENT_EVENTS.get(type(row))
+            if event is None:
+                continue
+            for _, rule in EVENT_RULES[event]:
+                if rule.check(row, contexts.get(row)) and not Achievement.query.filter_by(
+                        user_id=row.user_id, achievement_type=rule.type).first():
+                    db.session.add(Achievement(user_id=row.user_id, achievement_type=rule.type, title=rule.title,
+                                               description=rule.description, badge_icon=rule.badge_icon))
+        db.session.flush()
+        return {}
+
+    statements = [0]
+
+    def count(*args):
+        statements[0] += 1
+
+    with app.app_context():
+        engine = db.engine
+    sa.event.listen(engine, 'before_cursor_execute', count)
+
+    print(f"Live: {LIVE_USERS} users x {LIVE_ROUNDS} rounds of /calculate, /mock-exam, /study-session")
+    print(f"{'award':<8} {'statements/write':>17} {'ms/write':>9}")
+    engine_award = app_module.award_achievements
+    for label, award in (('lookup', lookup_award), ('engine', engine_award)):
+        app_module.award_achievements = award
+        clients = []
+        for index in range(LIVE_USERS):
+            client = app.test_client()
+            client.post('/register', json={'username': f'live-{label}-{index}', 'password': 'bench'})
+            client.post('/login', json={'username': f'live-{label}-{index}', 'password': 'bench'})
+            clients.append(client)
+        rng = random.Random(1)
+        statements[0] = 0
+        writes = 0
+        start = time.perf_counter()
+        for _ in range(LIVE_ROUNDS):
+            for client in clients:
+                client.post('/calculate', json={'fen_dogru': rng.randint(0, 20), 'matematik_dogru': rng.randint(0, 20)})
+                client.post('/mock-exam', json={'exam_name': 'Deneme', 'correct_answers': rng.randint(40, 90),
+                                                'wrong_answers': 5, 'empty_answers': rng.randint(0, 3)})
+                client.post('/study-session', json={'subject': 'fen', 'duration': rng.randint(20, 150)})
+                writes += 3
+        elapsed = time.perf_counter() - start
+        print(f"{label:<8} {statements[0] / writes:17.2f} {elapsed / writes * 1000:9.2f}")
+    app_module.award_achievements = engine_award
+    sa.event.remove(engine, 'before_cursor_execute', count)
+
+    # A history to backfill
+    scores_n, exams_n = int(total_rows * 0.7), int(total_rows * 0.2)
+    studies_n = total_rows - scores_n - exams_n
+    start = time.perf_counter()
+    with app.app_context():
+        db.session.execute(sa.insert(User), [{'username': f'history-{index}', 'password_hash': 'x'} for index in range(users)])
+        db.session.commit()
+        user_ids = db.session.scalars(sa.select(User.id).where(User.username.like('history-%')).order_by(User.id)).all()
+    rng = random.Random(7)
+    base = datetime(2024, 1, 1)
+    with engine.connect() as connection:
+        import_scores((dict(zip(BATCH_COLUMNS, row), user_id=user_ids[index % users])
+                       for index, row in enumerate(random_counts(scores_n).tolist())), connection, Score.__table__)
+    with engine.begin() as connection:
+        connection.execute(sa.insert(MockExam), [
+            {'user_id': user_ids[index % users], 'exam_name': 'Deneme', 'total_questions': 90,
+             'correct_answers': (correct := rng.randint(30, 88)), 'wrong_answers': (wrong := rng.randint(0, 90 - correct)),
+             'empty_answers': 90 - correct - wrong if rng.random() < 0.9 else 0, 'time_spent': 120,
+             'created_at': base + timedelta(minutes=index)}
+            for index in range(exams_n)])
+        connection.execute(sa.insert(StudySession), [
+            {'user_id': user_ids[index % users], 'subject': 'matematik', 'duration_minutes': rng.randint(15, 125),
+             'created_at': base + timedelta(minutes=index)}
+            for index in range(studies_n)])
+    print(f"\nBackfill: {scores_n:,} scores, {exams_n:,} mock exams, {studies_n:,} study sessions, {users:,} users "
+          f"(generated in {time.perf_counter() - start:.1f}s)")
+
+    utc_offset = app.config['STUDY_DAY_UTC_OFFSET']
+    tables = {event: model.__table__ for model, event in app_module.ACHIEVEMENT_EVENTS.items()}
+    sample = set(user_ids[:max(1, users // 100)])
+    start = time.perf_counter()
+    with app.app_context():
+        sample_rows = 0
+        for model, event in app_module.ACHIEVEMENT_EVENTS.items():
+            for user_id in sorted(sample):
+                rows = model.query.filter_by(user_id=user_id).order_by(model.created_at, model.id).all()
+                previous, streak, last_day = None, 0, None
+                for position, row in enumerate(rows, 1):
+                    context = None
+                    if event == 'score':
+                        context = ScoreContext(position, previous)
+                        previous = row.total_score
+                    elif event == 'study_session':
+                        day = study_day(row.created_at, utc_offset)
+                        streak, last_day = next_streak(streak, last_day, day), day
+                        context = StudyContext(streak)
+                    lookup_award([row], {row: context})
+                sample_rows += len(rows)
+        db.session.rollback()
+    lookup_seconds = (time.perf_counter() - start) * total_rows / sample_rows
+    print(f"per-row lookups: {sample_rows:,} rows of {len(sample)} users timed, ~{lookup_seconds:,.0f}s for all rows (extrapolated)")
+
+    start = time.perf_counter()
+    with engine.begin() as connection:
+        awarded = backfill(connection, tables, Achievement.__table__, utc_offset=utc_offset)
+    elapsed = time.perf_counter() - start
+    print(f"streaming engine: {elapsed:.1f}s ({total_rows / elapsed:,.0f} rows/s), {sum(awarded.values()):,} badges")
+    print('  ' + ', '.join(f'{achievement_type} {count:,}' for achievement_type, count in awarded.items()))
+
+    start = time.perf_counter()
+    with engine.begin() as connection:
+        again = backfill(connection, tables, Achievement.__table__, utc_offset=utc_offset)
+    print(f"re-run (every badge already earned): {time.perf_counter() - start:.1f}s, {sum(again.values())} new badges")
+
+
+if __name__ == '__main__':
+    main()
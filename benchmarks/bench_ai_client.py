@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Benchmark: the pooled OpenRouter client against a local keep-alive stub server
+
+Reports per-request latency for pooled vs one-connection-per-request calls,
+then the client's metrics. Connection reuse and the circuit breaker are
+covered by tests/test_ai_client.py.
+
+Usage: python benchmarks/bench_ai_client.py [requests]
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai_client import OpenRouterClient, completion_payload
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Small keep-alive responses otherwise stall on delayed ACKs
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        model = body['model']
+        payload = json.dumps({'choices': [{'message': {'content': f"ok from {model}"}}]}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def time_requests(name, call, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        call()
+    elapsed = time.perf_counter() - start
+    print(f"{name:<18}: {elapsed / n * 1000:.2f} ms/request")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    server = ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_port}'
+    client = OpenRouterClient(base_url, {}, failure_threshold=3, cooldown=0.2)
+
+    url = f'{base_url}/chat/completions'
+    time_requests('new connection', lambda: requests.post(url, json=completion_payload('healthy', 'test'), timeout=5), n)
+    time_requests('pooled client', lambda: client.complete('healthy', 'test', timeout=5), n)
+    print(json.dumps(client.metrics(), indent=2))
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
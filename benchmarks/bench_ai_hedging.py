@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark: sequential model fallback vs hedged completion against a local stub server
+
+The stub simulates a bad day upstream: some models fail, others are slow or
+occasionally hang. Reports p50/p99 latency for both strategies.
+"""
+
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai_client import OpenRouterClient, extract_content
+
+# model -> (failure probability, typical latency in seconds, hang probability)
+STUB_MODELS = {
+    'model-a': (0.5, 0.8, 0.2),
+    'model-b': (0.3, 0.4, 0.1),
+    'model-c': (0.2, 0.3, 0.0),
+    'model-d': (0.1, 0.5, 0.0),
+    'model-e': (0.0, 0.6, 0.0),
+}
+HANG_SECONDS = 3.0
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        fail, latency, hang = STUB_MODELS[body['model']]
+        time.sleep(HANG_SECONDS if random.random() < hang else random.uniform(0.5, 1.5) * latency)
+        if random.random() < fail:
+            self.send_response(503)
+            self.end_headers()
+            return
+        payload = json.dumps({'choices': [{'message': {'content': f"ok from {body['model']}"}}]}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def sequential_completion(url, models, prompt, timeout):
+    """The original strategy: try each model in turn"""
+    for model in models:
+        try:
+            response = requests.post(url, json={'model': model, 'messages': [{'role': 'user', 'content': prompt}]}, timeout=timeout)
+            if response.status_code == 200:
+                content = extract_content(response.json())
+                if content is not None:
+                    return content
+        except Exception:
+            continue
+    return None
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q / 100 * len(values)))]
+
+
+def run(name, call, n):
+    latencies = []
+    answered = 0
+    for _ in range(n):
+        start = time.perf_counter()
+        if call() is not None:
+            answered += 1
+        latencies.append(time.perf_counter() - start)
+    print(f"{name:<10} p50={percentile(latencies, 50):.2f}s p99={percentile(latencies, 99):.2f}s answered={answered}/{n}")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    random.seed(7)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_port}'
+    models = list(STUB_MODELS)
+    client = OpenRouterClient(base_url, {})
+
+    run('sequential', lambda: sequential_completion(f'{base_url}/chat/completions', models, 'test', timeout=30), n)
+    run('hedged', lambda: client.hedged_completion(models, 'test', hedge_delay=0.5, deadline=5.0), n)
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Benchmark: /analytics from stored aggregates vs a full scan of the score history
+
+Imports a long history for one user, then times both paths and checks that
+they agree on the shown window.
+
+Usage: python benchmarks/bench_analytics.py [history_rows] [requests]
+"""
+
+import os
+import sys
+import time
+
+# Use a scratch database instead of the tracked instance database
+os.environ.setdefault('DATABASE_URL', 'sqlite:////tmp/lgs_database.db')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_batch_scoring import random_counts
+from scoring import BATCH_COLUMNS
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    requests_n = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    from app import app, db, Score, User, init_db, rebuild_user_analytics
+    from analytics import full_scan_payload, compare_payloads
+    from importer import import_scores
+    init_db()
+
+    client = app.test_client()
+    username = f'bench-analytics-{int(time.time())}'
+    client.post('/register', json={'username': username, 'password': 'bench'})
+    with app.app_context():
+        user_id = User.query.filter_by(username=username).first().id
+        rows = [dict(zip(BATCH_COLUMNS, row)) for row in random_counts(n).tolist()]
+        with db.engine.connect() as connection:
+            import_scores(rows, connection, Score.__table__, default_user_id=user_id)
+        rebuild_user_analytics(user_id)
+        db.session.commit()
+
+    start = time.perf_counter()
+    for _ in range(requests_n):
+        aggregated = client.get('/analytics').get_json()
+    aggregate_time = (time.perf_counter() - start) / requests_n
+
+    window = app.config['ANALYTICS_WINDOW']
+    with app.app_context():
+        start = time.perf_counter()
+        for _ in range(max(1, requests_n // 20)):
+            user_scores = Score.query.filter_by(user_id=user_id).order_by(Score.created_at.asc(), Score.id.asc()).all()
+            scanned = full_scan_payload(user_scores, window)
+            db.session.expunge_all()
+        scan_time = (time.perf_counter() - start) / max(1, requests_n // 20)
+
+    differences = compare_payloads(scanned, aggregated)
+    print(f"History rows      : {n:,}")
+    print(f"Full scan         : {scan_time * 1000:8.2f} ms/request")
+    print(f"Aggregate (route) : {aggregate_time * 1000:8.2f} ms/request")
+    print(f"Differences       : {len(differences)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Benchmark: calculate_scores_batch vs looping calculate_score
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scoring import SUBJECTS, MAX_QUESTIONS, BATCH_COLUMNS, calculate_score, calculate_scores_batch
+
+
+def random_counts(n, seed=42):
+    """Generate n valid random result rows in BATCH_COLUMNS order"""
+    rng = np.random.default_rng(seed)
+    columns = []
+    for subject in SUBJECTS:
+        max_q = MAX_QUESTIONS[subject]
+        dogru = rng.integers(0, max_q + 1, n)
+        yanlis = (rng.random(n) * (max_q - dogru + 1)).astype(np.int64)
+        columns.extend([dogru, yanlis])
+    return np.stack(columns, axis=1)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    counts = random_counts(n)
+    rows = [dict(zip(BATCH_COLUMNS, row)) for row in counts.tolist()]
+
+    start = time.perf_counter()
+    scalar = [calculate_score(row) for row in rows]
+    scalar_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = calculate_scores_batch(counts)
+    batch_time = time.perf_counter() - start
+
+    mismatches = sum(
+        1 for i, result in enumerate(scalar)
+        if result['total_score'] != batch['total_score'][i]
+        or result['percentile'] != batch['percentile'][i]
+        or list(result['nets'].values()) != batch['nets'][i].tolist()
+    )
+
+    print(f"Rows: {n}")
+    print(f"calculate_score loop : {n / scalar_time:>12,.0f} rows/s")
+    print(f"calculate_scores_batch: {n / batch_time:>12,.0f} rows/s ({scalar_time / batch_time:.1f}x)")
+    print(f"Mismatches: {mismatches}")
+
+
+if __name__ == '__main__':
+    main()
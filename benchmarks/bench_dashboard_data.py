@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark: what one dashboard load costs, per panel routes vs /dashboard/data
+
+A load is the page itself plus the JSON it needs to fill the stats, charts,
+mock exam history, active plan and achievements. "per panel" fetches
+/analytics, /mock-exam, /study-plan and /achievements separately; "combined"
+fetches /dashboard/data once. Each load is timed from the page request until
+the last JSON body arrived, and every SQL statement is counted. Runs with the
+response cache off (every load hits the database) and on, with the browser
+revalidating its ETags.
+
+Usage: python benchmarks/bench_dashboard_data.py [scores] [loads]
+"""
+
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BENCH_DIR = tempfile.mkdtemp(prefix='lgs-bench-')
+os.environ.setdefault('DATABASE_URL', f'sqlite:///{BENCH_DIR}/lgs_database.db')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_batch_scoring import random_counts
+from scoring import BATCH_COLUMNS
+
+LOADS = {
+    'per panel': ['/dashboard', '/analytics', '/mock-exam', '/study-plan', '/achievements'],
+    'combined': ['/dashboard', '/dashboard/data'],
+}
+
+
+def page_load(client, paths, etags):
+    """Fetch the page and its data routes in order; returns (seconds, requests, bytes)"""
+    start = time.perf_counter()
+    size = 0
+    for path in paths:
+        headers = {'If-None-Match': etags[path]} if path in etags else None
+        response = client.get(path, headers=headers)
+        assert response.status_code in (200, 304), (path, response.status_code)
+        if 'ETag' in response.headers:
+            etags[path] = response.headers['ETag']
+        size += len(response.data)
+    return time.perf_counter() - start, len(paths), size
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    loads = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    from app import app, db, sa, Achievement, MockExam, Score, User, init_db
+    from importer import import_scores
+    init_db()
+
+    client = app.test_client()
+    client.post('/register', json={'username': 'bench-dashboard', 'password': 'bench'})
+    client.post('/login', json={'username': 'bench-dashboard', 'password': 'bench'})
+    with app.app_context():
+        user_id = User.query.filter_by(username='bench-dashboard').first().id
+        rows = [dict(zip(BATCH_COLUMNS, row)) for row in random_counts(n).tolist()]
+        with db.engine.connect() as connection:
+            import_scores(rows, connection, Score.__table__, default_user_id=user_id)
+        for index in range(30):
+            db.session.add(MockExam(user_id=user_id, exam_name=f'Deneme {index}', total_questions=90, correct_answers=60,
+                                    wrong_answers=20, empty_answers=10, time_spent=120, subject_scores={'fen': 15}))
+        for index in range(12):
+            db.session.add(Achievement(user_id=user_id, achievement_type=f'bench-{index}', title='Başarı',
+                                       description='Kıyaslama', badge_icon='x'))
+        db.session.commit()
+        engine = db.engine
+    client.post('/study-plan', json={'plan_name': 'Plan', 'target_score': 450, 'target_date': '2025-06-15'})
+    client.get('/analytics')  # builds the aggregate
+
+    statements = [0]
+
+    def count(*args):
+        statements[0] += 1
+    sa.event.listen(engine, 'before_cursor_execute', count)
+
+    print(f"{n:,} scores, 30 mock exams, 12 achievements; {loads} dashboard loads per row")
+    print(f"{'cache':<6} {'load':<10} {'requests':>8} {'queries':>8} {'KB':>7} {'median ms':>10} {'p95 ms':>8}")
+    for cached in (False, True):
+        app.config['RESPONSE_CACHE'] = cached
+        for label, paths in LOADS.items():
+            etags = {}
+            page_load(client, paths, etags)
+            statements[0] = 0
+            samples = [page_load(client, paths, etags if cached else {}) for _ in range(loads)]
+            times = sorted(sample[0] for sample in samples)
+            print(f"{'on' if cached else 'off':<6} {label:<10} {samples[0][1]:8} {statements[0] / loads:8.1f} "
+                  f"{samples[0][2] / 1024:7.1f} {statistics.median(times) * 1000:10.2f} "
+                  f"{times[int(len(times) * 0.95)] * 1000:8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Benchmark: nightly forecast batch over [users] users vs refitting one user at a time
+
+Seeds [users] users with one to five scores each over the last six months
+(each user improving or slipping at their own rate, a fifth of them with a
+study plan), then times the nightly rebuild-forecasts batch: fitting alone
+and fitting plus writing every stored row. A per-user refit of a sample is
+extrapolated for comparison. The incremental path (a new score folded into
+the stored state and re-projected) and GET /analytics are timed next, and
+sampled stored forecasts are checked against a fit over each user's whole
+history.
+
+Usage: python benchmarks/bench_forecast.py [users]
+"""
+
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+BENCH_DIR = tempfile.mkdtemp(prefix='lgs-bench-')
+os.environ.setdefault('DATABASE_URL', f'sqlite:///{BENCH_DIR}/lgs_database.db')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SAMPLE = 2000
+
+
+def user_scores(rng, now, calculate_score, subjects, max_questions):
+    """One to five results of a user whose nets drift linearly, oldest first"""
+    skill = rng.uniform(0.2, 0.8)
+    drift = rng.uniform(-0.002, 0.004)
+    rows = []
+    for days_ago in sorted(rng.sample(range(1, 180), rng.randint(1, 5)), reverse=True):
+        level = min(max(skill + drift * (180 - days_ago), 0.05), 0.95)
+        data = {}
+        for subject in subjects:
+            max_q = max_questions[subject]
+            dogru = min(max(round(rng.gauss(level * max_q, max_q * 0.1)), 0), max_q)
+            data[f'{subject}_dogru'] = dogru
+            data[f'{subject}_yanlis'] = rng.randint(0, max_q - dogru)
+        rows.append(dict(data, total_score=calculate_score(data)['total_score'], percentile=50.0,
+                         created_at=now - timedelta(days=days_ago, seconds=rng.randint(0, 86399))))
+    return rows
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+    from app import (app, db, sa, Score, StudyPlan, User, UserForecast, init_db, FORECAST_COLUMNS,
+                     rebuild_all_forecasts, rebuild_user_forecast, record_score_forecast, default_forecast_target)
+    from forecast import iter_state_batches, batch_rows, full_scan_payload, compare_payloads
+    from scoring import SUBJECTS, MAX_QUESTIONS, calculate_score
+    init_db()
+    app.config['RESPONSE_CACHE'] = False
+    half_life, damping, confidence = (app.config[key] for key in
+                                      ('FORECAST_HALF_LIFE_DAYS', 'FORECAST_DAMPING_DAYS', 'FORECAST_CONFIDENCE'))
+    rng = random.Random(11)
+    now = datetime.utcnow()
+
+    start = time.perf_counter()
+    with app.app_context():
+        for first in range(0, users, 50000):
+            db.session.execute(sa.insert(User), [{'username': f'forecast-{index}', 'password_hash': 'x'}
+                                                 for index in range(first, min(users, first + 50000))])
+        user_ids = db.session.scalars(sa.select(User.id).order_by(User.id)).all()
+        rows, plans = [], []
+        for user_id in user_ids:
+            rows.extend(dict(row, user_id=user_id) for row in user_scores(rng, now, calculate_score, SUBJECTS, MAX_QUESTIONS))
+            if rng.random() < 0.2:
+                plans.append({'user_id': user_id, 'plan_name': 'Plan', 'target_score': 420, 'daily_study_hours': 3,
+                              'target_date': date(2027, rng.randint(3, 6), 1), 'is_active': True})
+            if len(rows) >= 100000:
+                db.session.execute(sa.insert(Score), rows)
+                rows = []
+        if rows:
+            db.session.execute(sa.insert(Score), rows)
+        db.session.execute(sa.insert(StudyPlan), plans)
+        db.session.commit()
+        score_count = db.session.execute(sa.select(sa.func.count(Score.id))).scalar()
+    print(f"{users:,} users, {score_count:,} scores, {len(plans):,} study plans "
+          f"(generated in {time.perf_counter() - start:.1f}s)")
+
+    with app.app_context():
+        # Reading the scores and fitting them, without writing anything
+        default_target = default_forecast_target()
+        start = time.perf_counter()
+        fitted = 0
+        scores = db.session.execute(sa.select(*FORECAST_COLUMNS).order_by(Score.user_id, Score.created_at, Score.id)
+                                    .execution_options(yield_per=65536))
+        for states in iter_state_batches(scores, half_life):
+            fitted += len(batch_rows(states, [default_target] * len(states['user_id']), damping, confidence))
+        fit_time = time.perf_counter() - start
+        db.session.rollback()
+
+        start = time.perf_counter()
+        rebuilt = rebuild_all_forecasts()
+        batch_time = time.perf_counter() - start
+
+        sample = rng.sample(user_ids, SAMPLE)
+        start = time.perf_counter()
+        for user_id in sample[:500]:
+            rebuild_user_forecast(user_id)
+        per_user_time = (time.perf_counter() - start) / 500
+        db.session.rollback()
+
+    print(f"\nnightly batch ({rebuilt:,} users)")
+    print(f"  read + fit (vectorized)      : {fit_time:6.1f}s  ({fitted / fit_time:,.0f} users/s)")
+    print(f"  read + fit + store all rows  : {batch_time:6.1f}s  ({rebuilt / batch_time:,.0f} users/s)")
+    print(f"  one user at a time (est.)    : {per_user_time * users:6.1f}s  ({per_user_time * 1000:.2f} ms/user)")
+    print(f"  peak RSS (with data seeding) : {peak_rss_mb():6.0f} MB")
+
+    # Incremental: a new score folded into the stored state and re-projected
+    with app.app_context():
+        new_scores = []
+        for user_id in sample[:SAMPLE // 2]:
+            data = user_scores(rng, now + timedelta(days=1), calculate_score, SUBJECTS, MAX_QUESTIONS)[-1]
+            data['created_at'] = now + timedelta(hours=rng.randint(1, 24))
+            new_scores.append(Score(user_id=user_id, **data))
+        db.session.add_all(new_scores)
+        db.session.flush()
+        start = time.perf_counter()
+        for score in new_scores:
+            record_score_forecast(score)
+        record_time = (time.perf_counter() - start) / len(new_scores)
+        db.session.commit()
+
+    client = app.test_client()
+    client.post('/register', json={'username': 'forecast-me', 'password': 'bench'})
+    client.post('/login', json={'username': 'forecast-me', 'password': 'bench'})
+    for index in range(10):
+        client.post('/calculate', json={'matematik_dogru': 8 + index, 'fen_dogru': 10, 'turkce_dogru': 12})
+    requests_n = 200
+    start = time.perf_counter()
+    for _ in range(requests_n):
+        body = client.get('/analytics').get_json()
+    read_time = (time.perf_counter() - start) / requests_n
+    print(f"\nincremental update (fold + project) : {record_time * 1000:.3f} ms/score")
+    print(f"GET /analytics with forecast         : {read_time * 1000:.2f} ms, score forecast {body['forecast']['score']}")
+
+    with app.app_context():
+        mismatched = 0
+        for user_id in sample:
+            row = db.session.get(UserForecast, user_id)
+            history = db.session.execute(sa.select(*FORECAST_COLUMNS).where(Score.user_id == user_id)).all()
+            target = date.fromisoformat(row.data['target_date'])
+            if compare_payloads(full_scan_payload(history, target, half_life, damping, confidence), row.data['forecast']):
+                mismatched += 1
+    print(f"parity: {SAMPLE:,} sampled users (half with an incremental update), {mismatched} mismatched")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Benchmark: streaming bulk import vs replaying /calculate
+
+Usage: python benchmarks/bench_import.py [rows] [replay_rows]
+"""
+
+import csv
+import os
+import sys
+import tempfile
+import time
+
+BENCH_DIR = tempfile.mkdtemp(prefix='lgs-bench-')
+# Use a scratch database instead of the tracked instance database
+os.environ.setdefault('DATABASE_URL', f'sqlite:///{BENCH_DIR}/lgs_database.db')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_batch_scoring import random_counts
+from scoring import BATCH_COLUMNS
+
+
+def write_csv(path, n, chunk=100000):
+    """Write n random result rows to a CSV file in chunks"""
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['user_id'] + BATCH_COLUMNS)
+        for start in range(0, n, chunk):
+            for row in random_counts(min(chunk, n - start), seed=start).tolist():
+                writer.writerow([1] + row)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    replay_n = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+
+    from app import app, db, Score, init_db
+    from importer import iter_rows, import_scores
+    init_db()
+
+    path = os.path.join(BENCH_DIR, 'results.csv')
+    write_csv(path, n)
+
+    with app.app_context():
+        start = time.perf_counter()
+        with open(path, newline='') as stream, db.engine.connect() as connection:
+            stats = import_scores(iter_rows(stream, 'csv'), connection, Score.__table__)
+        import_time = time.perf_counter() - start
+
+    client = app.test_client()
+    client.post('/register', json={'username': 'bench', 'password': 'bench'})
+    rows = [dict(zip(BATCH_COLUMNS, row)) for row in random_counts(replay_n).tolist()]
+    start = time.perf_counter()
+    for row in rows:
+        client.post('/calculate', json=row)
+    replay_time = time.perf_counter() - start
+
+    import_rate = stats['imported'] / import_time
+    replay_rate = replay_n / replay_time
+    print(f"Bulk import : {stats['imported']:,} rows in {import_time:.1f}s ({import_rate:,.0f} rows/s)")
+    print(f"/calculate  : {replay_n:,} rows in {replay_time:.1f}s ({replay_rate:,.0f} rows/s)")
+    print(f"Speedup     : {import_rate / replay_rate:.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-user route queries before and after the index migration
+
+Builds a synthetic SQLite database (1M scores by default) with the model
+tables but without their secondary indexes, times the route query patterns,
+applies the schema migrations and times them again.
+
+Usage: python benchmarks/bench_indexes.py [score_rows] [users]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Use a scratch database instead of the tracked instance database
+os.environ.setdefault('DATABASE_URL', 'sqlite:////tmp/lgs_database.db')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sqlalchemy as sa
+
+QUERY_SAMPLES = 200
+
+# name -> (SQL, parameter factory taking a random user id); mirrors the ORM queries of each route
+QUERIES = {
+    'latest score (/dashboard, /ai-*)': (
+        'SELECT * FROM score WHERE user_id = :user_id ORDER BY created_at DESC LIMIT 5', None),
+    'score history (analytics rebuild)': (
+        'SELECT total_score, created_at FROM score WHERE user_id = :user_id ORDER BY created_at, id', None),
+    'mock exams (/mock-exam)': (
+        'SELECT * FROM mock_exam WHERE user_id = :user_id ORDER BY created_at DESC', None),
+    'active plan (/study-plan)': (
+        'SELECT * FROM study_plan WHERE user_id = :user_id AND is_active = 1 LIMIT 1', None),
+    'achievement check': (
+        "SELECT * FROM achievement WHERE user_id = :user_id AND achievement_type = 'first_score' LIMIT 1", None),
+    'school range (/school-recommendations)': (
+        'SELECT * FROM school WHERE min_score <= :score + 20 AND min_score >= :score - 50 ORDER BY min_score DESC LIMIT 10',
+        lambda user_id: {'score': random.uniform(200, 480)}),
+}
+
+
+def populate(engine, score_rows, users):
+    random.seed(11)
+    start_date = datetime(2024, 1, 1)
+
+    def timestamp():
+        return start_date + timedelta(seconds=random.randint(0, 365 * 86400))
+
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            'INSERT INTO user (id, username, password_hash, created_at, last_login) VALUES (?, ?, ?, ?, ?)',
+            [(user_id, f'user{user_id}', 'x', start_date, start_date) for user_id in range(1, users + 1)])
+
+        batch = []
+        for _ in range(score_rows):
+            batch.append((random.randint(1, users), random.randint(0, 20), random.randint(0, 20),
+                          random.uniform(100, 500), random.uniform(0, 100), timestamp()))
+            if len(batch) == 100000:
+                connection.exec_driver_sql(
+                    'INSERT INTO score (user_id, turkce_dogru, matematik_dogru, total_score, percentile, created_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?)', batch)
+                batch = []
+        if batch:
+            connection.exec_driver_sql(
+                'INSERT INTO score (user_id, turkce_dogru, matematik_dogru, total_score, percentile, created_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)', batch)
+
+        connection.exec_driver_sql(
+            'INSERT INTO mock_exam (user_id, exam_name, total_questions, correct_answers, wrong_answers, '
+            'empty_answers, time_spent, created_at) VALUES (?, ?, 90, ?, ?, ?, 120, ?)',
+            [(random.randint(1, users), 'Deneme', 60, 20, 10, timestamp()) for _ in range(score_rows // 5)])
+        connection.exec_driver_sql(
+            'INSERT INTO study_plan (user_id, plan_name, target_score, target_date, daily_study_hours, is_active, created_at) '
+            'VALUES (?, ?, 400, ?, 4, ?, ?)',
+            [(random.randint(1, users), 'Plan', '2025-06-01', random.random() < 0.2, timestamp()) for _ in range(score_rows // 10)])
+        connection.exec_driver_sql(
+            'INSERT INTO achievement (user_id, achievement_type, title, description, badge_icon, earned_at) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            [(random.randint(1, users), random.choice(['first_score', 'high_scorer', 'study_streak']), 't', 'd', 'i', timestamp())
+             for _ in range(score_rows // 5)])
+        connection.exec_driver_sql(
+            'INSERT INTO school (name, city, district, school_type, min_score, max_score, quota, created_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            [(f'Okul {i}', 'Ankara', 'Çankaya', 'Anadolu Lisesi', score, score + 20, 100, start_date)
+             for i, score in enumerate(random.uniform(200, 500) for _ in range(max(1000, score_rows // 200)))])
+
+
+def time_queries(engine, users):
+    random.seed(3)
+    timings = {}
+    with engine.connect() as connection:
+        for name, (sql, params) in QUERIES.items():
+            statement = sa.text(sql)
+            start = time.perf_counter()
+            for _ in range(QUERY_SAMPLES):
+                user_id = random.randint(1, users)
+                connection.execute(statement, params(user_id) if params else {'user_id': user_id}).fetchall()
+            timings[name] = (time.perf_counter() - start) / QUERY_SAMPLES
+    return timings
+
+
+def main():
+    score_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    users = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+
+    from app import db, schema_migrations
+
+    path = os.path.join(tempfile.mkdtemp(prefix='lgs-bench-'), 'indexes.db')
+    engine = sa.create_engine(f'sqlite:///{path}')
+    db.metadata.create_all(engine)
+    # Start from the pre-migration schema: primary keys and unique constraints only
+    with engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                index.drop(connection)
+
+    start = time.perf_counter()
+    populate(engine, score_rows, users)
+    print(f"Populated {score_rows:,} scores for {users:,} users in {time.perf_counter() - start:.1f}s")
+
+    before = time_queries(engine, users)
+    start = time.perf_counter()
+    applied = schema_migrations.upgrade(engine)
+    print(f"Applied {len(applied)} migration(s) in {time.perf_counter() - start:.1f}s")
+    after = time_queries(engine, users)
+
+    print(f"{'query':<40} {'before':>12} {'after':>12} {'speedup':>9}")
+    for name in QUERIES:
+        print(f"{name:<40} {before[name] * 1000:>9.3f} ms {after[name] * 1000:>9.3f} ms {before[name] / after[name]:>8.0f}x")
+    os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
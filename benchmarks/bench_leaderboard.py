@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Benchmark: leaderboard rank and top-k from the Fenwick index vs ORDER BY over the Score table
+
+Seeds [users] users spread over 81 cities, each with one to three scores, then
+builds the leaderboard from the database (the worker startup cost) and times
+rank and top-10 queries, globally and for one city, against the SQL that ranks
+every user's latest score per request. Ranks of sampled users are checked
+against a numpy ranking of the latest scores after more /calculate posts and
+a catch-up with scores written outside this worker; applying a new score is
+timed last.
+
+Usage: python benchmarks/bench_leaderboard.py [users]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+BENCH_DIR = tempfile.mkdtemp(prefix='lgs-bench-')
+os.environ.setdefault('DATABASE_URL', f'sqlite:///{BENCH_DIR}/lgs_database.db')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CITIES = ['İstanbul', 'Ankara', 'İzmir', 'Bursa', 'Antalya'] + [f'İl {number}' for number in range(6, 82)]
+QUERIES = 2000
+
+
+def index_mb(board):
+    """Approximate size of the leaderboard's arrays (process RSS also counts SQLite's page cache and mmap)"""
+    size = sum(array.nbytes for array in (board.bins, board.cities, board.stamps, board.score_ids))
+    size += sum(members.nbytes + sys.getsizeof(members) for members in board.members.values())
+    size += sum(sys.getsizeof(histogram.counts) + sys.getsizeof(histogram.tree) for histogram in board.histograms.values())
+    return size / 2**20
+
+
+def timed(function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+    from app import app, db, sa, Score, User, init_db, get_leaderboard
+    from leaderboard import city_cohort
+    init_db()
+    rng = random.Random(5)
+
+    start = time.perf_counter()
+    base = datetime(2025, 1, 1)
+    with app.app_context():
+        for first in range(0, users, 50000):
+            db.session.execute(sa.insert(User), [
+                {'username': f'board-{index}', 'password_hash': 'x', 'city': CITIES[index % len(CITIES)]}
+                for index in range(first, min(users, first + 50000))])
+        user_ids = db.session.scalars(sa.select(User.id).order_by(User.id)).all()
+        rows = []
+        for user_id in user_ids:
+            for attempt in range(rng.randint(1, 3)):
+                rows.append({'user_id': user_id, 'total_score': round(rng.uniform(150, 500), 2), 'percentile': 50.0,
+                             'created_at': base + timedelta(days=attempt, seconds=rng.randint(0, 86399))})
+            if len(rows) >= 100000:
+                db.session.execute(sa.insert(Score), rows)
+                rows = []
+        if rows:
+            db.session.execute(sa.insert(Score), rows)
+        db.session.commit()
+        score_count = db.session.execute(sa.select(sa.func.count(Score.id))).scalar()
+    print(f"{users:,} users in {len(CITIES)} cities, {score_count:,} scores (generated in {time.perf_counter() - start:.1f}s)")
+
+    with app.app_context():
+        start = time.perf_counter()
+        board = get_leaderboard()
+        build_time = time.perf_counter() - start
+    print(f"build from the database: {build_time:.1f}s, index size {index_mb(board):.0f} MB")
+
+    city = CITIES[1]
+    samples = [rng.choice(user_ids) for _ in range(QUERIES)]
+    latest = sa.select(
+        Score.user_id, Score.total_score,
+        sa.func.row_number().over(partition_by=Score.user_id, order_by=(Score.created_at.desc(), Score.id.desc())).label('position')
+    ).subquery()
+    city_latest = sa.select(latest.c.user_id, latest.c.total_score).join(User, User.id == latest.c.user_id).where(
+        latest.c.position == 1, User.city == city).subquery()
+    global_latest = sa.select(latest.c.user_id, latest.c.total_score).where(latest.c.position == 1).subquery()
+
+    def sql_rank(table, user_id):
+        mine = sa.select(table.c.total_score).where(table.c.user_id == user_id).scalar_subquery()
+        return db.session.execute(sa.select(sa.func.count()).where(table.c.total_score > mine)).scalar() + 1
+
+    def sql_top(table):
+        return db.session.execute(sa.select(table.c.user_id, table.c.total_score).order_by(table.c.total_score.desc()).limit(10)).all()
+
+    print(f"\n{'query':<22} {'Fenwick ms':>11} {'SQL ms':>9}")
+    with app.app_context():
+        queries = iter(samples * 3)
+        for label, fenwick, sql, sql_repeat in (
+            ('rank (all)', lambda: board.rank(next(queries)), lambda: sql_rank(global_latest, samples[0]), 2),
+            (f'rank ({city})', lambda: board.rank(next(queries), city_cohort(city)), lambda: sql_rank(city_latest, samples[0]), 2),
+            ('top 10 (all)', lambda: board.top(10), lambda: sql_top(global_latest), 2),
+            (f'top 10 ({city})', lambda: board.top(10, city_cohort(city)), lambda: sql_top(city_latest), 2),
+        ):
+            fenwick_ms, _ = timed(fenwick, QUERIES)
+            sql_ms, _ = timed(sql, sql_repeat)
+            print(f"{label:<22} {fenwick_ms:11.4f} {sql_ms:9.0f}")
+
+    # The route, with more scores from this worker and from "another worker" (a direct insert)
+    client = app.test_client()
+    client.post('/register', json={'username': 'board-me', 'password': 'bench', 'city': city})
+    client.post('/login', json={'username': 'board-me', 'password': 'bench'})
+    for _ in range(20):
+        client.post('/calculate', json={'fen_dogru': rng.randint(0, 20), 'matematik_dogru': rng.randint(0, 20)})
+    with app.app_context():
+        db.session.execute(sa.insert(Score), [
+            {'user_id': rng.choice(user_ids), 'total_score': round(rng.uniform(150, 500), 2), 'percentile': 50.0,
+             'created_at': datetime(2027, 1, 1)} for _ in range(500)])
+        db.session.commit()
+    app.config['LEADERBOARD_SYNC_SECONDS'] = 0
+    route_ms, body = timed(lambda: client.get(f'/leaderboard?city={city}').get_json(), 200)
+    print(f"GET /leaderboard?city=: {route_ms:.2f} ms, me {body['me']}")
+
+    with app.app_context():
+        rows = db.session.execute(sa.select(global_latest.c.user_id, global_latest.c.total_score)).all()
+    by_user = dict(rows)
+    scores = np.sort(np.asarray([score for _, score in rows]))
+    mismatched = 0
+    for user_id in rng.sample(list(by_user), 2000):
+        expected = len(scores) - np.searchsorted(scores, by_user[user_id], side='right') + 1
+        if board.rank(user_id)['rank'] != expected:
+            mismatched += 1
+    print(f"parity: 2,000 sampled ranks, {mismatched} mismatched; {board.size():,} users ranked "
+          f"({len(rows):,} expected)")
+
+    # Last, as it moves users to scores the database does not have
+    update_ms, _ = timed(lambda: board.update(rng.choice(user_ids), 10**9 + rng.randint(0, 10**6),
+                                              round(rng.uniform(150, 500), 2), datetime(2028, 1, 1)), QUERIES)
+    print(f"update (new latest score): {update_ms:.4f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Benchmark: placement simulation of a national-size cohort
+
+Generates 81 regional markets (1M students x 20 preferences by default, ~8k
+schools), then runs deferred acceptance as one national market and as a
+process pool of regional markets, and checks both against serial dictatorship.
+
+Usage: python benchmarks/bench_placement.py [students] [preferences] [processes]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from placement import simulate_placement, serial_dictatorship
+
+REGIONS = 81
+
+
+def synthetic_market(students, width, seed=3):
+    """Scores, preferences (all within the student's region), quotas and school regions"""
+    rng = np.random.default_rng(seed)
+    # Region sizes roughly like Turkish provinces: a few large, many small
+    weights = rng.pareto(1.2, REGIONS) + 0.2
+    weights /= weights.sum()
+    student_regions = rng.choice(REGIONS, size=students, p=weights)
+    schools_per_region = np.maximum(width + 5, np.round(weights * students / 125)).astype(int)
+    school_regions = np.repeat(np.arange(REGIONS), schools_per_region)
+    quality = rng.uniform(0, 1, len(school_regions))
+    quotas = rng.choice([30, 60, 90, 120, 150, 180], size=len(school_regions))
+
+    scores = np.round(np.clip(rng.normal(300, 70, students), 100, 500), 2)
+    preferences = np.full((students, width), -1, dtype=np.int32)
+    starts = np.concatenate([[0], np.cumsum(schools_per_region)])
+    for region in range(REGIONS):
+        members = np.flatnonzero(student_regions == region)
+        schools = np.arange(starts[region], starts[region + 1])
+        for chunk in np.array_split(members, max(1, len(members) // 20000)):
+            # Better schools are more popular; Gumbel noise gives a random ranking per student
+            keys = quality[schools] * 3 + rng.gumbel(size=(len(chunk), len(schools)))
+            preferences[chunk] = schools[np.argsort(-keys, axis=1)[:, :width]]
+    return scores, preferences, quotas, school_regions
+
+
+def main():
+    students = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    width = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    processes = int(sys.argv[3]) if len(sys.argv) > 3 else (os.cpu_count() or 1)
+
+    start = time.perf_counter()
+    scores, preferences, quotas, school_regions = synthetic_market(students, width)
+    print(f"Market: {students:,} students x {width} preferences, {len(quotas):,} schools, "
+          f"{quotas.sum():,} seats (generated in {time.perf_counter() - start:.1f}s)")
+
+    start = time.perf_counter()
+    national = simulate_placement(scores, preferences, quotas)
+    national_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    regional = simulate_placement(scores, preferences, quotas, school_regions=school_regions, processes=processes)
+    regional_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    reference = serial_dictatorship(scores, preferences, quotas)
+    reference_time = time.perf_counter() - start
+
+    print(f"Deferred acceptance, national        : {national_time:6.1f}s ({national['proposals']:,} proposals, "
+          f"{national['unplaced']:,} unplaced)")
+    print(f"Deferred acceptance, {processes:>2} processes  : {regional_time:6.1f}s")
+    print(f"Serial dictatorship (reference)      : {reference_time:6.1f}s")
+    print(f"National == reference: {bool((national['assignment'] == reference).all())}, "
+          f"regional == reference: {bool((regional['assignment'] == reference).all())}")
+    cutoffs = national['cutoffs'][~np.isnan(national['cutoffs'])]
+    print(f"Predicted cutoffs: min {cutoffs.min():.2f}, median {np.median(cutoffs):.2f}, max {cutoffs.max():.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark: dashboard read endpoints with and without the response cache
+
+A user with a long history loads every cached route repeatedly: with the
+cache disabled, from the in-process cache (no validator), and as browser
+revalidations answered with 304. Then a simulated session of dashboard loads
+with a write every few loads reports the hit ratio.
+
+Usage: python benchmarks/bench_response_cache.py [scores] [requests]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+BENCH_DIR = tempfile.mkdtemp(prefix='lgs-bench-')
+os.environ.setdefault('DATABASE_URL', f'sqlite:///{BENCH_DIR}/lgs_database.db')
+os.environ['ADMIN_USERNAMES'] = 'bench-cache'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_batch_scoring import random_counts
+from scoring import BATCH_COLUMNS
+
+PATHS = ['/analytics', '/achievements', '/mock-exam', '/study-plan']
+
+
+def timed(client, path, requests_n, headers=None):
+    start = time.perf_counter()
+    for _ in range(requests_n):
+        response = client.get(path, headers=headers)
+    return (time.perf_counter() - start) / requests_n, response
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    requests_n = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+
+    from app import app, db, Achievement, MockExam, Score, User, init_db, response_cache, response_cache_stats
+    from importer import import_scores
+    init_db()
+
+    client = app.test_client()
+    client.post('/register', json={'username': 'bench-cache', 'password': 'bench'})
+    client.post('/login', json={'username': 'bench-cache', 'password': 'bench'})
+    with app.app_context():
+        user_id = User.query.filter_by(username='bench-cache').first().id
+        rows = [dict(zip(BATCH_COLUMNS, row)) for row in random_counts(n).tolist()]
+        with db.engine.connect() as connection:
+            import_scores(rows, connection, Score.__table__, default_user_id=user_id)
+        for index in range(n // 10):
+            db.session.add(MockExam(user_id=user_id, exam_name=f'Deneme {index}', total_questions=90, correct_answers=60,
+                                    wrong_answers=20, empty_answers=10, time_spent=120, subject_scores={'fen': 15}))
+            db.session.add(Achievement(user_id=user_id, achievement_type=f'bench-{index}', title='Başarı',
+                                       description='Kıyaslama', badge_icon='x'))
+        db.session.commit()
+    client.post('/study-plan', json={'plan_name': 'Plan', 'target_score': 450, 'target_date': '2025-06-15'})
+    client.get('/analytics')  # builds the aggregate
+
+    print(f"{n:,} scores, {n // 10:,} mock exams and achievements; {requests_n} requests per cell (ms/request)")
+    print(f"{'path':<14} {'uncached':>9} {'cached':>9} {'304':>9}")
+    for path in PATHS:
+        app.config['RESPONSE_CACHE'] = False
+        uncached, _ = timed(client, path, requests_n)
+        app.config['RESPONSE_CACHE'] = True
+        _, response = timed(client, path, 1)
+        cached, _ = timed(client, path, requests_n)
+        not_modified, last = timed(client, path, requests_n, {'If-None-Match': response.headers['ETag']})
+        assert last.status_code == 304
+        print(f"{path:<14} {uncached * 1000:9.2f} {cached * 1000:9.2f} {not_modified * 1000:9.2f}")
+
+    # A dashboard session: every load revalidates all routes, and every 5th load follows a new score
+    response_cache.clear()
+    response_cache.hits = response_cache.misses = response_cache_stats['not_modified'] = 0
+    etags = {}
+    for load in range(100):
+        if load % 5 == 4:
+            client.post('/calculate', json={'turkce_dogru': load % 20})
+        for path in PATHS:
+            headers = {'If-None-Match': etags[path]} if path in etags else None
+            response = client.get(path, headers=headers)
+            etags[path] = response.headers.get('ETag', etags.get(path))
+    stats = client.get('/cache-stats').get_json()['response_cache']
+    print(f"Session of 100 loads, a score every 5th: {stats['not_modified']} x 304, {stats['hits']} cache hits, "
+          f"{stats['misses']} misses, overall hit ratio {stats['overall_hit_ratio']:.2%}")
+
+
+if __name__ == '__main__':
+    main()
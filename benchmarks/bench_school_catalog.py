@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark: compiling and loading a national-size school catalog
+
+Generates a synthetic MEB-style CSV (schools with five years of cutoffs),
+compiles it, then times startup with a changed catalog (bulk load + index
+build) and with an unchanged one (version check only).
+
+Usage: python benchmarks/bench_school_catalog.py [schools]
+"""
+
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+
+BENCH_DIR = tempfile.mkdtemp(prefix='lgs-bench-')
+# Use a scratch database instead of the tracked instance database
+os.environ.setdefault('DATABASE_URL', f'sqlite:///{BENCH_DIR}/lgs_database.db')
+os.environ['SCHOOL_CATALOG'] = os.path.join(BENCH_DIR, 'schools.npz')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CITIES = ['Adana', 'Ankara', 'Antalya', 'Bursa', 'Diyarbakır', 'Erzurum', 'Eskişehir', 'Gaziantep',
+          'İstanbul', 'İzmir', 'Kayseri', 'Konya', 'Mersin', 'Samsun', 'Trabzon', 'Van']
+TYPES = ['Anadolu Lisesi', 'Fen Lisesi', 'Sosyal Bilimler Lisesi', 'Mesleki ve Teknik Anadolu Lisesi',
+         'Anadolu İmam Hatip Lisesi', 'Güzel Sanatlar Lisesi', 'Spor Lisesi']
+YEARS = [2020, 2021, 2022, 2023, 2024]
+
+
+def write_source(path, n):
+    random.seed(13)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['code', 'name', 'city', 'district', 'school_type', 'quota', 'phone', 'address']
+                        + [f'taban_{year}' for year in YEARS])
+        for i in range(n):
+            city = random.choice(CITIES)
+            base = random.uniform(200, 495)
+            cutoffs = [round(min(500, max(100, base + random.uniform(-15, 15))), 2) for _ in YEARS]
+            # Newer schools have no cutoffs for earlier years
+            missing = random.choice([0, 0, 0, 1, 2])
+            cutoffs = [''] * missing + cutoffs[missing:]
+            writer.writerow([f'{700000 + i}', f'{city} Lisesi {i}', city, f'{city} İlçe {i % 30}', random.choice(TYPES),
+                             random.choice([30, 60, 90, 120, 150, 180]), '0312 000 00 00',
+                             f'{city} Mahallesi {i}. Sokak No: {i % 100}'] + cutoffs)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 12000
+
+    import app as app_module
+    from app import app, db, School, init_db
+    from catalog import build_catalog
+    init_db()
+
+    source = os.path.join(BENCH_DIR, 'schools.csv')
+    write_source(source, n)
+
+    start = time.perf_counter()
+    version, count = build_catalog(source, app.config['SCHOOL_CATALOG'])
+    compile_time = time.perf_counter() - start
+
+    with app.app_context():
+        start = time.perf_counter()
+        app_module.sync_school_catalog()
+        app_module.load_school_index()
+        cold_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        app_module.sync_school_catalog()
+        app_module.load_school_index()
+        warm_time = time.perf_counter() - start
+
+        assert School.query.count() == count
+        sample = School.query.filter_by(code='700000').first()
+
+    print(f"Schools             : {count:,}")
+    print(f"Source CSV          : {os.path.getsize(source) / 1024:,.0f} KiB")
+    print(f"Compiled catalog    : {os.path.getsize(app.config['SCHOOL_CATALOG']) / 1024:,.0f} KiB")
+    print(f"Compile             : {compile_time:.2f}s")
+    print(f"Startup, new version: {cold_time:.2f}s (bulk load + index)")
+    print(f"Startup, unchanged  : {warm_time:.2f}s (version check + index)")
+    print(f"Sample school       : {sample.name}, cutoffs {sample.cutoffs}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Benchmark and parity check: in-memory SchoolIndex vs the three School.min_score SQL queries
+
+Usage: python benchmarks/bench_school_index.py [schools] [lookups]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Use a scratch database instead of the tracked instance database
+os.environ.setdefault('DATABASE_URL', 'sqlite:////tmp/lgs_database.db')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+CITIES = {
+    'İstanbul': ['Kadıköy', 'Beşiktaş', 'Üsküdar', 'Fatih', 'Bakırköy'],
+    'Ankara': ['Çankaya', 'Keçiören', 'Yenimahalle'],
+    'İzmir': ['Konak', 'Bornova', 'Karşıyaka'],
+    'Bursa': ['Nilüfer', 'Osmangazi'],
+    'Antalya': ['Muratpaşa', 'Konyaaltı'],
+}
+TYPES = ['Anadolu Lisesi', 'Fen Lisesi', 'Sosyal Bilimler Lisesi', 'Meslek Lisesi', 'İmam Hatip Lisesi']
+
+
+def sql_bands(session, School, score, filters):
+    """The previous route implementation, with the same filters applied"""
+    def query():
+        q = session.query(School)
+        for parameter, attribute in (('city', School.city), ('district', School.district), ('type', School.school_type)):
+            if filters.get(parameter):
+                q = q.filter(attribute == filters[parameter])
+        return q
+
+    def dicts(schools):
+        return [{'name': s.name, 'city': s.city, 'district': s.district,
+                 'type': s.school_type, 'min_score': s.min_score, 'quota': s.quota} for s in schools]
+
+    return {
+        'target_schools': dicts(query().filter(School.min_score <= score + 20, School.min_score >= score - 50)
+                                .order_by(School.min_score.desc()).limit(10).all()),
+        'safe_schools': dicts(query().filter(School.min_score <= score - 10)
+                              .order_by(School.min_score.desc()).limit(5).all()),
+        'reach_schools': dicts(query().filter(School.min_score > score, School.min_score <= score + 50)
+                               .order_by(School.min_score.asc()).limit(5).all()),
+    }
+
+
+def random_filters():
+    city = random.choice(list(CITIES))
+    return random.choice([
+        {},
+        {'city': city},
+        {'city': city, 'district': random.choice(CITIES[city])},
+        {'type': random.choice(TYPES)},
+        {'city': city, 'type': random.choice(TYPES)},
+    ])
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    lookups = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+
+    from app import db, School
+    from schools import SchoolIndex
+
+    random.seed(5)
+    path = os.path.join(tempfile.mkdtemp(prefix='lgs-bench-'), 'schools.db')
+    engine = sa.create_engine(f'sqlite:///{path}')
+    db.metadata.create_all(engine)
+    rows = []
+    for i in range(n):
+        city = random.choice(list(CITIES))
+        # Distinct scores so ORDER BY min_score has no ties to break differently
+        rows.append({'name': f'Okul {i}', 'city': city, 'district': random.choice(CITIES[city]),
+                     'school_type': random.choice(TYPES), 'min_score': round(random.uniform(200, 500), 6) + i * 1e-9,
+                     'max_score': 500, 'quota': random.randint(30, 300), 'created_at': datetime.utcnow()})
+    with engine.begin() as connection:
+        connection.execute(School.__table__.insert(), rows)
+
+    with Session(engine) as session:
+        start = time.perf_counter()
+        index = SchoolIndex(session.execute(sa.select(
+            School.id, School.name, School.city, School.district, School.school_type, School.min_score, School.quota)))
+        build_time = time.perf_counter() - start
+
+        queries = [(random.uniform(150, 520), random_filters()) for _ in range(lookups)]
+        mismatches = sum(1 for score, filters in queries
+                         if sql_bands(session, School, score, filters) != index.recommend(score, filters))
+
+        start = time.perf_counter()
+        for score, filters in queries:
+            sql_bands(session, School, score, filters)
+            session.expunge_all()
+        sql_time = (time.perf_counter() - start) / lookups
+
+    start = time.perf_counter()
+    for score, filters in queries:
+        index.recommend(score, filters)
+    index_time = (time.perf_counter() - start) / lookups
+
+    print(f"Schools: {n:,}, index built in {build_time * 1000:.1f} ms")
+    print(f"Parity: {lookups} lookups, {mismatches} mismatches")
+    print(f"SQL (3 queries) : {sql_time * 1e6:>9.1f} us/request")
+    print(f"SchoolIndex     : {index_time * 1e6:>9.1f} us/request ({sql_time / index_time:.0f}x)")
+    os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Benchmark: table-backed calculate_score vs the reference formula
+
+Parity between the two is checked by tests/test_score_tables.py.
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_batch_scoring import random_counts
+from scoring import BATCH_COLUMNS, calculate_score, calculate_score_formula
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+
+    rows = [dict(zip(BATCH_COLUMNS, row)) for row in random_counts(n).tolist()]
+
+    for name, function in (('calculate_score_formula', calculate_score_formula), ('calculate_score (tables)', calculate_score)):
+        start = time.perf_counter()
+        for row in rows:
+            function(row)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<26}: {n / elapsed:>10,.0f} calls/s")
+
+
+if __name__ == '__main__':
+    main()
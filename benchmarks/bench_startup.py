@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Benchmark: worker boot time, from a fresh interpreter to the first response
+
+Each sample is a new process that imports the app, runs the per-worker
+startup and serves GET / through the test client. "lazy" is what a gunicorn
+worker does now (create_app); "eager" also runs init_db in the worker, which
+is what every worker used to do at import. The database is prepared once
+beforehand, as `flask init-db` does before gunicorn forks.
+
+Usage: python benchmarks/bench_startup.py [samples]
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = tempfile.mkdtemp(prefix='lgs-bench-')
+
+WORKER = """
+import json, os, sys, time
+start = time.perf_counter()
+sys.stdout = open(os.devnull, 'w')
+import app as app_module
+imported = time.perf_counter()
+if {eager}:
+    app_module.init_db()
+app = app_module.create_app()
+ready = time.perf_counter()
+response = app.test_client().get('/')
+assert response.status_code == 200
+done = time.perf_counter()
+sys.stdout = sys.__stdout__
+print(json.dumps({{'import': imported - start, 'startup': ready - imported, 'first_response': done - ready,
+                  'total': done - start, 'modules': sorted(set(sys.modules) & {{'requests', 'ai_client'}})}}))
+"""
+
+
+def sample(mode, env):
+    output = subprocess.run([sys.executable, '-c', WORKER.format(eager=mode == 'eager')], cwd=ROOT, env=env,
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    samples = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{BENCH_DIR}/lgs_database.db')
+    subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'init-db'], cwd=ROOT, env=env,
+                   check=True, capture_output=True)
+
+    print(f"{samples} fresh worker processes per mode (median seconds)")
+    print(f"{'mode':<6} {'import':>8} {'startup':>8} {'first GET /':>12} {'total':>8}  heavy modules loaded")
+    for mode in ('eager', 'lazy'):
+        runs = [sample(mode, env) for _ in range(samples)]
+        median = {key: statistics.median(run[key] for run in runs) for key in ('import', 'startup', 'first_response', 'total')}
+        print(f"{mode:<6} {median['import']:8.3f} {median['startup']:8.3f} {median['first_response']:12.3f} "
+              f"{median['total']:8.3f}  {', '.join(runs[0]['modules']) or '-'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Benchmark: /study-stats from stored statistics vs a full scan of the session history
+
+One user with [history] study sessions (one to three a day, with skipped days
+so streaks break): times POST /study-session (which folds the session into
+the statistics) and GET /study-stats (response cache off) against computing
+the same body from a full scan per request. Then [users] users with
+[sessions] sessions between them are rebuilt in one ordered streaming pass,
+more sessions are posted for some of them, and every user's stored
+statistics are checked against a full scan.
+
+Usage: python benchmarks/bench_study_stats.py [history] [users] [sessions]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from itertools import groupby
+
+BENCH_DIR = tempfile.mkdtemp(prefix='lgs-bench-')
+os.environ.setdefault('DATABASE_URL', f'sqlite:///{BENCH_DIR}/lgs_database.db')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SUBJECTS = ['turkce', 'matematik', 'fen', 'inkilap', 'din', 'ingilizce']
+
+
+def history(rng, count, end):
+    """count study sessions ending before end, oldest first, on about 80% of the days"""
+    sessions, day = [], end - timedelta(days=1)
+    while len(sessions) < count:
+        if rng.random() < 0.8:
+            for _ in range(rng.randint(1, 3)):
+                sessions.append({'subject': rng.choice(SUBJECTS), 'duration_minutes': rng.randint(15, 150),
+                                 'created_at': day.replace(hour=rng.randint(6, 22), minute=rng.randint(0, 59))})
+        day -= timedelta(days=1)
+    return sorted(sessions[:count], key=lambda row: row['created_at'])
+
+
+def main():
+    history_n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    users = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    sessions_n = int(sys.argv[3]) if len(sys.argv) > 3 else 1_000_000
+
+    from app import (app, db, sa, StudySession, User, UserStudyStats, init_db, local_today, rebuild_all_study_stats,
+                     STUDY_STATS_COLUMNS)
+    from study_stats import full_scan_payload, compare_payloads, stats_payload
+    init_db()
+    app.config['RESPONSE_CACHE'] = False
+    days, utc_offset = app.config['STUDY_STATS_DAYS'], app.config['STUDY_DAY_UTC_OFFSET']
+    rng = random.Random(3)
+    now = datetime.utcnow()
+
+    client = app.test_client()
+    client.post('/register', json={'username': 'bench-study', 'password': 'bench'})
+    client.post('/login', json={'username': 'bench-study', 'password': 'bench'})
+    with app.app_context():
+        user_id = User.query.filter_by(username='bench-study').first().id
+        db.session.execute(sa.insert(StudySession), [dict(row, user_id=user_id) for row in history(rng, history_n, now)])
+        db.session.commit()
+    client.get('/study-stats')  # builds the statistics once
+
+    requests_n = 200
+    start = time.perf_counter()
+    for index in range(requests_n):
+        client.post('/study-session', json={'subject': SUBJECTS[index % 6], 'duration': 30})
+    post_time = (time.perf_counter() - start) / requests_n
+    start = time.perf_counter()
+    for _ in range(requests_n):
+        stored = client.get('/study-stats').get_json()
+    read_time = (time.perf_counter() - start) / requests_n
+    with app.app_context():
+        scans = 20
+        start = time.perf_counter()
+        for _ in range(scans):
+            scanned = full_scan_payload(db.session.execute(
+                sa.select(*STUDY_STATS_COLUMNS).where(StudySession.user_id == user_id)).all(), local_today(), days, utc_offset)
+        scan_time = (time.perf_counter() - start) / scans
+    differences = compare_payloads(scanned, stored)
+    print(f"One user, {history_n + requests_n:,} sessions, current streak {stored['current_streak']}, "
+          f"longest {stored['longest_streak']}")
+    print(f"  POST /study-session (incremental) : {post_time * 1000:7.2f} ms")
+    print(f"  GET /study-stats (stored)         : {read_time * 1000:7.2f} ms")
+    print(f"  full scan per request             : {scan_time * 1000:7.2f} ms")
+    print(f"  parity: {'ok' if not differences else differences[:5]}")
+
+    start = time.perf_counter()
+    with app.app_context():
+        db.session.execute(sa.insert(User), [{'username': f'study-{index}', 'password_hash': 'x'} for index in range(users)])
+        user_ids = db.session.scalars(sa.select(User.id).where(User.username.like('study-%'))).all()
+        per_user = sessions_n // users
+        for first in range(0, users, 1000):
+            db.session.execute(sa.insert(StudySession), [
+                dict(row, user_id=other) for other in user_ids[first:first + 1000] for row in history(rng, per_user, now)])
+        db.session.commit()
+    print(f"\n{users:,} users, {per_user * users:,} sessions (generated in {time.perf_counter() - start:.1f}s)")
+
+    with app.app_context():
+        start = time.perf_counter()
+        rebuilt = rebuild_all_study_stats()
+        print(f"  rebuild in user-range chunks : {time.perf_counter() - start:6.1f}s for {rebuilt:,} users")
+
+    # More sessions on top of the rebuilt statistics, through the route, for some users
+    for other in rng.sample(range(users), 50):
+        other_client = app.test_client()
+        with other_client.session_transaction() as browser_session:
+            browser_session['user_id'] = user_ids[other]
+        for _ in range(5):
+            other_client.post('/study-session', json={'subject': rng.choice(SUBJECTS), 'duration': rng.randint(15, 150)})
+
+    with app.app_context():
+        today = local_today()
+        stored = {row.user_id: row.data for row in db.session.execute(sa.select(UserStudyStats.user_id, UserStudyStats.data))}
+        rows = db.session.execute(sa.select(*STUDY_STATS_COLUMNS).order_by(StudySession.user_id))
+        start = time.perf_counter()
+        mismatched = checked = 0
+        for checked_user, user_sessions in groupby(rows, key=lambda row: row.user_id):
+            checked += 1
+            if compare_payloads(full_scan_payload(list(user_sessions), today, days, utc_offset),
+                                stats_payload(stored[checked_user], today, days)):
+                mismatched += 1
+        print(f"  parity check of every user    : {checked:,} checked, {mismatched} mismatched "
+              f"({time.perf_counter() - start:.1f}s)")
+
+
+if __name__ == '__main__':
+    main()
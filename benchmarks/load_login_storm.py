@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Load test: a login storm against gunicorn, and what it does to /calculate
+
+Starts gunicorn with gunicorn.conf.py on a scratch database holding the
+storm's users, measures /calculate latency while idle, then fires all logins
+at once (one client thread each) while a logged-in probe keeps posting
+/calculate. A 503 from the hashing limit is retried after its Retry-After,
+doubling on each further 503 (with jitter), as a well-behaved client would.
+Runs once with hashing inline and unlimited (the old behaviour) and once
+with the default process pool and limits.
+
+Users are seeded with PBKDF2 at [iterations] (60,000 by default, a tenth of
+the production cost) so the inline run finishes in reasonable time; both runs
+hash with the same parameters.
+
+Usage: python benchmarks/load_login_storm.py [logins] [iterations]
+"""
+
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = tempfile.mkdtemp(prefix='lgs-bench-')
+DATABASE_URL = f'sqlite:///{BENCH_DIR}/lgs_database.db'
+PORT = 5077
+BASE = f'http://127.0.0.1:{PORT}'
+PASSWORD = 'storm-password'
+
+MODES = {
+    'inline': {'PASSWORD_HASH_PROCESSES': '0', 'PASSWORD_HASH_LOGIN_LIMIT': '100000'},
+    'pool': {},
+}
+
+
+def seed(logins, method):
+    """Create the storm's users and the probe user directly, with one shared hash"""
+    os.environ['DATABASE_URL'] = DATABASE_URL
+    sys.path.insert(0, ROOT)
+    from werkzeug.security import generate_password_hash
+    from app import app, db, sa, User, init_db
+
+    init_db()
+    password_hash = generate_password_hash(PASSWORD, method)
+    with app.app_context():
+        db.session.execute(sa.insert(User), [{'username': f'storm-{index}', 'password_hash': password_hash}
+                                             for index in range(logins)] + [{'username': 'probe', 'password_hash': password_hash}])
+        db.session.commit()
+
+
+def serve(env):
+    server = subprocess.Popen(['gunicorn', '--config', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{PORT}', '--workers', '1'],
+                              cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    for _ in range(200):
+        try:
+            if requests.get(f'{BASE}/health', timeout=1).ok:
+                return server
+        except requests.RequestException:
+            pass
+        time.sleep(0.1)
+    server.kill()
+    raise RuntimeError('gunicorn did not start')
+
+
+def probe(client, stop, latencies):
+    rng = random.Random(7)
+    while not stop.is_set():
+        started = time.perf_counter()
+        response = client.post(f'{BASE}/calculate', json={'fen_dogru': rng.randint(0, 20)}, timeout=120)
+        assert response.json()['success']
+        latencies.append(time.perf_counter() - started)
+        time.sleep(0.05)
+
+
+def login(index, gate, results):
+    gate.wait()
+    started = time.perf_counter()
+    attempts = 0
+    while True:
+        attempts += 1
+        # A new connection per attempt: a kept-alive one may be closed by the server during the backoff
+        response = requests.post(f'{BASE}/login', json={'username': f'storm-{index}', 'password': PASSWORD}, timeout=300)
+        if response.status_code != 503:
+            break
+        backoff = int(response.headers.get('Retry-After', 1)) * 2 ** min(attempts - 1, 3)
+        time.sleep(backoff * random.uniform(0.5, 1.5))
+    results.append((time.perf_counter() - started, attempts, response.json()['success']))
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] * 1000 if values else 0.0
+
+
+def run(label, env, logins):
+    server = serve(env)
+    try:
+        client = requests.Session()
+        assert client.post(f'{BASE}/login', json={'username': 'probe', 'password': PASSWORD}).json()['success']
+
+        # Idle baseline
+        idle, stop = [], threading.Event()
+        thread = threading.Thread(target=probe, args=(client, stop, idle))
+        thread.start()
+        time.sleep(3)
+        stop.set()
+        thread.join()
+
+        # The storm, with the probe running throughout
+        busy, stop = [], threading.Event()
+        probe_thread = threading.Thread(target=probe, args=(client, stop, busy))
+        gate = threading.Barrier(logins + 1)
+        results = []
+        clients = [threading.Thread(target=login, args=(index, gate, results)) for index in range(logins)]
+        for thread in clients:
+            thread.start()
+        probe_thread.start()
+        gate.wait()
+        started = time.perf_counter()
+        for thread in clients:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        stop.set()
+        probe_thread.join()
+
+        hashing = client.get(f'{BASE}/hash-stats').json()['routes']['login']
+    finally:
+        server.terminate()
+        server.wait()
+
+    times = [result[0] for result in results]
+    succeeded = sum(1 for result in results if result[2])
+    print(f"{label:<7} logins: {succeeded}/{logins} ok in {elapsed:6.1f}s ({succeeded / elapsed:6.1f}/s), "
+          f"p50 {percentile(times, 0.5):8.0f} ms, p99 {percentile(times, 0.99):8.0f} ms, "
+          f"{sum(result[1] for result in results) - logins} retried 503s")
+    print(f"{'':<7} /calculate: idle p50 {percentile(idle, 0.5):6.1f} ms; during storm {len(busy)} requests, "
+          f"p50 {percentile(busy, 0.5):8.1f} ms, p99 {percentile(busy, 0.99):8.1f} ms, max {max(busy, default=0) * 1000:8.1f} ms")
+    print(f"{'':<7} hashing: queue p50 {hashing['queue_p50']} s, p95 {hashing['queue_p95']} s; "
+          f"hash p50 {hashing['hash_p50']} s; rejected {hashing['rejected']}")
+
+
+def main():
+    logins = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 60000
+    method = f'pbkdf2:sha256:{iterations}'
+    seed(logins, method)
+
+    print(f"{logins} simultaneous logins, {method}, 1 gunicorn worker")
+    for label, overrides in MODES.items():
+        env = dict(os.environ, DATABASE_URL=DATABASE_URL, PASSWORD_HASH_METHOD=method, ADMIN_USERNAMES='probe', **overrides)
+        run(label, env, logins)
+
+
+if __name__ == '__main__':
+    main()
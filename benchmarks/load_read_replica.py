@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Load test: concurrent dashboard reads with and without a read replica
+
+Seeds users with score, mock exam and achievement history, snapshots the
+primary into a replica file (two SQLite files stand in for PostgreSQL and its
+replica), then runs reader processes that load the dashboard and its data
+routes while writer processes keep posting /calculate. Reports reads/s, p99
+read latency and how many reader queries each database served.
+
+Usage: python benchmarks/load_read_replica.py [readers] [writers] [threads] [seconds]
+"""
+
+import glob
+import multiprocessing
+import os
+import random
+import sqlite3
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PRIMARY = '/tmp/lgs_primary.db'
+REPLICA = '/tmp/lgs_replica.db'
+USERS = 200
+# What the dashboard page loads: the page itself, then its data routes
+READ_PATHS = ['/dashboard', '/analytics', '/achievements', '/mock-exam', '/school-recommendations']
+
+
+def boot(env):
+    os.environ['DATABASE_URL'] = f'sqlite:///{PRIMARY}'
+    os.environ.update(env)
+    sys.path.insert(0, ROOT)
+    sys.stdout = open(os.devnull, 'w')
+    import app as app_module
+    return app_module
+
+
+def seed(users, scores_per_user):
+    """Create users with history on the primary, then snapshot it into the replica"""
+    app_module = boot({})
+    from bench_batch_scoring import random_counts
+    from importer import import_scores
+    from scoring import BATCH_COLUMNS
+
+    app, db = app_module.app, app_module.db
+    app_module.init_db()
+    for index in range(users):
+        client = app.test_client()
+        client.post('/register', json={'username': f'reader-{index}', 'password': 'load'})
+    with app.app_context():
+        user_ids = [user.id for user in app_module.User.query.order_by(app_module.User.id).all()]
+        rows = [dict(zip(BATCH_COLUMNS, row), user_id=user_ids[i % len(user_ids)])
+                for i, row in enumerate(random_counts(users * scores_per_user).tolist())]
+        with db.engine.connect() as connection:
+            import_scores(rows, connection, app_module.Score.__table__)
+        for user_id in user_ids:
+            db.session.add(app_module.MockExam(user_id=user_id, exam_name='Deneme', total_questions=90, correct_answers=60,
+                                                 wrong_answers=20, empty_answers=10, time_spent=120))
+            db.session.add(app_module.Achievement(user_id=user_id, achievement_type='first_score', title='İlk Adım',
+                                                  description='İlk puan hesaplamanızı yaptınız!', badge_icon='🎯'))
+        db.session.commit()
+        app_module.rebuild_all_analytics()
+        db.session.commit()
+        db.engine.dispose()
+
+    source, target = sqlite3.connect(PRIMARY), sqlite3.connect(REPLICA)
+    source.backup(target)
+    source.close()
+    target.close()
+
+
+def worker(role, index, env, threads, seconds, ready, start, results):
+    app_module = boot(env)
+    from scoring import SUBJECTS
+
+    # Count reader statements per engine to confirm where they were served
+    served = {}
+    with app_module.app.app_context():
+        engines = dict(app_module.db.engines)
+    for key, engine in engines.items():
+        name = key or 'primary'
+        served[name] = 0
+
+        def count(*args, name=name):
+            served[name] += 1
+        app_module.sa.event.listen(engine, 'before_cursor_execute', count)
+
+    clients = []
+    for thread in range(threads):
+        client = app_module.app.test_client()
+        username = f'reader-{(index * threads + thread) % USERS}'
+        client.post('/login', json={'username': username, 'password': 'load'})
+        clients.append(client)
+    for name in served:
+        served[name] = 0
+
+    latencies = [[] for _ in clients]
+    failures = [0 for _ in clients]
+
+    def drive(slot, client):
+        rng = random.Random(index * 1000 + slot)
+        while time.time() < deadline:
+            started = time.perf_counter()
+            if role == 'writer':
+                response = client.post('/calculate', json={f'{subject}_dogru': rng.randint(0, 10) for subject in SUBJECTS})
+            else:
+                response = client.get(rng.choice(READ_PATHS))
+            latencies[slot].append(time.perf_counter() - started)
+            if response.status_code != 200 or '"success":false' in response.get_data(as_text=True).replace(' ', ''):
+                failures[slot] += 1
+
+    ready.put(index)
+    start.wait()
+    deadline = time.time() + seconds
+    pool = [threading.Thread(target=drive, args=(slot, client)) for slot, client in enumerate(clients)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    results.put((role, [latency for part in latencies for latency in part], sum(failures), served))
+
+
+def run(label, env, readers, writers, threads, seconds):
+    context = multiprocessing.get_context('spawn')
+    ready, start, results = context.Queue(), context.Event(), context.Queue()
+    processes = [context.Process(target=worker, args=('reader', i, env, threads, seconds, ready, start, results))
+                 for i in range(readers)]
+    # Writers log in as the last seeded users so readers keep reading the replica
+    processes += [context.Process(target=worker, args=('writer', USERS - 1 - i, env, 1, seconds, ready, start, results))
+                  for i in range(writers)]
+    for process in processes:
+        process.start()
+    for _ in processes:
+        ready.get()
+    start.set()
+    collected = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    for role in ('reader', 'writer'):
+        rows = [row for row in collected if row[0] == role]
+        if not rows:
+            continue
+        latencies = sorted(latency for row in rows for latency in row[1])
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] if latencies else 0
+        served = {}
+        for row in rows:
+            for name, count in row[3].items():
+                served[name] = served.get(name, 0) + count
+        share = ', '.join(f'{name} {count}' for name, count in served.items()) if role == 'reader' else ''
+        print(f"{label:<16} {role}s: {len(latencies) / seconds:8.1f} req/s, p99 {p99 * 1000:7.1f} ms, "
+              f"{sum(row[2] for row in rows)} failed{'; queries: ' + share if share else ''}")
+
+
+def main():
+    readers = int(sys.argv[1]) if len(sys.argv) > 1 else 2
+    writers = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    threads = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    seconds = float(sys.argv[4]) if len(sys.argv) > 4 else 10
+
+    for path in glob.glob(f'{PRIMARY}*') + glob.glob(f'{REPLICA}*'):
+        os.remove(path)
+    context = multiprocessing.get_context('spawn')
+    seeder = context.Process(target=seed, args=(USERS, 50))
+    seeder.start()
+    seeder.join()
+
+    print(f"{readers} reader processes x {threads} threads, {writers} writers, {seconds:.0f}s per run")
+    run('primary only', {}, readers, writers, threads, seconds)
+    run('with replica', {'DATABASE_REPLICA_URL': f'sqlite:///{REPLICA}'}, readers, writers, threads, seconds)
+    for path in glob.glob(f'{PRIMARY}*') + glob.glob(f'{REPLICA}*'):
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Load test: concurrent writer and reader processes against one SQLite file
+
+Each process imports the app like a gunicorn worker would and drives it
+through the test client: writers POST /calculate, readers GET /analytics and
+/dashboard. Runs once with SQLite's defaults (SQLITE_TUNING=0) and once with
+the tuned profile, on a fresh database each time, and reports throughput,
+latency and "database is locked" errors.
+
+Usage: python benchmarks/load_sqlite.py [writers] [readers] [seconds]
+"""
+
+import glob
+import multiprocessing
+import os
+import random
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DB_PATH = '/tmp/lgs_database.db'
+
+
+def drive(client, role, seed, deadline, counts, latencies):
+    """Send requests until the deadline; counts is [ok, locked, failed]"""
+    from scoring import SUBJECTS
+
+    rng = random.Random(seed)
+    while time.time() < deadline:
+        started = time.perf_counter()
+        if role == 'writer':
+            response = client.post('/calculate', json={f'{subject}_dogru': rng.randint(0, 10) for subject in SUBJECTS})
+        else:
+            response = client.get('/analytics' if rng.random() < 0.5 else '/dashboard')
+        latencies.append(time.perf_counter() - started)
+        body = response.get_data(as_text=True)
+        if 'locked' in body:
+            counts[1] += 1
+        elif response.status_code != 200 or '"success":false' in body.replace(' ', ''):
+            counts[2] += 1
+        else:
+            counts[0] += 1
+
+
+def worker(role, index, env, seconds, ready, start, results, threads=1):
+    # Use a scratch database instead of the tracked instance database
+    os.environ['DATABASE_URL'] = f'sqlite:///{DB_PATH}'
+    os.environ.update(env)
+    sys.path.insert(0, ROOT)
+    sys.stdout = open(os.devnull, 'w')
+    import app as app_module
+    from scoring import SUBJECTS
+
+    if index < 0:
+        # The init run prepares the schema, like `flask init-db` before gunicorn forks
+        app_module.init_db()
+
+    # One logged-in client per request thread, like a threaded gunicorn worker
+    clients = []
+    for thread in range(threads):
+        client = app_module.app.test_client()
+        username = f'load-{"-".join(env.values())}-{role}-{index}-{thread}'
+        client.post('/register', json={'username': username, 'password': 'load'})
+        client.post('/login', json={'username': username, 'password': 'load'})
+        client.post('/calculate', json={f'{subject}_dogru': 10 for subject in SUBJECTS})
+        clients.append(client)
+
+    counts = [[0, 0, 0] for _ in clients]
+    latencies = [[] for _ in clients]
+    # Wait until every worker has booted so the measured window is fully concurrent
+    ready.put(index)
+    start.wait()
+    deadline = time.time() + seconds
+    pool = [threading.Thread(target=drive, args=(client, role, index * 1000 + i, deadline, counts[i], latencies[i]))
+            for i, client in enumerate(clients)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    ok, locked, failed = (sum(column) for column in zip(*counts))
+    commits = ok if role == 'writer' else 0
+    buffer = getattr(app_module, 'write_buffer', None)
+    if buffer is not None:
+        # Drain what is still queued; the drain counts towards the run time
+        buffer.close()
+        commits = buffer.stats()['commits']
+    elapsed = time.time() - deadline + seconds
+    results.put((role, ok, locked, failed, [latency for part in latencies for latency in part], commits, elapsed))
+
+
+def run(label, env, writers, readers, seconds, threads=1):
+    """One load run on a fresh database; returns {role: summary}"""
+    for path in glob.glob(f'{DB_PATH}*'):
+        os.remove(path)
+    context = multiprocessing.get_context('spawn')
+    ready, start, results = context.Queue(), context.Event(), context.Queue()
+    # Create the schema once before the workers start
+    init = context.Process(target=worker, args=('reader', -1, env, 0, ready, start, results))
+    init.start()
+    ready.get()
+    start.set()
+    results.get()
+    init.join()
+    start.clear()
+
+    processes = [context.Process(target=worker, args=('writer', i, env, seconds, ready, start, results, threads)) for i in range(writers)]
+    processes += [context.Process(target=worker, args=('reader', i, env, seconds, ready, start, results, threads)) for i in range(readers)]
+    for process in processes:
+        process.start()
+    for _ in processes:
+        ready.get()
+    start.set()
+    collected = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    summary = {}
+    for role in ('writer', 'reader'):
+        rows = [row for row in collected if row[0] == role]
+        if not rows:
+            continue
+        ok = sum(row[1] for row in rows)
+        locked = sum(row[2] for row in rows)
+        failed = sum(row[3] for row in rows)
+        latencies = sorted(latency for row in rows for latency in row[4])
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] if latencies else 0
+        elapsed = max(row[6] for row in rows)
+        summary[role] = {'ok': ok, 'commits': sum(row[5] for row in rows), 'elapsed': elapsed, 'p99': p99}
+        print(f"{label:<16} {role}s: {ok / seconds:8.1f} ok/s, {locked:5} locked, {failed:5} failed, "
+              f"p99 {p99 * 1000:7.1f} ms")
+    return summary
+
+
+def main():
+    writers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    readers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    seconds = float(sys.argv[3]) if len(sys.argv) > 3 else 10
+
+    print(f"{writers} writer and {readers} reader processes, {seconds:.0f}s per run")
+    run('SQLite defaults', {'SQLITE_TUNING': '0'}, writers, readers, seconds)
+    run('tuned (WAL)', {'SQLITE_TUNING': '1'}, writers, readers, seconds)
+    for path in glob.glob(f'{DB_PATH}*'):
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Load test: per-request commits vs the write-behind buffer
+
+Writer processes with several request threads each POST /calculate as fast
+as they can (readers optional), once per WRITE_BEHIND mode on a fresh
+database. Reports accepted requests/s, database commits/s (the drain of
+queued rows counts towards the run time) and p99 request latency.
+
+Usage: python benchmarks/load_write_behind.py [writers] [threads] [seconds] [readers]
+"""
+
+import glob
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_sqlite import DB_PATH, run
+
+MODES = ['off', 'group', 'async']
+
+
+def main():
+    writers = int(sys.argv[1]) if len(sys.argv) > 1 else 2
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    seconds = float(sys.argv[3]) if len(sys.argv) > 3 else 10
+    readers = int(sys.argv[4]) if len(sys.argv) > 4 else 0
+
+    print(f"{writers} writer processes x {threads} threads, {readers} readers, {seconds:.0f}s per run")
+    results = {}
+    for mode in MODES:
+        results[mode] = run(f'WRITE_BEHIND={mode}', {'SQLITE_TUNING': '1', 'WRITE_BEHIND': mode},
+                            writers, readers, seconds, threads)['writer']
+
+    print(f"\n{'mode':<8} {'requests/s':>11} {'commits/s':>10} {'rows/commit':>12} {'p99 ms':>8}")
+    for mode, summary in results.items():
+        commits = max(summary['commits'], 1)
+        print(f"{mode:<8} {summary['ok'] / summary['elapsed']:11.1f} {summary['commits'] / summary['elapsed']:10.1f} "
+              f"{summary['ok'] / commits:12.1f} {summary['p99'] * 1000:8.1f}")
+    for path in glob.glob(f'{DB_PATH}*'):
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+"""
+LGS Puan Hesaplama Sistemi - National school catalog compiler and loader
+"""
+
+import csv
+import hashlib
+import json
+import os
+import re
+
+import numpy as np
+
+# Text columns stored as one UTF-8 blob plus offsets each
+TEXT_COLUMNS = ['code', 'name', 'website', 'phone', 'address', 'description']
+# Low-cardinality columns stored as codes into a shared vocabulary
+CATEGORY_COLUMNS = ['city', 'district', 'school_type']
+REQUIRED_COLUMNS = ['name', 'city', 'district', 'school_type']
+# Multi-year cutoff columns in CSV sources, e.g. taban_2024
+CUTOFF_COLUMN = re.compile(r'^taban_(\d{4})$')
+# Scores are stored as integer hundredths; missing cutoffs as -1
+MISSING = -1
+
+
+def source_version(path):
+    """Version stamp of a catalog source: SHA-256 of its bytes"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _to_hundredths(value):
+    return int(round(float(value) * 100))
+
+
+def _read_source_rows(path):
+    """Yield (row number, raw dict, cutoffs by year) from a CSV or JSON catalog source"""
+    if path.lower().endswith('.json'):
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        rows = data['schools'] if isinstance(data, dict) else data
+        for number, row in enumerate(rows, start=1):
+            cutoffs = row.get('cutoffs') or row.get('taban_puanlari') or {}
+            yield number, row, {int(year): score for year, score in cutoffs.items() if score not in (None, '')}
+    else:
+        with open(path, encoding='utf-8-sig', newline='') as f:
+            for number, row in enumerate(csv.DictReader(f), start=1):
+                cutoffs = {}
+                for column, score in row.items():
+                    match = CUTOFF_COLUMN.match(column or '')
+                    if match and score not in (None, ''):
+                        cutoffs[int(match.group(1))] = score
+                yield number, row, cutoffs
+
+
+def read_catalog(path):
+    """Parse and validate a catalog source into school records
+
+    Each record has the School columns plus 'cutoffs' ({year: score}). min_score
+    defaults to the latest year's cutoff and max_score to the highest cutoff.
+    Raises ValueError naming the first invalid row.
+    """
+    records = []
+    for number, row, cutoffs in _read_source_rows(path):
+        try:
+            missing = [column for column in REQUIRED_COLUMNS if not row.get(column)]
+            if missing:
+                raise ValueError(f"eksik sütun: {', '.join(missing)}")
+            cutoffs = {year: float(score) for year, score in sorted(cutoffs.items())}
+            min_score = row.get('min_score')
+            min_score = float(min_score) if min_score not in (None, '') else (cutoffs[max(cutoffs)] if cutoffs else None)
+            if min_score is None:
+                raise ValueError('taban puanı yok')
+            max_score = row.get('max_score')
+            max_score = float(max_score) if max_score not in (None, '') else max([min_score, *cutoffs.values()])
+            record = {column: str(row.get(column) or '') for column in TEXT_COLUMNS + CATEGORY_COLUMNS}
+            record.update({
+                'quota': int(row.get('quota') or 0),
+                'min_score': min_score,
+                'max_score': max_score,
+                'cutoffs': cutoffs
+            })
+        except (TypeError, ValueError) as e:
+            raise ValueError(f'Katalog satırı {number} geçersiz: {e}') from None
+        records.append(record)
+    return records
+
+
+def _pack_text(values):
+    encoded = [value.encode('utf-8') for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int32)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets
+
+
+def _unpack_text(blob, offsets):
+    data = blob.tobytes()
+    offsets = offsets.tolist()
+    return [data[start:end].decode('utf-8') for start, end in zip(offsets, offsets[1:])]
+
+
+def compile_catalog(records, version):
+    """Columnar arrays for a list of records (see read_catalog)"""
+    years = sorted({year for record in records for year in record['cutoffs']})
+    year_column = {year: column for column, year in enumerate(years)}
+    cutoffs = np.full((len(records), len(years)), MISSING, dtype=np.int32)
+    for row, record in enumerate(records):
+        for year, score in record['cutoffs'].items():
+            cutoffs[row, year_column[year]] = _to_hundredths(score)
+
+    arrays = {
+        'version': np.array(version),
+        'years': np.array(years, dtype=np.int16),
+        'cutoffs': cutoffs,
+        'quota': np.array([record['quota'] for record in records], dtype=np.int32),
+        'min_score': np.array([_to_hundredths(record['min_score']) for record in records], dtype=np.int32),
+        'max_score': np.array([_to_hundredths(record['max_score']) for record in records], dtype=np.int32),
+    }
+    for column in TEXT_COLUMNS:
+        arrays[f'{column}_blob'], arrays[f'{column}_offsets'] = _pack_text([record[column] for record in records])
+
+    vocabulary = sorted({record[column] for record in records for column in CATEGORY_COLUMNS})
+    codes = {value: code for code, value in enumerate(vocabulary)}
+    arrays['vocabulary_blob'], arrays['vocabulary_offsets'] = _pack_text(vocabulary)
+    for column in CATEGORY_COLUMNS:
+        arrays[column] = np.array([codes[record[column]] for record in records], dtype=np.uint32)
+    return arrays
+
+
+def write_catalog(path, arrays):
+    """Write compiled arrays atomically as a compressed .npz"""
+    tmp_path = f'{path}.tmp.npz'
+    np.savez_compressed(tmp_path, **arrays)
+    os.replace(tmp_path, path)
+
+
+def build_catalog(source, output):
+    """Compile a CSV/JSON catalog source into output; returns (version, school count)"""
+    version = source_version(source)
+    records = read_catalog(source)
+    write_catalog(output, compile_catalog(records, version))
+    return version, len(records)
+
+
+def catalog_version(path):
+    """Version stamp of a compiled catalog without decoding its columns"""
+    with np.load(path) as catalog:
+        return str(catalog['version'])
+
+
+def load_catalog(path):
+    """Decode a compiled catalog into (version, School insert rows)"""
+    with np.load(path) as catalog:
+        version = str(catalog['version'])
+        years = catalog['years'].tolist()
+        cutoffs = catalog['cutoffs'].tolist()
+        quotas = catalog['quota'].tolist()
+        min_scores = (catalog['min_score'] / 100).tolist()
+        max_scores = (catalog['max_score'] / 100).tolist()
+        texts = {column: _unpack_text(catalog[f'{column}_blob'], catalog[f'{column}_offsets']) for column in TEXT_COLUMNS}
+        vocabulary = _unpack_text(catalog['vocabulary_blob'], catalog['vocabulary_offsets'])
+        categories = {column: [vocabulary[code] for code in catalog[column].tolist()] for column in CATEGORY_COLUMNS}
+
+    rows = []
+    for index in range(len(quotas)):
+        row = {column: texts[column][index] or None for column in TEXT_COLUMNS}
+        row.update({column: categories[column][index] for column in CATEGORY_COLUMNS})
+        row.update({
+            'quota': quotas[index],
+            'min_score': min_scores[index],
+            'max_score': max_scores[index],
+            'cutoffs': {str(year): score / 100 for year, score in zip(years, cutoffs[index]) if score != MISSING}
+        })
+        rows.append(row)
+    return version, rows
@@ -0,0 +1,298 @@
+"""
+LGS Puan Hesaplama Sistemi - Score trajectory forecasts
+"""
+
+import math
+from datetime import date, datetime, time
+from itertools import islice
+from statistics import NormalDist
+
+import numpy as np
+
+from scoring import SUBJECTS, MAX_QUESTIONS, BASE_SCORE, MAX_TOTAL
+
+# Forecast series: the total score, then the net of each subject in SUBJECTS order
+SERIES = ['total'] + SUBJECTS
+LOWER = np.array([BASE_SCORE] + [0.0] * len(SUBJECTS))
+UPPER = np.array([float(MAX_TOTAL)] + [float(MAX_QUESTIONS[subject]) for subject in SUBJECTS])
+# Spread assumed for a user with few scores, counted as PRIOR_WEIGHT scores alongside their own residuals
+PRIOR_SIGMA = 0.1 * (UPPER - LOWER)
+PRIOR_WEIGHT = 2
+# A trend is fitted once the weighted spread of score dates reaches a day
+MIN_TIME_VARIANCE = 1.0
+
+DEFAULT_HALF_LIFE = 60
+DEFAULT_DAMPING = 90
+DEFAULT_CONFIDENCE = 0.8
+
+EPOCH = datetime(1970, 1, 1)
+STATE_SUMS = ('s0', 's1', 's2', 'sww')
+SERIES_SUMS = ('sy', 'sty', 'syy')
+
+
+def day_number(moment):
+    """Days since the epoch of a naive UTC datetime, as a float"""
+    return (moment - EPOCH).total_seconds() / 86400
+
+
+def default_target_date(today):
+    """Next June 15 on or after today; LGS is held in mid-June"""
+    target = date(today.year, 6, 15)
+    return target if target >= today else date(today.year + 1, 6, 15)
+
+
+def series_values(totals, counts):
+    """(N x 7) series values from total scores (N,) and dogru/yanlis counts (N x 12, BATCH_COLUMNS order)"""
+    counts = np.asarray(counts, dtype=np.float64).reshape(-1, 2 * len(SUBJECTS))
+    values = np.empty((counts.shape[0], len(SERIES)), dtype=np.float64)
+    values[:, 0] = totals
+    values[:, 1:] = np.maximum(0, counts[:, 0::2] - counts[:, 1::2] / 3)
+    return values
+
+
+def score_values(score):
+    """Series values of one score (model instance or result row)"""
+    counts = [getattr(score, f'{subject}_{kind}') or 0 for subject in SUBJECTS for kind in ('dogru', 'yanlis')]
+    return series_values([score.total_score], counts)[0]
+
+
+def new_state():
+    """Trend state of a user with no scores
+
+    Exponentially weighted least-squares sums with times in days relative to
+    the latest score: s0 = sum w, s1 = sum w t, s2 = sum w t^2, sww = sum w^2,
+    and per series sy = sum w y, sty = sum w t y, syy = sum w y^2.
+    """
+    state = {'count': 0, 'last_day': None, 'last_created_at': None}
+    state.update({key: 0.0 for key in STATE_SUMS})
+    state.update({key: [0.0] * len(SERIES) for key in SERIES_SUMS})
+    return state
+
+
+def apply_score(state, score, half_life=DEFAULT_HALF_LIFE):
+    """Return a new state with score folded in, in O(1) whatever its date
+
+    A newer score decays the sums and moves their origin to itself; an older
+    one is added with its decayed weight, so back-dated scores need no rebuild.
+    """
+    day = day_number(score.created_at)
+    values = score_values(score)
+    decay = math.log(2) / half_life
+    s0, s1, s2, sww = (state[key] for key in STATE_SUMS)
+    sy, sty, syy = (np.array(state[key]) for key in SERIES_SUMS)
+    last_day = state['last_day']
+
+    if last_day is None or day >= last_day:
+        shift = 0.0 if last_day is None else day - last_day
+        factor = math.exp(-decay * shift)
+        s2 = factor * (s2 - 2 * shift * s1 + shift * shift * s0)
+        s1 = factor * (s1 - shift * s0)
+        s0, sww = factor * s0, factor * factor * sww
+        sty = factor * (sty - shift * sy)
+        sy, syy = factor * sy, factor * syy
+        offset, weight, last_day = 0.0, 1.0, day
+        last_created_at = score.created_at.isoformat()
+    else:
+        offset = day - last_day
+        weight = math.exp(decay * offset)
+        last_created_at = state['last_created_at']
+
+    return {
+        'count': state['count'] + 1,
+        'last_day': last_day,
+        'last_created_at': last_created_at,
+        's0': s0 + weight,
+        's1': s1 + weight * offset,
+        's2': s2 + weight * offset * offset,
+        'sww': sww + weight * weight,
+        'sy': (sy + weight * values).tolist(),
+        'sty': (sty + weight * offset * values).tolist(),
+        'syy': (syy + weight * values * values).tolist()
+    }
+
+
+def batch_states(user_ids, days, values, created_at, half_life=DEFAULT_HALF_LIFE):
+    """Trend states of many users at once from score arrays grouped by user
+
+    user_ids (N,), days (N,) and values (N x 7) hold every score of each
+    user in consecutive rows (latest last), created_at the matching datetimes.
+    Returns a dict of arrays with one entry per user, keyed like new_state.
+    """
+    starts = np.flatnonzero(np.r_[True, user_ids[1:] != user_ids[:-1]])
+    ends = np.r_[starts[1:], len(user_ids)] - 1
+    last_day = np.maximum.reduceat(days, starts)
+    t = days - np.repeat(last_day, np.diff(np.r_[starts, len(user_ids)]))
+    w = np.exp(math.log(2) / half_life * t)
+    wt = w * t
+    return {
+        'user_id': user_ids[starts],
+        'count': np.diff(np.r_[starts, len(user_ids)]),
+        'last_day': last_day,
+        'last_created_at': [created_at[end].isoformat() for end in ends.tolist()],
+        's0': np.add.reduceat(w, starts),
+        's1': np.add.reduceat(wt, starts),
+        's2': np.add.reduceat(wt * t, starts),
+        'sww': np.add.reduceat(w * w, starts),
+        'sy': np.add.reduceat(w[:, None] * values, starts),
+        'sty': np.add.reduceat(wt[:, None] * values, starts),
+        'syy': np.add.reduceat(w[:, None] * values * values, starts)
+    }
+
+
+def iter_state_batches(rows, half_life=DEFAULT_HALF_LIFE, chunk_size=65536):
+    """Yield batch_states for (user_id, total_score, created_at, *BATCH_COLUMNS counts) rows ordered by user
+
+    rows are read chunk_size at a time; the last user of a chunk is held back
+    until the next one, so every user's scores land in a single batch.
+    """
+    rows = iter(rows)
+    carry = None
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if chunk:
+            columns = (
+                np.array([row[0] for row in chunk], dtype=np.int64),
+                np.array([day_number(row[2]) for row in chunk], dtype=np.float64),
+                series_values(np.array([row[1] for row in chunk], dtype=np.float64),
+                              np.array([row[3:] for row in chunk], dtype=np.float64)),
+                [row[2] for row in chunk]
+            )
+            if carry is not None:
+                columns = tuple(np.concatenate((held, new)) if isinstance(new, np.ndarray) else held + new
+                                for held, new in zip(carry, columns))
+            others = np.flatnonzero(columns[0] != columns[0][-1])
+            held_from = int(others[-1]) + 1 if len(others) else 0
+            carry = tuple(column[held_from:] for column in columns)
+            columns = tuple(column[:held_from] for column in columns)
+        else:
+            columns, carry = carry, None
+        if columns is not None and len(columns[0]):
+            yield batch_states(*columns, half_life=half_life)
+        if not chunk:
+            return
+
+
+def project(states, horizons, damping=DEFAULT_DAMPING, confidence=DEFAULT_CONFIDENCE):
+    """(expected, low, high, slope per day) arrays, (U x 7), of states projected horizons days past their latest score
+
+    The fitted line is evaluated at the latest score and extended with a
+    damped trend: the projected change levels off at slope * damping days,
+    so a few fast early gains do not run off to the bounds. Bands are normal
+    prediction intervals from the weighted residuals, shrunk towards
+    PRIOR_SIGMA, and everything is clipped to the valid range.
+    """
+    s0, s1, s2, sww = (np.asarray(states[key], dtype=np.float64).reshape(-1, 1) for key in STATE_SUMS)
+    sy, sty, syy = (np.asarray(states[key], dtype=np.float64).reshape(-1, len(SERIES)) for key in SERIES_SUMS)
+    count = np.asarray(states['count']).reshape(-1, 1)
+    horizon = np.maximum(np.asarray(horizons, dtype=np.float64), 0).reshape(-1, 1)
+
+    tbar = s1 / s0
+    sxx = s2 - s1 * tbar
+    trended = (count >= 2) & (sxx >= MIN_TIME_VARIANCE * s0)
+    safe_sxx = np.where(trended, sxx, 1.0)
+    slope = np.where(trended, (sty - tbar * sy) / safe_sxx, 0.0)
+    level = sy / s0 - slope * tbar
+    residuals = np.maximum(syy - level * sy - slope * sty, 0.0)
+
+    n_eff = s0 * s0 / sww
+    dof = np.maximum(n_eff - np.where(trended, 2, 1), 0)
+    sigma2 = (residuals / s0 * n_eff + PRIOR_WEIGHT * PRIOR_SIGMA ** 2) / (dof + PRIOR_WEIGHT)
+    reach = -damping * np.expm1(-horizon / damping)
+    fit_var = sigma2 * (sww / (s0 * s0) + np.where(trended, (reach - tbar) ** 2 * sww / (s0 * safe_sxx), 0.0))
+    spread = NormalDist().inv_cdf(0.5 + confidence / 2) * np.sqrt(sigma2 + fit_var)
+
+    expected = level + slope * reach
+    return (np.clip(expected, LOWER, UPPER), np.clip(expected - spread, LOWER, UPPER),
+            np.clip(expected + spread, LOWER, UPPER), slope)
+
+
+def horizon_days(target_date, last_day):
+    return day_number(datetime.combine(target_date, time())) - last_day
+
+
+FORECAST_KEYS = ('expected', 'low', 'high', 'weekly_trend')
+STATE_KEYS = ('count', 'last_day') + STATE_SUMS + SERIES_SUMS
+
+
+def _projected_series(states, horizons, damping, confidence):
+    """Per user, per series [expected, low, high, weekly_trend] lists rounded to 2 decimals"""
+    expected, low, high, slope = project(states, horizons, damping, confidence)
+    return np.round(np.stack((expected, low, high, slope * 7), axis=-1), 2).tolist()
+
+
+def _payload(target_date, days_ahead, count, confidence, series):
+    forecasts = [dict(zip(FORECAST_KEYS, values)) for values in series]
+    return {
+        'target_date': target_date,
+        'days_ahead': days_ahead,
+        'based_on': count,
+        'confidence': confidence,
+        'score': forecasts[0],
+        'subjects': dict(zip(SUBJECTS, forecasts[1:]))
+    }
+
+
+def forecast_payload(state, target_date, damping=DEFAULT_DAMPING, confidence=DEFAULT_CONFIDENCE):
+    """Forecast of one state at target_date (None without scores): expected score and nets with their bands"""
+    if not state['count']:
+        return None
+    horizon = horizon_days(target_date, state['last_day'])
+    series = _projected_series(state, [horizon], damping, confidence)[0]
+    return _payload(target_date.isoformat(), max(0, round(horizon)), state['count'], confidence, series)
+
+
+def batch_rows(states, target_dates, damping=DEFAULT_DAMPING, confidence=DEFAULT_CONFIDENCE):
+    """[(user_id, {'target_date', 'state', 'forecast'})] for batch_states output, projected in one pass
+
+    target_dates holds one date per user in states.
+    """
+    targets = {target: (target.isoformat(), day_number(datetime.combine(target, time()))) for target in set(target_dates)}
+    horizons = np.array([targets[target][1] for target in target_dates]) - states['last_day']
+    days_ahead = np.maximum(np.round(horizons), 0).astype(np.int64).tolist()
+    series = _projected_series(states, horizons, damping, confidence)
+    columns = [states[key].tolist() for key in STATE_KEYS]
+    rows = []
+    for index, (user_id, values) in enumerate(zip(states['user_id'].tolist(), zip(*columns))):
+        state = dict(zip(STATE_KEYS, values))
+        state['last_created_at'] = states['last_created_at'][index]
+        target = targets[target_dates[index]][0]
+        rows.append((user_id, {
+            'target_date': target,
+            'state': state,
+            'forecast': _payload(target, days_ahead[index], state['count'], confidence, series[index])
+        }))
+    return rows
+
+
+def full_scan_payload(scores, target_date, half_life=DEFAULT_HALF_LIFE, damping=DEFAULT_DAMPING,
+                      confidence=DEFAULT_CONFIDENCE):
+    """Reference forecast computed from the whole score history (any order) with direct weights
+
+    Used to check stored states, which are built one score at a time.
+    """
+    scores = sorted(scores, key=lambda score: score.created_at)
+    if not scores:
+        return None
+    states = batch_states(
+        np.zeros(len(scores), dtype=np.int64),
+        np.array([day_number(score.created_at) for score in scores]),
+        np.array([score_values(score) for score in scores]),
+        [score.created_at for score in scores],
+        half_life
+    )
+    return batch_rows(states, [target_date], damping, confidence)[0][1]['forecast']
+
+
+def compare_payloads(expected, actual, tolerance=0.011):
+    """List of human-readable differences between two forecasts (values within tolerance match)"""
+    if expected is None or actual is None:
+        return [] if expected == actual else [f"forecast: {expected} != {actual}"]
+    differences = [f"{key}: {expected[key]} != {actual.get(key)}"
+                   for key in ('target_date', 'days_ahead', 'based_on', 'confidence') if expected[key] != actual.get(key)]
+    pairs = [('score', expected['score'], actual['score'])]
+    pairs += [(subject, expected['subjects'][subject], actual['subjects'][subject]) for subject in SUBJECTS]
+    for name, left, right in pairs:
+        for key, value in left.items():
+            if abs(value - right[key]) > tolerance:
+                differences.append(f"{name}.{key}: {value} != {right[key]}")
+    return differences
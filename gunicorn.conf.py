@@ -0,0 +1,21 @@
+"""
+LGS Puan Hesaplama Sistemi - Gunicorn settings
+
+Loaded automatically by gunicorn from the working directory. The database is
+prepared once, before any worker is forked, so workers only import the app.
+"""
+
+import os
+import subprocess
+import sys
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+# Request threads per worker; threads waiting on the password hashing pool leave the rest serving other routes
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+wsgi_app = 'app:create_app()'
+
+
+def on_starting(server):
+    # A separate process, so the master never opens database connections or threads that forked workers would inherit
+    subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'init-db'], check=True)
@@ -0,0 +1,165 @@
+"""
+LGS Puan Hesaplama Sistemi - Streaming bulk import of exam results
+"""
+
+import csv
+import json
+import time
+from datetime import datetime, timezone
+from itertools import islice
+
+import numpy as np
+from sqlalchemy import select
+
+from scoring import BATCH_COLUMNS, calculate_scores_batch, validate_batch
+
+DEFAULT_CHUNK_SIZE = 5000
+MAX_REPORTED_ERRORS = 100
+
+
+def iter_csv_rows(stream):
+    """Yield one dict per CSV line without reading the whole file"""
+    for row in csv.DictReader(stream):
+        yield row
+
+
+def iter_ndjson_rows(stream):
+    """Yield one dict per non-empty NDJSON line
+
+    Malformed lines and lines that are not JSON objects yield None, so the
+    importer reports them as invalid rows instead of aborting mid-file.
+    """
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield row if isinstance(row, dict) else None
+
+
+def iter_rows(stream, fmt):
+    """Pick the row reader for 'csv' or 'ndjson'"""
+    if fmt == 'csv':
+        return iter_csv_rows(stream)
+    if fmt in ('ndjson', 'jsonl'):
+        return iter_ndjson_rows(stream)
+    raise ValueError(f'Desteklenmeyen dosya formatı: {fmt}')
+
+
+def detect_format(filename):
+    """Guess the import format from a file name"""
+    return 'csv' if filename.lower().endswith('.csv') else 'ndjson'
+
+
+def chunked(iterable, size):
+    """Yield lists of at most size items from an iterable"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _parse_chunk(rows, first_row, default_user_id):
+    """Turn raw rows into (row numbers, user ids, created_at, counts) plus parse errors"""
+    row_numbers, user_ids, created_ats, counts, errors = [], [], [], [], []
+    for offset, row in enumerate(rows):
+        number = first_row + offset
+        try:
+            user_id = int(row.get('user_id') or default_user_id)
+            values = [int(row.get(column) or 0) for column in BATCH_COLUMNS]
+            created_at = row.get('created_at')
+            created_at = datetime.fromisoformat(created_at) if created_at else None
+            if created_at is not None and created_at.tzinfo is not None:
+                # Stored timestamps are naive UTC, like datetime.utcnow()
+                created_at = created_at.astimezone(timezone.utc).replace(tzinfo=None)
+        except (AttributeError, TypeError, ValueError):
+            errors.append({'row': number, 'message': 'Geçersiz satır'})
+            continue
+        row_numbers.append(number)
+        user_ids.append(user_id)
+        created_ats.append(created_at)
+        counts.append(values)
+    return row_numbers, user_ids, created_ats, np.array(counts, dtype=np.int64).reshape(-1, len(BATCH_COLUMNS)), errors
+
+
+def _known_user_ids(connection, score_table, user_ids):
+    """The subset of user_ids that exist in the table score_table.user_id references"""
+    user_id = next(iter(score_table.c.user_id.foreign_keys)).column
+    with connection.begin():
+        return set(connection.execute(select(user_id).where(user_id.in_(set(user_ids)))).scalars())
+
+
+def import_scores(rows, connection, score_table, default_user_id=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                  percentile_index=None, on_commit=None):
+    """Validate, score and bulk-insert result rows chunk by chunk
+
+    rows is any iterable of dicts (see iter_rows), so memory use is bounded by
+    chunk_size. Each chunk is written with a single executemany INSERT inside its
+    own transaction on the given SQLAlchemy connection. When a percentile_index is
+    given, percentiles come from it; on_commit is called after each chunk commits
+    (e.g. to catch the index up with the rows just written). Rows of unknown users
+    are rejected like invalid ones, and timezone-aware created_at values are
+    stored as naive UTC.
+    """
+    stats = {'imported': 0, 'rejected': 0, 'errors': []}
+    start = time.perf_counter()
+    # Errors report 1-based data row numbers (CSV header and blank NDJSON lines excluded)
+    next_row = 1
+
+    for chunk in chunked(rows, chunk_size):
+        row_numbers, user_ids, created_ats, counts, errors = _parse_chunk(chunk, next_row, default_user_id)
+        next_row += len(chunk)
+
+        valid = validate_batch(counts)
+        for index in np.flatnonzero(~valid).tolist():
+            errors.append({'row': row_numbers[index], 'message': 'Soru sayısı sınırları aşıldı'})
+        # An unknown user would fail the whole chunk on its foreign key after earlier chunks committed
+        if valid.any():
+            known = _known_user_ids(connection, score_table, [user_ids[index] for index in np.flatnonzero(valid).tolist()])
+            for index in np.flatnonzero(valid).tolist():
+                if user_ids[index] not in known:
+                    valid[index] = False
+                    errors.append({'row': row_numbers[index], 'message': 'Kullanıcı bulunamadı'})
+        errors.sort(key=lambda error: error['row'])
+
+        stats['rejected'] += len(errors)
+        room = MAX_REPORTED_ERRORS - len(stats['errors'])
+        if room > 0:
+            stats['errors'].extend(errors[:room])
+
+        if not valid.any():
+            continue
+
+        valid_indices = np.flatnonzero(valid)
+        valid_counts = counts[valid_indices]
+        result = calculate_scores_batch(valid_counts)
+        total_scores = result['total_score'].tolist()
+        if percentile_index is not None:
+            percentiles = percentile_index.percentiles(result['total_score']).tolist()
+        else:
+            percentiles = result['percentile'].tolist()
+        now = datetime.utcnow()
+
+        records = []
+        for position, index in enumerate(valid_indices.tolist()):
+            record = dict(zip(BATCH_COLUMNS, valid_counts[position].tolist()))
+            record['user_id'] = user_ids[index]
+            record['total_score'] = total_scores[position]
+            record['percentile'] = percentiles[position]
+            record['created_at'] = created_ats[index] or now
+            records.append(record)
+
+        with connection.begin():
+            connection.execute(score_table.insert(), records)
+        stats['imported'] += len(records)
+
+        if on_commit is not None:
+            on_commit()
+
+    stats['elapsed_seconds'] = round(time.perf_counter() - start, 3)
+    return stats
@@ -0,0 +1,43 @@
+"""
+LGS Puan Hesaplama Sistemi - Background job runner
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobRunner:
+    """Runs job handlers on a bounded thread pool inside the Flask app context
+
+    Job state lives in the database; the runner only remembers which ids it has
+    already queued in this process so repeated submits are cheap no-ops.
+    """
+
+    def __init__(self, app, handler, max_workers=2, name='jobs'):
+        self.app = app
+        self.handler = handler
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self.queued = set()
+        self.lock = threading.Lock()
+
+    def submit(self, job_id):
+        """Queue a job id unless this process already has it queued"""
+        with self.lock:
+            if job_id in self.queued:
+                return False
+            self.queued.add(job_id)
+        self.executor.submit(self._run, job_id)
+        return True
+
+    def _run(self, job_id):
+        try:
+            with self.app.app_context():
+                self.handler(job_id)
+        except Exception as e:
+            print(f"Job {job_id} error: {e}")
+        finally:
+            with self.lock:
+                self.queued.discard(job_id)
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
@@ -0,0 +1,191 @@
+"""
+LGS Puan Hesaplama Sistemi - Leaderboard over each user's latest score
+"""
+
+import threading
+from itertools import islice
+
+import numpy as np
+
+from percentile import BINS, GLOBAL_COHORT, ScoreHistogram, bin_to_score, score_to_bin
+
+
+def city_cohort(city):
+    return f'city:{city}'
+
+
+class Leaderboard:
+    """Each user's latest score in per-cohort Fenwick trees (global and per city)
+
+    Ranks come from the cohort's ScoreHistogram in O(log n); the top k walk
+    down the tree one occupied 0.01-point bin at a time. Per-user state (bin,
+    city, and the created_at/id of the score it came from) lives in numpy
+    arrays indexed by user id, and the users of each occupied bin in one
+    global map of small arrays, so a million users take about 60 MB. A score
+    replaces a user's entry only if it is newer, so applying the same score
+    twice is harmless.
+    """
+
+    def __init__(self):
+        self.bins = np.full(0, -1, dtype=np.int32)
+        self.cities = np.full(0, -1, dtype=np.int32)
+        self.stamps = np.zeros(0, dtype=np.float64)
+        self.score_ids = np.zeros(0, dtype=np.int64)
+        self.city_codes = {}
+        self.city_names = []
+        self.histograms = {GLOBAL_COHORT: ScoreHistogram()}
+        # bin -> int32 array of the user ids whose latest score is in that bin
+        self.members = {}
+        # Highest Score id read from the database (see sync)
+        self.last_id = 0
+        self.lock = threading.Lock()
+
+    def _grow(self, size):
+        if size <= len(self.bins):
+            return
+        capacity = max(size, 2 * len(self.bins), 1024)
+        extra = capacity - len(self.bins)
+        self.bins = np.concatenate((self.bins, np.full(extra, -1, dtype=np.int32)))
+        self.cities = np.concatenate((self.cities, np.full(extra, -1, dtype=np.int32)))
+        self.stamps = np.concatenate((self.stamps, np.zeros(extra, dtype=np.float64)))
+        self.score_ids = np.concatenate((self.score_ids, np.zeros(extra, dtype=np.int64)))
+
+    def _city_code(self, city):
+        if not city:
+            return -1
+        code = self.city_codes.get(city)
+        if code is None:
+            code = self.city_codes[city] = len(self.city_names)
+            self.city_names.append(city)
+        return code
+
+    def _cohort_code(self, cohort):
+        """None for the global cohort, the city's code (-2 if unknown) for a city cohort"""
+        if cohort == GLOBAL_COHORT:
+            return None
+        return self.city_codes.get(cohort[len('city:'):], -2)
+
+    def _place(self, user_id, index, code, count):
+        score = bin_to_score(index)
+        self.histograms[GLOBAL_COHORT].add(score, count)
+        if code >= 0:
+            cohort = city_cohort(self.city_names[code])
+            histogram = self.histograms.get(cohort)
+            if histogram is None:
+                histogram = self.histograms[cohort] = ScoreHistogram()
+            histogram.add(score, count)
+        members = self.members.get(index)
+        if count > 0:
+            self.members[index] = np.append(members, np.int32(user_id)) if members is not None else np.array([user_id], dtype=np.int32)
+        elif len(members) == 1:
+            del self.members[index]
+        else:
+            self.members[index] = members[members != user_id]
+
+    def update(self, user_id, score_id, total_score, created_at, city=None):
+        """Record a user's score if it is newer than their current one; city=None keeps the known city"""
+        stamp = created_at.timestamp()
+        with self.lock:
+            self._grow(user_id + 1)
+            old_index, old_code = int(self.bins[user_id]), int(self.cities[user_id])
+            code = old_code if city is None else self._city_code(city)
+            newer = old_index < 0 or (stamp, score_id) > (self.stamps[user_id], self.score_ids[user_id])
+            index = score_to_bin(total_score) if newer else old_index
+            if newer:
+                self.stamps[user_id], self.score_ids[user_id] = stamp, score_id
+            if index == old_index and code == old_code:
+                return
+            if old_index >= 0:
+                self._place(user_id, old_index, old_code, -1)
+            self._place(user_id, index, code, 1)
+            self.bins[user_id], self.cities[user_id] = index, code
+
+    def sync(self, rows):
+        """Apply (score_id, user_id, total_score, created_at, city) rows in id order; rows already applied are no-ops"""
+        for score_id, user_id, total_score, created_at, city in rows:
+            self.update(user_id, score_id, total_score, created_at, city)
+            self.last_id = max(self.last_id, score_id)
+
+    def size(self, cohort=GLOBAL_COHORT):
+        histogram = self.histograms.get(cohort)
+        return histogram.total if histogram else 0
+
+    def rank(self, user_id, cohort=GLOBAL_COHORT):
+        """{'rank', 'total', 'score'} of a user within cohort (ties share a rank), or None if not in it"""
+        with self.lock:
+            histogram = self.histograms.get(cohort)
+            if histogram is None or user_id >= len(self.bins) or self.bins[user_id] < 0:
+                return None
+            code = self._cohort_code(cohort)
+            if code is not None and self.cities[user_id] != code:
+                return None
+            index = int(self.bins[user_id])
+            score = bin_to_score(index)
+            above = histogram.total - histogram.count_below(score) - histogram.counts[index]
+            return {'rank': above + 1, 'total': histogram.total, 'score': score}
+
+    def top(self, k, cohort=GLOBAL_COHORT):
+        """[(rank, user_id, score)] of the k best users in cohort; equal scores list the earliest first"""
+        with self.lock:
+            histogram = self.histograms.get(cohort)
+            if histogram is None:
+                return []
+            code = self._cohort_code(cohort)
+            leaders = []
+            # Scores in the cohort at or below the highest bin not listed yet
+            remaining = histogram.total
+            while remaining and len(leaders) < k:
+                index = histogram.kth(remaining)
+                users = self.members[index]
+                if code is not None:
+                    users = users[self.cities[users] == code]
+                users = users[np.lexsort((self.score_ids[users], self.stamps[users]))]
+                rank = histogram.total - remaining + 1
+                score = bin_to_score(index)
+                leaders.extend((rank, user_id, score) for user_id in users[:k - len(leaders)].tolist())
+                remaining -= histogram.counts[index]
+            return leaders
+
+    @classmethod
+    def build(cls, rows, last_id=0, chunk_size=65536):
+        """Build from (score_id, user_id, total_score, created_at, city) rows, one per user (their latest score)
+
+        rows are consumed chunk_size at a time into numpy arrays, so an
+        iterator over a streamed result never holds a million row objects.
+        """
+        board = cls()
+        board.last_id = last_id
+        chunks = []
+        rows = iter(rows)
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            chunks.append((
+                np.array([row[0] for row in chunk], dtype=np.int64),
+                np.array([row[1] for row in chunk], dtype=np.int64),
+                np.array([score_to_bin(row[2]) for row in chunk], dtype=np.int32),
+                np.array([row[3].timestamp() for row in chunk], dtype=np.float64),
+                np.array([board._city_code(row[4]) for row in chunk], dtype=np.int32),
+            ))
+        if not chunks:
+            return board
+        score_ids, user_ids, indexes, stamps, codes = (np.concatenate(columns) for columns in zip(*chunks))
+        del chunks
+
+        board._grow(int(user_ids.max()) + 1)
+        board.bins[user_ids] = indexes
+        board.cities[user_ids] = codes
+        board.stamps[user_ids] = stamps
+        board.score_ids[user_ids] = score_ids
+
+        board.histograms[GLOBAL_COHORT] = ScoreHistogram(np.bincount(indexes, minlength=BINS).tolist())
+        for code, city in enumerate(board.city_names):
+            in_city = indexes[codes == code]
+            board.histograms[city_cohort(city)] = ScoreHistogram(np.bincount(in_city, minlength=BINS).tolist())
+
+        order = np.argsort(indexes, kind='stable')
+        occupied, starts = np.unique(indexes[order], return_index=True)
+        for index, users in zip(occupied.tolist(), np.split(user_ids[order].astype(np.int32), starts[1:])):
+            board.members[index] = users.copy()
+        return board
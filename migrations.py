@@ -0,0 +1,105 @@
+"""
+LGS Puan Hesaplama Sistemi - Versioned schema migrations
+"""
+
+from collections import namedtuple
+from datetime import datetime
+
+import sqlalchemy as sa
+
+migrations_metadata = sa.MetaData()
+
+# Applied migration versions; kept off the app models so create_all never touches it
+schema_migrations_table = sa.Table(
+    'schema_migrations',
+    migrations_metadata,
+    sa.Column('version', sa.Integer, primary_key=True),
+    sa.Column('name', sa.String(200), nullable=False),
+    sa.Column('applied_at', sa.DateTime, nullable=False)
+)
+
+Migration = namedtuple('Migration', ['version', 'name', 'upgrade'])
+
+
+def create_index(connection, name, table, columns, unique=False):
+    """Create a named index unless it exists
+
+    Spelled out rather than taken from the models, so a migration does the
+    same thing whatever the models declare later.
+    """
+    quote = connection.dialect.identifier_preparer.quote
+    connection.execute(sa.text(
+        f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {quote(name)} "
+        f"ON {quote(table)} ({', '.join(quote(column) for column in columns)})"
+    ))
+
+
+def add_column(connection, table, name, column_type):
+    """Add a nullable column unless the table already has it"""
+    if name in {column['name'] for column in sa.inspect(connection).get_columns(table)}:
+        return
+    quote = connection.dialect.identifier_preparer.quote
+    connection.execute(sa.text(
+        f'ALTER TABLE {quote(table)} ADD COLUMN {quote(name)} {column_type.compile(dialect=connection.dialect)}'
+    ))
+
+
+def widen_column(connection, table, name, column_type):
+    """Change a column to a wider type of the same kind
+
+    SQLite does not enforce VARCHAR lengths, so there it is a no-op.
+    """
+    if connection.dialect.name == 'sqlite':
+        return
+    quote = connection.dialect.identifier_preparer.quote
+    connection.execute(sa.text(
+        f'ALTER TABLE {quote(table)} ALTER COLUMN {quote(name)} TYPE {column_type.compile(dialect=connection.dialect)}'
+    ))
+
+
+def drop_index(connection, name):
+    connection.execute(sa.text(f'DROP INDEX IF EXISTS {connection.dialect.identifier_preparer.quote(name)}'))
+
+
+class Migrations:
+    """Ordered registry of schema migrations, each applied once in its own transaction"""
+
+    def __init__(self):
+        self.migrations = []
+
+    def register(self, version, name):
+        """Decorator adding upgrade(connection) as migration version"""
+        def decorator(upgrade):
+            if any(migration.version == version for migration in self.migrations):
+                raise ValueError(f"Duplicate migration version {version}")
+            self.migrations.append(Migration(version, name, upgrade))
+            self.migrations.sort(key=lambda migration: migration.version)
+            return upgrade
+        return decorator
+
+    def applied_versions(self, connection):
+        schema_migrations_table.create(connection, checkfirst=True)
+        return set(connection.scalars(sa.select(schema_migrations_table.c.version)))
+
+    def status(self, engine):
+        """(migration, applied) pairs in version order"""
+        with engine.begin() as connection:
+            applied = self.applied_versions(connection)
+        return [(migration, migration.version in applied) for migration in self.migrations]
+
+    def upgrade(self, engine):
+        """Apply pending migrations in order and return the ones applied"""
+        applied_now = []
+        for migration in self.migrations:
+            with engine.begin() as connection:
+                # Re-checked inside the transaction so concurrent workers apply each version once
+                if migration.version in self.applied_versions(connection):
+                    continue
+                migration.upgrade(connection)
+                connection.execute(schema_migrations_table.insert().values(
+                    version=migration.version,
+                    name=migration.name,
+                    applied_at=datetime.utcnow()
+                ))
+            applied_now.append(migration)
+        return applied_now
@@ -0,0 +1,178 @@
+"""
+LGS Puan Hesaplama Sistemi - Password hashing on a bounded process pool
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class HasherBusy(Exception):
+    """A route already has as many hashes running or waiting as it is allowed"""
+
+
+def _lower_priority(nice):
+    if nice:
+        os.nice(nice)
+
+
+def _method_prefix(method):
+    # Werkzeug expands short names ('scrypt') to the full parameter string it stores
+    return generate_password_hash('', method).split('$', 1)[0]
+
+
+def _timed(function, args):
+    """Runs in the pool process; returns the result and when the process picked the task up"""
+    started = time.time()
+    return function(*args), started
+
+
+class HashStats:
+    """Counters and recent queue/hash times for one route"""
+
+    def __init__(self, window=500):
+        self.calls = 0
+        self.rejected = 0
+        self.in_flight = 0
+        self.queue_times = deque(maxlen=window)
+        self.hash_times = deque(maxlen=window)
+
+    def snapshot(self):
+        def percentile(values, fraction):
+            values = sorted(values)
+            return round(values[min(len(values) - 1, int(len(values) * fraction))], 4) if values else None
+
+        return {
+            'calls': self.calls,
+            'rejected': self.rejected,
+            'in_flight': self.in_flight,
+            'queue_p50': percentile(self.queue_times, 0.5),
+            'queue_p95': percentile(self.queue_times, 0.95),
+            'hash_p50': percentile(self.hash_times, 0.5),
+            'hash_p95': percentile(self.hash_times, 0.95)
+        }
+
+
+class PasswordHasher:
+    """Runs Werkzeug password hashing in worker processes, off the request threads
+
+    Each route has a concurrency limit covering hashes running and queued; a
+    request that cannot get a slot within wait seconds gets HasherBusy instead
+    of piling up behind a login storm. Pool processes run at a lower CPU
+    priority (nice) so other routes keep getting the CPU. With processes=0
+    hashing runs inline in the request thread, still limited and measured.
+    Call start() while the worker is still single-threaded, so the pool
+    processes are not forked from a process with request threads running.
+    When a pool process dies, the hash that hit it runs inline and the
+    replacement pool is started through a forkserver, never by forking the
+    worker from a request thread.
+    """
+
+    def __init__(self, method, processes=1, limits=None, wait=0, nice=0):
+        self.method = method
+        self.processes = processes
+        self.wait = wait
+        self.nice = nice
+        self.slots = {route: threading.BoundedSemaphore(limit) for route, limit in (limits or {}).items()}
+        self.stats = {route: HashStats() for route in self.slots}
+        self.executor = None
+        self.method_prefix = None
+        self.restarts = 0
+        self.lock = threading.Lock()
+
+    def _pool(self):
+        with self.lock:
+            if self.executor is None:
+                # Only start() runs single-threaded; later pools come from a forkserver
+                context = None
+                if self.restarts and 'forkserver' in multiprocessing.get_all_start_methods():
+                    context = multiprocessing.get_context('forkserver')
+                self.executor = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=context,
+                    initializer=_lower_priority,
+                    initargs=(self.nice,)
+                )
+            return self.executor
+
+    def _pool_broken(self, pool):
+        with self.lock:
+            if self.executor is not pool:
+                return
+            self.executor = None
+            self.restarts += 1
+        pool.shutdown(wait=False)
+
+    def start(self):
+        """Create the pool and its processes now instead of on the first login, and learn the method prefix"""
+        if self.processes:
+            pool = self._pool()
+            for future in [pool.submit(_timed, time.time, ()) for _ in range(self.processes)]:
+                future.result()
+            # Costs one full hash, so it runs in the pool too, once per worker
+            self.method_prefix = pool.submit(_method_prefix, self.method).result()
+        else:
+            self.method_prefix = _method_prefix(self.method)
+
+    def _run(self, route, function, *args):
+        stats = self.stats[route]
+        slot = self.slots[route]
+        submitted = time.time()
+        if not slot.acquire(timeout=self.wait):
+            with self.lock:
+                stats.rejected += 1
+            raise HasherBusy(route)
+        try:
+            with self.lock:
+                stats.calls += 1
+                stats.in_flight += 1
+            if self.processes:
+                pool = self._pool()
+                try:
+                    result, started = pool.submit(_timed, function, args).result()
+                except BrokenProcessPool:
+                    # A pool process died (e.g. OOM-killed); hash here and let the next call start a fresh pool
+                    self._pool_broken(pool)
+                    result, started = _timed(function, args)
+            else:
+                result, started = _timed(function, args)
+            finished = time.time()
+            with self.lock:
+                stats.queue_times.append(max(0.0, started - submitted))
+                stats.hash_times.append(finished - started)
+            return result
+        finally:
+            with self.lock:
+                stats.in_flight -= 1
+            slot.release()
+
+    def hash(self, password, route):
+        return self._run(route, generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password, route):
+        return self._run(route, check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """True when a stored hash was made with other parameters than the configured method (never before start())"""
+        return self.method_prefix is not None and password_hash.split('$', 1)[0] != self.method_prefix
+
+    def metrics(self):
+        with self.lock:
+            return {
+                'processes': self.processes,
+                'pool_restarts': self.restarts,
+                'method': self.method,
+                'routes': {route: stats.snapshot() for route, stats in self.stats.items()}
+            }
+
+    def shutdown(self, wait=True):
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
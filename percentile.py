@@ -0,0 +1,279 @@
+"""
+LGS Puan Hesaplama Sistemi - Empirical percentile engine
+"""
+
+import os
+import threading
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+
+import numpy as np
+
+from scoring import approximate_percentile
+
+MIN_SCORE, MAX_SCORE = 100, 500
+# Scores are stored with 2 decimals, so a 0.01-point histogram is exact
+BINS = (MAX_SCORE - MIN_SCORE) * 100 + 1
+GLOBAL_COHORT = 'all'
+# Below this many scores the empirical curve is too noisy; use the approximation
+MIN_COHORT_SIZE = 100
+# Date cohorts up to this many scores keep a sorted list of score bins instead of a
+# dense histogram (4 bytes per score vs 8 bytes per bin), so the many small daily
+# cohorts stay a few KB each; larger ones (exam days) turn dense
+SPARSE_COHORT_LIMIT = 5000
+# Score ids below the highest one read that a catch-up reads again (see PercentileIndex)
+DEFAULT_ID_WINDOW = 1000
+# Snapshot entries next to the cohort histograms (cohort keys never start with '_')
+LAST_ID_KEY, RECENT_IDS_KEY = '_last_id', '_recent_ids'
+
+
+def score_to_bin(score):
+    """Map a 100-500 score to its 0.01-point histogram bin"""
+    return min(BINS - 1, max(0, int(round((score - MIN_SCORE) * 100))))
+
+
+def bin_to_score(index):
+    """Score at the bottom of a histogram bin (exact for 2-decimal scores)"""
+    return round(MIN_SCORE + index / 100, 2)
+
+
+def cohort_keys(created_at=None):
+    """Cohorts a score belongs to: the global one plus its exam date"""
+    keys = [GLOBAL_COHORT]
+    if created_at is not None:
+        keys.append(f'date:{created_at.strftime("%Y-%m-%d")}')
+    return keys
+
+
+class ScoreHistogram:
+    """Fixed 0.01-point histogram with a Fenwick tree for O(log n) rank queries
+
+    Counts and tree are 4-byte int arrays: a leaderboard keeps one histogram
+    per city, and list slots plus int objects would cost several times more.
+    """
+
+    def __init__(self, counts=None):
+        self.counts = array('i', bytes(4 * BINS)) if counts is None else array('i', np.asarray(counts, dtype=np.int32).tobytes())
+        self.total = sum(self.counts)
+        self._build_tree()
+
+    def _build_tree(self):
+        tree = array('i', [0]) + self.counts
+        for i in range(1, BINS + 1):
+            parent = i + (i & -i)
+            if parent <= BINS:
+                tree[parent] += tree[i]
+        self.tree = tree
+
+    def add(self, score, count=1):
+        """Record count occurrences of score"""
+        index = score_to_bin(score)
+        self.counts[index] += count
+        self.total += count
+        i = index + 1
+        while i <= BINS:
+            self.tree[i] += count
+            i += i & -i
+
+    def count_below(self, score):
+        """Number of recorded scores strictly below score"""
+        i = score_to_bin(score)
+        below = 0
+        while i > 0:
+            below += self.tree[i]
+            i -= i & -i
+        return below
+
+    def kth(self, k):
+        """Bin holding the k-th lowest recorded score (1 <= k <= total), by descending the tree"""
+        position = 0
+        step = 1 << BINS.bit_length()
+        while step:
+            following = position + step
+            if following <= BINS and self.tree[following] < k:
+                position = following
+                k -= self.tree[following]
+            step >>= 1
+        return position
+
+    def percentile(self, score):
+        """Share of the cohort scoring below score, counting ties as half"""
+        below = self.count_below(score)
+        equal = self.counts[score_to_bin(score)]
+        return 100 * (below + equal / 2) / self.total
+
+    def percentiles(self, scores):
+        """Vectorized percentile for an array of scores"""
+        counts = np.asarray(self.counts, dtype=np.float64)
+        cumulative = np.concatenate(([0.0], np.cumsum(counts)))
+        bins = np.clip(np.rint((np.asarray(scores, dtype=np.float64) - MIN_SCORE) * 100), 0, BINS - 1).astype(np.int64)
+        return 100 * (cumulative[bins] + counts[bins] / 2) / self.total
+
+
+class SparseScoreHistogram:
+    """Same queries as ScoreHistogram over a sorted array of score bins, for small cohorts"""
+
+    def __init__(self, bins=()):
+        self.bins = array('i', sorted(bins))
+
+    @property
+    def total(self):
+        return len(self.bins)
+
+    @property
+    def counts(self):
+        return np.bincount(np.asarray(self.bins, dtype=np.int64), minlength=BINS)
+
+    def add(self, score, count=1):
+        for _ in range(count):
+            insort(self.bins, score_to_bin(score))
+
+    def count_below(self, score):
+        return bisect_left(self.bins, score_to_bin(score))
+
+    def percentile(self, score):
+        index = score_to_bin(score)
+        below = bisect_left(self.bins, index)
+        equal = bisect_right(self.bins, index) - below
+        return 100 * (below + equal / 2) / self.total
+
+    def percentiles(self, scores):
+        bins = np.asarray(self.bins, dtype=np.int64)
+        indexes = np.clip(np.rint((np.asarray(scores, dtype=np.float64) - MIN_SCORE) * 100), 0, BINS - 1).astype(np.int64)
+        below = np.searchsorted(bins, indexes, side='left')
+        equal = np.searchsorted(bins, indexes, side='right') - below
+        return 100 * (below + equal / 2) / self.total
+
+
+def cohort_histogram(key, counts=None):
+    """Histogram for a cohort from per-bin counts: dense for the global cohort and large date cohorts"""
+    if key == GLOBAL_COHORT:
+        return ScoreHistogram(counts)
+    if counts is None:
+        return SparseScoreHistogram()
+    counts = np.asarray(counts, dtype=np.int64)
+    if counts.sum() > SPARSE_COHORT_LIMIT:
+        return ScoreHistogram(counts)
+    return SparseScoreHistogram(np.repeat(np.arange(BINS), counts).tolist())
+
+
+def _clip_round(values):
+    """Clamp percentiles to 0.01-99.99 and round to 2 decimals, the same way for one score or many"""
+    return np.round(np.clip(values, 0.01, 99.99), 2)
+
+
+class PercentileIndex:
+    """Per-cohort score histograms, updated on insert and snapshotted to disk
+
+    last_id is the highest Score id read from the database. Ids are assigned at
+    insert but become visible at commit, so catching up (see sync) re-reads the
+    last `window` ids below it; the ids counted in that window are kept in
+    recent_ids, so a score is counted once whether it arrives through add(),
+    sync() or both.
+    """
+
+    def __init__(self, histograms=None, last_id=0, recent_ids=(), window=DEFAULT_ID_WINDOW):
+        self.histograms = histograms or {}
+        self.last_id = last_id
+        self.recent_ids = set(recent_ids)
+        self.window = window
+        self.lock = threading.Lock()
+
+    def _count(self, score, created_at):
+        for key in cohort_keys(created_at):
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = cohort_histogram(key)
+            elif isinstance(histogram, SparseScoreHistogram) and histogram.total >= SPARSE_COHORT_LIMIT:
+                histogram = self.histograms[key] = ScoreHistogram(histogram.counts)
+            histogram.add(score)
+
+    def _count_once(self, score_id, score, created_at):
+        # Ids below the window are taken as already read by a catch-up
+        if score_id <= self.last_id - self.window or score_id in self.recent_ids:
+            return
+        self.recent_ids.add(score_id)
+        self._count(score, created_at)
+
+    def add(self, score, created_at=None, score_id=None):
+        """Record a new score in every cohort it belongs to (once per score_id when given)"""
+        with self.lock:
+            if score_id is None:
+                self._count(score, created_at)
+            else:
+                self._count_once(score_id, score, created_at)
+
+    def sync(self, rows):
+        """Count (score_id, total_score, created_at) rows with an id above last_id - window not counted yet"""
+        with self.lock:
+            for score_id, score, created_at in rows:
+                self._count_once(score_id, score, created_at)
+                self.last_id = max(self.last_id, score_id)
+            floor = self.last_id - self.window
+            self.recent_ids = {score_id for score_id in self.recent_ids if score_id > floor}
+
+    def size(self, cohort=GLOBAL_COHORT):
+        histogram = self.histograms.get(cohort)
+        return histogram.total if histogram else 0
+
+    def percentile(self, score, cohort=GLOBAL_COHORT):
+        """Empirical percentile of score, or the approximation for small cohorts"""
+        histogram = self.histograms.get(cohort)
+        if histogram is None or histogram.total < MIN_COHORT_SIZE:
+            return approximate_percentile(score)
+        with self.lock:
+            value = histogram.percentile(score)
+        return float(_clip_round(value))
+
+    def percentiles(self, scores, cohort=GLOBAL_COHORT):
+        """Vectorized percentile for an array of scores"""
+        histogram = self.histograms.get(cohort)
+        if histogram is None or histogram.total < MIN_COHORT_SIZE:
+            return np.array([approximate_percentile(score) for score in np.asarray(scores).tolist()], dtype=np.float64)
+        with self.lock:
+            values = histogram.percentiles(scores)
+        return _clip_round(values)
+
+    @classmethod
+    def build(cls, rows, window=DEFAULT_ID_WINDOW):
+        """Build an index from an iterable of (score_id, total_score, created_at) rows in id order"""
+        global_counts = np.zeros(BINS, np.int64)
+        date_bins = {}
+        last_id = 0
+        recent_ids = deque()
+        for score_id, score, created_at in rows:
+            index = score_to_bin(score)
+            for key in cohort_keys(created_at):
+                if key == GLOBAL_COHORT:
+                    global_counts[index] += 1
+                else:
+                    date_bins.setdefault(key, array('i')).append(index)
+            last_id = max(last_id, score_id)
+            recent_ids.append(score_id)
+            while recent_ids[0] <= last_id - window:
+                recent_ids.popleft()
+        histograms = {GLOBAL_COHORT: ScoreHistogram(global_counts)} if global_counts.any() else {}
+        for key, bins in date_bins.items():
+            histograms[key] = (ScoreHistogram(np.bincount(bins, minlength=BINS)) if len(bins) > SPARSE_COHORT_LIMIT
+                               else SparseScoreHistogram(bins))
+        return cls(histograms, last_id, recent_ids, window)
+
+    def save(self, path):
+        """Write a compressed snapshot of all cohort histograms and the ids they count"""
+        with self.lock:
+            arrays = {key: np.asarray(h.counts, dtype=np.uint32) for key, h in self.histograms.items()}
+            arrays[LAST_ID_KEY] = np.array([self.last_id], dtype=np.int64)
+            arrays[RECENT_IDS_KEY] = np.array(sorted(self.recent_ids), dtype=np.int64)
+        tmp_path = f'{path}.tmp.npz'
+        np.savez_compressed(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, window=DEFAULT_ID_WINDOW):
+        """Load a snapshot written by save(); None for snapshots from before ids were recorded"""
+        with np.load(path) as snapshot:
+            if LAST_ID_KEY not in snapshot.files:
+                return None
+            histograms = {key: cohort_histogram(key, snapshot[key]) for key in snapshot.files if not key.startswith('_')}
+            return cls(histograms, int(snapshot[LAST_ID_KEY][0]), snapshot[RECENT_IDS_KEY].tolist(), window)
@@ -0,0 +1,182 @@
+"""
+LGS Puan Hesaplama Sistemi - Quota-constrained placement simulation
+"""
+
+import heapq
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Padding for preference lists shorter than the widest one
+NO_SCHOOL = -1
+
+
+def priority_ranks(scores):
+    """Rank of every student in the common school priority order (0 = best)
+
+    Schools rank students by score, highest first; equal scores go to the lower
+    student index so every run is deterministic.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    order = np.lexsort((np.arange(len(scores)), -scores))
+    ranks = np.empty(len(scores), dtype=np.int64)
+    ranks[order] = np.arange(len(scores))
+    return ranks
+
+
+def deferred_acceptance(scores, preferences, quotas):
+    """Student-proposing deferred acceptance with score-based school priorities
+
+    scores: (N,) student scores. preferences: (N, P) school indexes in order of
+    preference, padded with NO_SCHOOL. quotas: (S,) seats per school.
+
+    Every school holds its tentatively accepted students in a min-heap keyed
+    by priority, so the weakest one is rejected in O(log quota) when a better
+    student proposes to a full school. Returns (assignment, proposals) where
+    assignment[i] is the school of student i or NO_SCHOOL.
+    """
+    preferences = np.ascontiguousarray(preferences, dtype=np.int32)
+    n, width = preferences.shape
+    ranks = priority_ranks(scores)
+    # Flat array-backed state: preference row i starts at i * width
+    choices = array('i', preferences.ravel().tobytes())
+    next_choice = array('i', bytes(4 * n))
+    capacity = [int(quota) for quota in quotas]
+    # Heaps hold -rank, so the root is the lowest-priority accepted student
+    held = [[] for _ in capacity]
+    student_of_rank = np.argsort(ranks).tolist()
+    ranks = ranks.tolist()
+
+    free = list(range(n - 1, -1, -1))
+    proposals = 0
+    while free:
+        student = free.pop()
+        while True:
+            position = next_choice[student]
+            if position >= width:
+                break
+            school = choices[student * width + position]
+            next_choice[student] = position + 1
+            if school == NO_SCHOOL:
+                break
+            proposals += 1
+            heap = held[school]
+            key = -ranks[student]
+            if len(heap) < capacity[school]:
+                heapq.heappush(heap, key)
+                break
+            if heap and key > heap[0]:
+                # Bump the weakest held student; they propose to their next choice
+                rejected = student_of_rank[-heapq.heapreplace(heap, key)]
+                free.append(rejected)
+                break
+
+    assignment = np.full(n, NO_SCHOOL, dtype=np.int32)
+    for school, heap in enumerate(held):
+        for key in heap:
+            assignment[student_of_rank[-key]] = school
+    return assignment, proposals
+
+
+def school_cutoffs(scores, assignment, school_count):
+    """(cutoffs, placed): lowest placed score per school (NaN when empty) and placed counts"""
+    scores = np.asarray(scores, dtype=np.float64)
+    placed_mask = assignment != NO_SCHOOL
+    schools = assignment[placed_mask]
+    cutoffs = np.full(school_count, np.inf)
+    np.minimum.at(cutoffs, schools, scores[placed_mask])
+    cutoffs[np.isinf(cutoffs)] = np.nan
+    placed = np.bincount(schools, minlength=school_count)
+    return cutoffs, placed
+
+
+def _simulate_region(args):
+    scores, preferences, quotas = args
+    assignment, proposals = deferred_acceptance(scores, preferences, quotas)
+    return assignment, proposals
+
+
+def split_regions(preferences, school_regions):
+    """Group students into independent regional markets
+
+    A student belongs to the region of their first choice; choices in other
+    regions are dropped, which is exact when students only apply locally.
+    Returns {region: (student indexes, local preferences, school indexes)}.
+    """
+    preferences = np.asarray(preferences, dtype=np.int32)
+    region_names, school_regions = np.unique(np.asarray(school_regions), return_inverse=True)
+    first = preferences[:, 0]
+    student_regions = np.where(first == NO_SCHOOL, -1, school_regions[np.maximum(first, 0)])
+
+    markets = {}
+    for code, region in enumerate(region_names.tolist()):
+        students = np.flatnonzero(student_regions == code)
+        schools = np.flatnonzero(school_regions == code)
+        local = np.full(len(school_regions), NO_SCHOOL, dtype=np.int32)
+        local[schools] = np.arange(len(schools), dtype=np.int32)
+        region_preferences = preferences[students]
+        mapped = np.where(region_preferences == NO_SCHOOL, NO_SCHOOL, local[np.maximum(region_preferences, 0)])
+        # Keep the remaining choices in order, padding at the end
+        order = np.argsort(mapped == NO_SCHOOL, axis=1, kind='stable')
+        markets[region] = (students, np.take_along_axis(mapped, order, axis=1), schools)
+    return markets
+
+
+def simulate_placement(scores, preferences, quotas, school_regions=None, processes=None):
+    """Place a cohort and predict each school's cutoff score
+
+    With school_regions, every region is simulated as its own market in a
+    process pool (see split_regions); otherwise the whole cohort is one market.
+    Returns a dict with assignment, cutoffs, placed, unplaced and proposals.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    quotas = np.asarray(quotas, dtype=np.int64)
+
+    if school_regions is None:
+        assignment, proposals = deferred_acceptance(scores, preferences, quotas)
+    else:
+        markets = split_regions(preferences, school_regions)
+        tasks = [(scores[students], local_preferences, quotas[schools])
+                 for students, local_preferences, schools in markets.values()]
+        assignment = np.full(len(scores), NO_SCHOOL, dtype=np.int32)
+        proposals = 0
+        workers = min(processes or os.cpu_count() or 1, max(1, len(tasks)))
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(_simulate_region, tasks))
+        else:
+            results = [_simulate_region(task) for task in tasks]
+        for (students, _, schools), (local_assignment, region_proposals) in zip(markets.values(), results):
+            placed = local_assignment != NO_SCHOOL
+            assignment[students[placed]] = schools[local_assignment[placed]]
+            proposals += region_proposals
+
+    cutoffs, placed = school_cutoffs(scores, assignment, len(quotas))
+    return {
+        'assignment': assignment,
+        'cutoffs': cutoffs,
+        'placed': placed,
+        'unplaced': int(np.count_nonzero(assignment == NO_SCHOOL)),
+        'proposals': proposals
+    }
+
+
+def serial_dictatorship(scores, preferences, quotas):
+    """Reference placement: best-ranked student first takes their best open school
+
+    With one common priority order this equals the deferred-acceptance outcome;
+    used to verify the engine.
+    """
+    remaining = [int(quota) for quota in quotas]
+    assignment = np.full(len(scores), NO_SCHOOL, dtype=np.int32)
+    for student in np.argsort(priority_ranks(scores)).tolist():
+        for school in preferences[student].tolist():
+            if school == NO_SCHOOL:
+                break
+            if remaining[school] > 0:
+                remaining[school] -= 1
+                assignment[student] = school
+                break
+    return assignment
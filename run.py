@@ -10,12 +10,12 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 try:
-    from app import app, db
+    from app import app, init_db, create_app
     
-    # Create database tables
-    with app.app_context():
-        db.create_all()
+    # Create database tables, apply migrations and seed schools
+    if init_db():
         print("✅ Database tables created successfully!")
+    create_app()
     
     print("🚀 Starting LGS Puan Hesaplama Sistemi...")
     print("📱 Open your browser and go to: http://localhost:5000")
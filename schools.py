@@ -0,0 +1,113 @@
+"""
+LGS Puan Hesaplama Sistemi - In-memory school catalog index
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import combinations
+
+# Fields schools can be filtered on, as (query parameter, model attribute)
+FILTER_FIELDS = (('city', 'city'), ('district', 'district'), ('type', 'school_type'))
+# Every non-empty combination of filter attributes gets its own offsets
+FILTER_COMBINATIONS = [
+    combination
+    for size in range(1, len(FILTER_FIELDS) + 1)
+    for combination in combinations([attribute for _, attribute in FILTER_FIELDS], size)
+]
+
+# Band limits of /school-recommendations: points around the score and result counts
+TARGET_BELOW, TARGET_ABOVE, TARGET_LIMIT = 50, 20, 10
+SAFE_MARGIN, SAFE_LIMIT = 10, 5
+REACH_ABOVE, REACH_LIMIT = 50, 5
+
+
+class SchoolIndex:
+    """Immutable school catalog sorted by min_score, stored as parallel column arrays
+
+    Built once from the School table and replaced as a whole when the catalog
+    changes, so readers never see a half-built index. Score bands are answered
+    with binary search; filters use precomputed positions per combination of
+    field values, so a filtered lookup costs the same as an unfiltered one.
+    """
+
+    def __init__(self, schools):
+        schools = sorted(schools, key=lambda school: (school.min_score, school.id))
+        strings = {}
+
+        def intern(value):
+            # Cities, districts and types repeat thousands of times; keep one copy each
+            return strings.setdefault(value, value)
+
+        self.ids = array('q', (school.id for school in schools))
+        self.min_scores = array('d', (school.min_score for school in schools))
+        self.quotas = array('q', (school.quota for school in schools))
+        self.names = [school.name for school in schools]
+        self.columns = {
+            attribute: [intern(getattr(school, attribute)) for school in schools]
+            for _, attribute in FILTER_FIELDS
+        }
+
+        # attributes -> values -> positions in min_score order, and their scores
+        self.offsets = {}
+        self.offset_scores = {}
+        for attributes in FILTER_COMBINATIONS:
+            groups = {}
+            for position, values in enumerate(zip(*(self.columns[attribute] for attribute in attributes))):
+                groups.setdefault(values, []).append(position)
+            self.offsets[attributes] = {values: array('q', positions) for values, positions in groups.items()}
+            self.offset_scores[attributes] = {
+                values: array('d', [self.min_scores[position] for position in positions])
+                for values, positions in groups.items()
+            }
+
+    def __len__(self):
+        return len(self.ids)
+
+    def school(self, position):
+        return {
+            'name': self.names[position],
+            'city': self.columns['city'][position],
+            'district': self.columns['district'][position],
+            'type': self.columns['school_type'][position],
+            'min_score': self.min_scores[position],
+            'quota': self.quotas[position]
+        }
+
+    def _candidates(self, filters):
+        """(positions, min_scores) of the schools matching every filter, in min_score order
+
+        positions is None when nothing is filtered (every school, identity mapping).
+        """
+        selected = [(attribute, filters[parameter]) for parameter, attribute in FILTER_FIELDS if filters.get(parameter)]
+        if not selected:
+            return None, self.min_scores
+        attributes, values = (tuple(column) for column in zip(*selected))
+        if values not in self.offsets[attributes]:
+            return array('q'), array('d')
+        return self.offsets[attributes][values], self.offset_scores[attributes][values]
+
+    def recommend(self, score, filters=None):
+        """Target, safe and reach bands for a score, matching the SQL ordering and limits
+
+        target: min_score within [score - 50, score + 20], highest first
+        safe:   min_score <= score - 10, highest first
+        reach:  min_score within (score, score + 50], lowest first
+        """
+        positions, scores = self._candidates(filters or {})
+
+        target_end = bisect_right(scores, score + TARGET_ABOVE)
+        target_start = max(bisect_left(scores, score - TARGET_BELOW), target_end - TARGET_LIMIT)
+        safe_end = bisect_right(scores, score - SAFE_MARGIN)
+        reach_start = bisect_right(scores, score)
+        reach_end = min(bisect_right(scores, score + REACH_ABOVE), reach_start + REACH_LIMIT)
+
+        def schools(indices):
+            if positions is None:
+                return [self.school(index) for index in indices]
+            return [self.school(positions[index]) for index in indices]
+
+        return {
+            'target_schools': schools(range(target_end - 1, target_start - 1, -1)),
+            'safe_schools': schools(range(safe_end - 1, max(0, safe_end - SAFE_LIMIT) - 1, -1)),
+            'reach_schools': schools(range(reach_start, reach_end))
+        }
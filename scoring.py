@@ -0,0 +1,244 @@
+"""
+LGS Puan Hesaplama Sistemi - Scoring engine
+"""
+
+import math
+
+import numpy as np
+
+# Subject order is significant: batch arrays use (dogru, yanlis) column pairs in this order
+SUBJECTS = ['turkce', 'matematik', 'fen', 'inkilap', 'din', 'ingilizce']
+MAX_QUESTIONS = {'turkce': 20, 'matematik': 20, 'fen': 20, 'inkilap': 10, 'din': 10, 'ingilizce': 10}
+COEFFICIENTS = {
+    'turkce': 4.35,
+    'matematik': 4.26,
+    'fen': 4.13,
+    'inkilap': 1.67,
+    'din': 1.90,
+    'ingilizce': 1.51
+}
+BASE_SCORE = 194.65
+MIN_TOTAL, MAX_TOTAL = 100, 500
+
+# Column names of the (N x 12) batch layout
+BATCH_COLUMNS = [f'{subject}_{kind}' for subject in SUBJECTS for kind in ('dogru', 'yanlis')]
+
+
+def approximate_percentile(total_score):
+    """Logistic approximation of the percentile, used until real cohort data exists"""
+    # Calculate percentile (simplified normal distribution)
+    mean, std_dev = 300, 50
+    z_score = (total_score - mean) / std_dev
+    percentile = max(0.01, min(99.99, 100 * (1 / (1 + pow(2.718, -1.702 * z_score)))))
+    return round(percentile, 2)
+
+
+def calculate_score_formula(data):
+    """Calculate LGS score based on correct and wrong answers (reference formula)"""
+    # Calculate nets (3 wrong answers cancel 1 correct answer)
+    nets = {}
+    for subject in COEFFICIENTS.keys():
+        dogru = data.get(f'{subject}_dogru', 0)
+        yanlis = data.get(f'{subject}_yanlis', 0)
+        nets[subject] = max(0, dogru - (yanlis / 3))
+
+    # Calculate weighted score
+    weighted_score = sum(nets[subject] * COEFFICIENTS[subject] for subject in COEFFICIENTS.keys())
+
+    # Add constant and ensure score is within bounds
+    total_score = max(100, min(500, BASE_SCORE + weighted_score))
+
+    return {
+        'total_score': round(total_score, 2),
+        'percentile': approximate_percentile(total_score),
+        'nets': {k: round(v, 2) for k, v in nets.items()}
+    }
+
+
+def _build_subject_tables():
+    """Precompute (weighted contribution, rounded net) for every valid dogru/yanlis pair"""
+    tables = {}
+    for subject in SUBJECTS:
+        max_q = MAX_QUESTIONS[subject]
+        stride = max_q + 1
+        contributions = [None] * (stride * stride)
+        nets = [None] * (stride * stride)
+        for dogru in range(stride):
+            for yanlis in range(stride - dogru):
+                net = max(0, dogru - (yanlis / 3))
+                contributions[dogru * stride + yanlis] = net * COEFFICIENTS[subject]
+                nets[dogru * stride + yanlis] = round(net, 2)
+        tables[subject] = (max_q, stride, contributions, nets)
+    return tables
+
+
+def _percentile_step(value):
+    """Smallest total at which approximate_percentile reaches value"""
+    # Invert the logistic curve at the rounding midpoint, then settle on the exact float
+    midpoint = value - 0.005
+    total = 300 - 50 * math.log(100 / midpoint - 1) / (1.702 * math.log(2.718))
+    if approximate_percentile(total) >= value:
+        while approximate_percentile(math.nextafter(total, -math.inf)) >= value:
+            total = math.nextafter(total, -math.inf)
+    else:
+        while approximate_percentile(total) < value:
+            total = math.nextafter(total, math.inf)
+    return total
+
+
+def _build_percentile_table():
+    """approximate_percentile for every 0.01-point total between 100 and 500
+
+    Each entry is (low, step, high): totals rounding to the bin get low below
+    step and high from step on. step is None when the value is constant over
+    the bin; the entry itself is None if the value changes twice in the bin.
+    """
+    first = round(approximate_percentile(MIN_TOTAL) * 100)
+    last = round(approximate_percentile(MAX_TOTAL) * 100)
+    steps = [_percentile_step(k / 100) for k in range(first + 1, last + 1)]
+
+    table = []
+    position = 0
+    for hundredths in range(MIN_TOTAL * 100, MAX_TOTAL * 100 + 1):
+        # Slightly wider than the rounding interval so no total is missed
+        low_edge = (hundredths - 0.51) / 100
+        high_edge = (hundredths + 0.51) / 100
+        while position < len(steps) and steps[position] <= low_edge:
+            position += 1
+        inside = position
+        while inside < len(steps) and steps[inside] <= high_edge:
+            inside += 1
+        low = (first + position) / 100
+        if inside == position:
+            table.append((low, None, low))
+        elif inside == position + 1:
+            table.append((low, steps[position], (first + inside) / 100))
+        else:
+            table.append(None)
+    return table
+
+
+SUBJECT_TABLES = _build_subject_tables()
+# Built on first use: it takes ~50ms, which every worker would otherwise pay at import
+_PERCENTILE_TABLE = None
+
+
+def percentile_table():
+    """Percentile entries for every 0.01-point total (see _build_percentile_table)"""
+    global _PERCENTILE_TABLE
+    if _PERCENTILE_TABLE is None:
+        _PERCENTILE_TABLE = _build_percentile_table()
+    return _PERCENTILE_TABLE
+
+
+def table_percentile(total_score, rounded_total=None):
+    """approximate_percentile via the percentile table for a total between 100 and 500"""
+    if rounded_total is None:
+        rounded_total = round(total_score, 2)
+    entry = percentile_table()[int(rounded_total * 100 + 0.5) - MIN_TOTAL * 100]
+    if entry is None:
+        return approximate_percentile(total_score)
+    low, step, high = entry
+    return low if step is None or total_score < step else high
+
+
+def calculate_score(data):
+    """Calculate LGS score based on correct and wrong answers
+
+    Backed by SUBJECT_TABLES and the percentile table; inputs outside the valid
+    answer space fall back to calculate_score_formula.
+    """
+    weighted_score = 0
+    nets = {}
+    for subject in SUBJECTS:
+        max_q, stride, contributions, subject_nets = SUBJECT_TABLES[subject]
+        dogru = data.get(f'{subject}_dogru', 0)
+        yanlis = data.get(f'{subject}_yanlis', 0)
+        if type(dogru) is not int or type(yanlis) is not int or dogru < 0 or yanlis < 0 or dogru + yanlis > max_q:
+            return calculate_score_formula(data)
+        index = dogru * stride + yanlis
+        weighted_score += contributions[index]
+        nets[subject] = subject_nets[index]
+
+    total_score = max(100, min(500, BASE_SCORE + weighted_score))
+    rounded_total = round(total_score, 2)
+
+    return {
+        'total_score': rounded_total,
+        'percentile': table_percentile(total_score, rounded_total),
+        'nets': nets
+    }
+
+
+def rows_to_array(rows):
+    """Convert score dicts (as posted to /calculate) or 12-value lists into an (N x 12) int array"""
+    return np.array([
+        [row.get(column, 0) for column in BATCH_COLUMNS] if isinstance(row, dict) else list(row)
+        for row in rows
+    ], dtype=np.int64).reshape(-1, len(BATCH_COLUMNS))
+
+
+def validate_batch(counts):
+    """Return a boolean mask of rows that respect the max_questions limits"""
+    counts = np.asarray(counts)
+    valid = np.ones(counts.shape[0], dtype=bool)
+    for i, subject in enumerate(SUBJECTS):
+        max_q = MAX_QUESTIONS[subject]
+        dogru = counts[:, 2 * i]
+        yanlis = counts[:, 2 * i + 1]
+        valid &= (dogru >= 0) & (yanlis >= 0) & (dogru + yanlis <= max_q)
+    return valid
+
+
+def _round2(values):
+    """Round to 2 decimals with the same semantics as Python's round()"""
+    # np.round scales by 100 and rounds the scaled value, which can disagree with
+    # round() near .xx5 ties; only those few rows are re-rounded in Python
+    rounded = np.round(values, 2)
+    scaled = values * 100
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    for i in np.flatnonzero(near_tie):
+        rounded[i] = round(float(values[i]), 2)
+    return rounded
+
+
+def calculate_scores_batch(counts):
+    """Vectorized calculate_score over an (N x 12) array of dogru/yanlis counts
+
+    Columns follow BATCH_COLUMNS. Returns a dict of arrays: total_score (N,),
+    percentile (N,) and nets (N x 6, in SUBJECTS order), matching calculate_score exactly.
+    """
+    counts = np.asarray(counts, dtype=np.float64).reshape(-1, len(BATCH_COLUMNS))
+
+    nets = np.empty((counts.shape[0], len(SUBJECTS)), dtype=np.float64)
+    for i in range(len(SUBJECTS)):
+        nets[:, i] = np.maximum(0, counts[:, 2 * i] - counts[:, 2 * i + 1] / 3)
+
+    # Accumulate left to right so float addition order matches the scalar sum()
+    weighted_score = np.zeros(counts.shape[0], dtype=np.float64)
+    for i, subject in enumerate(SUBJECTS):
+        weighted_score += nets[:, i] * COEFFICIENTS[subject]
+
+    total_score = np.maximum(100, np.minimum(500, BASE_SCORE + weighted_score))
+
+    mean, std_dev = 300, 50
+    z_score = (total_score - mean) / std_dev
+    percentile = np.maximum(0.01, np.minimum(99.99, 100 * (1 / (1 + np.power(2.718, -1.702 * z_score)))))
+
+    return {
+        'total_score': _round2(total_score),
+        'percentile': _round2(percentile),
+        'nets': _round2(nets.ravel()).reshape(nets.shape)
+    }
+
+
+def batch_results_to_dicts(result):
+    """Expand calculate_scores_batch output into calculate_score-style dicts"""
+    total_scores = result['total_score'].tolist()
+    percentiles = result['percentile'].tolist()
+    nets = result['nets'].tolist()
+    return [{
+        'total_score': total_scores[i],
+        'percentile': percentiles[i],
+        'nets': dict(zip(SUBJECTS, nets[i]))
+    } for i in range(len(total_scores))]
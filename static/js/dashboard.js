@@ -2,6 +2,8 @@
 
 let scoreChart = null;
 let subjectChart = null;
+// Shared /dashboard/data request; stats, panels and charts reuse it until the next save
+let dashboardRequest = null;
 
 // Calculator form handler
 document.getElementById('calculatorForm').addEventListener('submit', async function(e) {
@@ -36,7 +38,8 @@ document.getElementById('calculatorForm').addEventListener('submit', async funct
         if (result.success) {
             displayResults(result.result);
             window.LGSUtils.showAlert('Puan başarıyla hesaplandı!', 'success');
-            updateStats();
+            dashboardRequest = null;
+            loadDashboardData();
             
             // Show confetti for good scores
             if (result.result.total_score > 400) {
@@ -130,17 +133,81 @@ async function getAIRecommendation(type) {
         </div>
     `;
     
+    if (window.EventSource) {
+        streamAIRecommendation(type);
+    } else {
+        await requestAIRecommendationJob(type);
+    }
+}
+
+// Render the recommendation token by token as it streams in
+function streamAIRecommendation(type) {
+    const recommendationsDiv = document.getElementById('aiRecommendations');
+    const source = new EventSource(`/ai-recommendations/stream?type=${type}`);
+    let text = '';
+    let contentDiv = null;
+    
+    source.onmessage = event => {
+        if (!contentDiv) {
+            displayAIRecommendation('', type);
+            contentDiv = recommendationsDiv.querySelector('.recommendation-content');
+        }
+        text += JSON.parse(event.data).delta;
+        contentDiv.innerHTML = text.replace(/\n/g, '<br>');
+    };
+    
+    source.addEventListener('done', event => {
+        source.close();
+        if (contentDiv && JSON.parse(event.data).complete === false) {
+            contentDiv.insertAdjacentHTML('beforeend', '<br><em class="text-muted">Yanıt yarıda kesildi, lütfen tekrar deneyin.</em>');
+        }
+    });
+    
+    source.addEventListener('failed', event => {
+        source.close();
+        recommendationsDiv.innerHTML = `
+            <div class="alert alert-warning">
+                <i class="fas fa-exclamation-triangle me-2"></i>
+                ${JSON.parse(event.data).message}
+            </div>
+        `;
+    });
+    
+    source.onerror = () => {
+        source.close();
+        // Nothing arrived: retry through the background job path
+        if (!contentDiv) {
+            requestAIRecommendationJob(type);
+        }
+    };
+}
+
+async function requestAIRecommendationJob(type) {
+    const recommendationsDiv = document.getElementById('aiRecommendations');
+    
     try {
-        const response = await fetch(`/ai-recommendations?type=${type}`);
+        const response = await fetch('/ai-recommendations/jobs', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ type: type })
+        });
         const result = await response.json();
         
-        if (result.success) {
-            displayAIRecommendation(result.recommendation, type);
+        if (!result.success) {
+            throw new Error(result.message);
+        }
+        
+        const job = await waitForRecommendationJob(result.job);
+        
+        if (job.status === 'done') {
+            displayAIRecommendation(job.recommendation, type);
         } else {
             recommendationsDiv.innerHTML = `
                 <div class="alert alert-warning">
                     <i class="fas fa-exclamation-triangle me-2"></i>
-                    ${result.message}
+                    ${job.recommendation}
                 </div>
             `;
         }
@@ -155,6 +222,48 @@ async function getAIRecommendation(type) {
     }
 }
 
+// Resolve with the finished job, via Server-Sent Events when available or polling otherwise
+function waitForRecommendationJob(job) {
+    if (job.status === 'done' || job.status === 'failed') {
+        return Promise.resolve(job);
+    }
+    
+    return new Promise((resolve, reject) => {
+        const poll = async () => {
+            try {
+                const response = await fetch(`/ai-recommendations/jobs/${job.id}`);
+                const result = await response.json();
+                if (result.job.status === 'done' || result.job.status === 'failed') {
+                    resolve(result.job);
+                } else {
+                    setTimeout(poll, 1000);
+                }
+            } catch (error) {
+                reject(error);
+            }
+        };
+        
+        if (!window.EventSource) {
+            poll();
+            return;
+        }
+        
+        const source = new EventSource(`/ai-recommendations/jobs/${job.id}/events`);
+        source.addEventListener('done', event => {
+            source.close();
+            resolve(JSON.parse(event.data));
+        });
+        source.addEventListener('timeout', () => {
+            source.close();
+            poll();
+        });
+        source.onerror = () => {
+            source.close();
+            poll();
+        };
+    });
+}
+
 function displayAIRecommendation(recommendation, type) {
     const recommendationsDiv = document.getElementById('aiRecommendations');
     
@@ -182,11 +291,106 @@ function displayAIRecommendation(recommendation, type) {
     `;
 }
 
-// Analytics
+// Dashboard data: summary, charts, plan, mock exams and achievements in one response
+function fetchDashboardData() {
+    if (!dashboardRequest) {
+        dashboardRequest = fetch('/dashboard/data').then(response => response.json());
+        dashboardRequest.catch(() => { dashboardRequest = null; });
+    }
+    return dashboardRequest;
+}
+
+async function loadDashboardData() {
+    try {
+        const data = await fetchDashboardData();
+        if (!data.success) {
+            return;
+        }
+        
+        updateStats(data);
+        renderMockExamHistory(data.exams);
+        renderActivePlan(data.plan);
+        renderAchievements(data.achievements);
+        
+        if (document.getElementById('analytics-tab').classList.contains('active')) {
+            createScoreChart(data.score_history);
+            createSubjectChart(data.subject_performance);
+        }
+    } catch (error) {
+        console.error('Dashboard data loading error:', error);
+    }
+}
+
+function escapeHtml(text) {
+    const div = document.createElement('div');
+    div.textContent = text;
+    return div.innerHTML;
+}
+
+function renderMockExamHistory(exams) {
+    const historyDiv = document.getElementById('mockExamHistory');
+    if (!historyDiv || exams.length === 0) return;
+    
+    historyDiv.innerHTML = `
+        <ul class="list-group list-group-flush">
+            ${exams.map(exam => `
+                <li class="list-group-item d-flex justify-content-between align-items-center">
+                    <div>
+                        <strong>${escapeHtml(exam.name)}</strong>
+                        <small class="text-muted d-block">${exam.date} · ${exam.time_spent} dk</small>
+                    </div>
+                    <span>
+                        <span class="badge bg-success">${exam.correct_answers} D</span>
+                        <span class="badge bg-danger">${exam.wrong_answers} Y</span>
+                        <span class="badge bg-secondary">${exam.empty_answers} B</span>
+                    </span>
+                </li>
+            `).join('')}
+        </ul>
+    `;
+}
+
+function renderActivePlan(plan) {
+    const planDiv = document.getElementById('activePlan');
+    if (!planDiv || !plan) return;
+    
+    planDiv.innerHTML = `
+        <h5>${escapeHtml(plan.name)}</h5>
+        <p class="mb-1"><i class="fas fa-bullseye me-2"></i>Hedef Puan: <strong>${plan.target_score}</strong></p>
+        <p class="mb-1"><i class="fas fa-calendar me-2"></i>Hedef Tarih: <strong>${plan.target_date}</strong></p>
+        <p class="mb-0"><i class="fas fa-clock me-2"></i>Günlük Çalışma: <strong>${plan.daily_study_hours} saat</strong></p>
+    `;
+}
+
+// Badges carry either a Font Awesome class list or an emoji
+function badgeIcon(icon) {
+    return icon.startsWith('fa') ? `<i class="${escapeHtml(icon)} text-warning"></i>` : escapeHtml(icon);
+}
+
+function renderAchievements(achievements) {
+    const listDiv = document.getElementById('achievementsList');
+    if (!listDiv || achievements.length === 0) return;
+    
+    listDiv.innerHTML = achievements.map(achievement => `
+        <div class="col-md-4 mb-3">
+            <div class="card h-100 text-center">
+                <div class="card-body">
+                    <div class="fs-1 mb-2">${badgeIcon(achievement.badge_icon)}</div>
+                    <h5>${escapeHtml(achievement.title)}</h5>
+                    <p class="text-muted mb-1">${escapeHtml(achievement.description)}</p>
+                    <small class="text-muted">${achievement.earned_at}</small>
+                </div>
+            </div>
+        </div>
+    `).join('');
+}
+
 async function loadAnalytics() {
     try {
-        const response = await fetch('/analytics');
-        const data = await response.json();
+        const data = await fetchDashboardData();
+        if (!data.success) {
+            return;
+        }
         
         createScoreChart(data.score_history);
         createSubjectChart(data.subject_performance);
@@ -309,21 +513,13 @@ function createSubjectChart(subjectPerformance) {
     });
 }
 
-// Update stats after calculation
-async function updateStats() {
+// Update stats from the dashboard data
+function updateStats(data) {
     try {
-        const response = await fetch('/analytics');
-        const data = await response.json();
-        
-        if (data.score_history && data.score_history.length > 0) {
-            const scores = data.score_history.map(item => item.score);
-            const totalAttempts = scores.length;
-            const bestScore = Math.max(...scores);
-            const averageScore = scores.reduce((a, b) => a + b, 0) / scores.length;
-            
-            document.getElementById('totalAttempts').textContent = totalAttempts;
-            document.getElementById('bestScore').textContent = bestScore.toFixed(2);
-            document.getElementById('averageScore').textContent = averageScore.toFixed(2);
+        if (data.summary) {
+            document.getElementById('totalAttempts').textContent = data.summary.total_attempts;
+            document.getElementById('bestScore').textContent = data.summary.best_score.toFixed(2);
+            document.getElementById('averageScore').textContent = data.summary.average_score.toFixed(2);
         }
     } catch (error) {
         console.error('Stats update error:', error);
@@ -340,10 +536,8 @@ document.addEventListener('shown.bs.tab', function (event) {
 
 // Initialize dashboard
 document.addEventListener('DOMContentLoaded', function() {
-    // Load analytics if analytics tab is active
-    if (document.getElementById('analytics-tab').classList.contains('active')) {
-        loadAnalytics();
-    }
+    // One request fills the stats, panels and (if its tab is active) the charts
+    loadDashboardData();
     
     // Add keyboard shortcuts
     document.addEventListener('keydown', function(e) {
@@ -0,0 +1,180 @@
+"""
+LGS Puan Hesaplama Sistemi - Incremental per-user study statistics
+"""
+
+from datetime import date, datetime, timedelta
+
+# Daily buckets kept per user (ending at the latest study day); older days only count towards the totals
+DEFAULT_DAYS = 30
+
+
+def study_day(created_at, utc_offset=0):
+    """Local calendar day of a UTC timestamp, utc_offset hours ahead of UTC"""
+    return (created_at + timedelta(hours=utc_offset)).date()
+
+
+def next_streak(streak, last_day, day):
+    """Streak length after studying on day, given the streak ending at last_day (None before any study)"""
+    if last_day is None:
+        return 1
+    gap = (day - last_day).days
+    if gap == 0:
+        return streak
+    return streak + 1 if gap == 1 else 1
+
+
+def new_stats():
+    """Statistics of a user with no study sessions"""
+    return {
+        'sessions': 0,
+        'total_minutes': 0,
+        'active_days': 0,
+        'subjects': {},
+        # 'YYYY-MM-DD' -> {subject: minutes}, for the last days up to last_day
+        'days': {},
+        'last_day': None,
+        'streak': 0,
+        'longest_streak': 0,
+        'last_created_at': None
+    }
+
+
+def _fold_session(stats, study_session, days, utc_offset):
+    """Fold study_session into stats in place"""
+    day = study_day(study_session.created_at, utc_offset)
+    last_day = date.fromisoformat(stats['last_day']) if stats['last_day'] else None
+    subject = study_session.subject or ''
+    minutes = int(study_session.duration_minutes or 0)
+
+    key = day.isoformat()
+    if day != last_day:
+        stats['active_days'] += 1
+        stats['streak'] = next_streak(stats['streak'], last_day, day)
+        stats['longest_streak'] = max(stats['longest_streak'], stats['streak'])
+        stats['last_day'] = key
+        oldest = (day - timedelta(days=days - 1)).isoformat()
+        stats['days'] = {other: values for other, values in stats['days'].items() if other >= oldest}
+        stats['days'][key] = {}
+    bucket = stats['days'][key]
+    bucket[subject] = bucket.get(subject, 0) + minutes
+    stats['subjects'][subject] = stats['subjects'].get(subject, 0) + minutes
+    stats['sessions'] += 1
+    stats['total_minutes'] += minutes
+    stats['last_created_at'] = study_session.created_at.isoformat()
+
+
+def apply_session(stats, study_session, days=DEFAULT_DAYS, utc_offset=0):
+    """Return new statistics with study_session folded in; it must not be older than the newest one
+
+    study_session is any object with the StudySession columns as attributes
+    (model instance or result row). A fresh dict is returned so JSON columns
+    see the change.
+    """
+    stats = dict(stats, subjects=dict(stats['subjects']),
+                 days={key: dict(values) for key, values in stats['days'].items()})
+    _fold_session(stats, study_session, days, utc_offset)
+    return stats
+
+
+def is_in_order(stats, created_at):
+    """Whether a session created at created_at can be appended without a rebuild"""
+    last = stats['last_created_at']
+    return last is None or created_at >= datetime.fromisoformat(last)
+
+
+def build_stats(study_sessions, days=DEFAULT_DAYS, utc_offset=0):
+    """Fold study sessions ordered by created_at into fresh statistics"""
+    stats = new_stats()
+    for study_session in study_sessions:
+        _fold_session(stats, study_session, days, utc_offset)
+    return stats
+
+
+def current_streak(last_day, streak, today):
+    """A streak is still current on the day after its last study day, and broken after that"""
+    return streak if last_day is not None and (today - last_day).days <= 1 else 0
+
+
+def daily_series(buckets, today, days):
+    """The last days days up to today, oldest first, with zero-minute days filled in"""
+    series = []
+    for offset in range(days - 1, -1, -1):
+        key = (today - timedelta(days=offset)).isoformat()
+        subjects = buckets.get(key, {})
+        series.append({'date': key, 'minutes': sum(subjects.values()), 'subjects': dict(subjects)})
+    return series
+
+
+def subject_totals(subjects, total_minutes):
+    return [
+        {'subject': subject, 'minutes': minutes,
+         'share': round(minutes / total_minutes, 4) if total_minutes else 0.0}
+        for subject, minutes in sorted(subjects.items(), key=lambda item: (-item[1], item[0]))
+    ]
+
+
+def stats_payload(stats, today, days=DEFAULT_DAYS):
+    """/study-stats response body as of the local day today"""
+    last_day = date.fromisoformat(stats['last_day']) if stats['last_day'] else None
+    return {
+        'success': True,
+        'total_sessions': stats['sessions'],
+        'total_minutes': stats['total_minutes'],
+        'active_days': stats['active_days'],
+        'current_streak': current_streak(last_day, stats['streak'], today),
+        'longest_streak': stats['longest_streak'],
+        'last_study_date': stats['last_day'],
+        'studied_today': last_day == today,
+        'subjects': subject_totals(stats['subjects'], stats['total_minutes']),
+        'daily': daily_series(stats['days'], today, days)
+    }
+
+
+def full_scan_payload(study_sessions, today, days=DEFAULT_DAYS, utc_offset=0):
+    """Reference /study-stats body computed from the whole session history (any order)
+
+    Used to check stored statistics: streaks come from the sorted set of
+    study days instead of being carried session by session.
+    """
+    minutes_by_day = {}
+    subjects = {}
+    total_minutes = 0
+    for study_session in study_sessions:
+        minutes = int(study_session.duration_minutes or 0)
+        subject = study_session.subject or ''
+        bucket = minutes_by_day.setdefault(study_day(study_session.created_at, utc_offset), {})
+        bucket[subject] = bucket.get(subject, 0) + minutes
+        subjects[subject] = subjects.get(subject, 0) + minutes
+        total_minutes += minutes
+
+    study_days = sorted(minutes_by_day)
+    longest = run = 0
+    for position, day in enumerate(study_days):
+        run = run + 1 if position and (day - study_days[position - 1]).days == 1 else 1
+        longest = max(longest, run)
+    last_day = study_days[-1] if study_days else None
+
+    return {
+        'success': True,
+        'total_sessions': len(study_sessions),
+        'total_minutes': total_minutes,
+        'active_days': len(study_days),
+        'current_streak': current_streak(last_day, run, today),
+        'longest_streak': longest,
+        'last_study_date': last_day.isoformat() if last_day else None,
+        'studied_today': last_day == today,
+        'subjects': subject_totals(subjects, total_minutes),
+        'daily': daily_series({day.isoformat(): values for day, values in minutes_by_day.items()}, today, days)
+    }
+
+
+def compare_payloads(expected, actual):
+    """List of human-readable differences between two /study-stats bodies"""
+    differences = [
+        f"{key}: {expected[key]} != {actual.get(key)}"
+        for key in expected if key != 'daily' and expected[key] != actual.get(key)
+    ]
+    for left, right in zip(expected['daily'], actual['daily']):
+        if left != right:
+            differences.append(f"daily[{left['date']}]: {left} != {right}")
+    return differences
@@ -0,0 +1,34 @@
+"""
+Shared fixtures: the app on a scratch SQLite database, and logged-in test clients
+
+The app reads its configuration from the environment when it is imported, so
+the database and the admin list are set here, before any test imports it.
+"""
+
+import os
+import tempfile
+
+import pytest
+
+TEST_DIR = tempfile.mkdtemp(prefix='lgs-tests-')
+os.environ['DATABASE_URL'] = f'sqlite:///{TEST_DIR}/lgs_database.db'
+os.environ['ADMIN_USERNAMES'] = 'cache-check'
+os.environ['WRITE_BEHIND'] = 'off'
+
+
+@pytest.fixture(scope='session')
+def app():
+    from app import app, init_db
+    assert init_db()
+    return app
+
+
+@pytest.fixture
+def login(app):
+    """login(username) registers the user if needed and returns a test client logged in as them"""
+    def login(username):
+        client = app.test_client()
+        client.post('/register', json={'username': username, 'password': 'check'})
+        assert client.post('/login', json={'username': username, 'password': 'check'}).get_json()['success']
+        return client
+    return login
@@ -0,0 +1,54 @@
+"""
+The improvement badge compares a score with the one before it in (created_at, id) order
+"""
+
+from datetime import datetime
+
+import pytest
+
+
+@pytest.fixture
+def new_user(app):
+    from app import db, User
+
+    def new_user(username):
+        with app.app_context():
+            user = User(username=username, password_hash='x')
+            db.session.add(user)
+            db.session.commit()
+            return user.id
+    return new_user
+
+
+def save_score(app, user_id, total_score, created_at):
+    from app import Score, commit_new_rows
+    with app.app_context():
+        commit_new_rows([Score(user_id=user_id, total_score=total_score, percentile=50, created_at=created_at)])
+
+
+def badge_types(app, user_id):
+    from app import Achievement
+    with app.app_context():
+        return {achievement.achievement_type for achievement in Achievement.query.filter_by(user_id=user_id)}
+
+
+def test_back_dated_score_is_compared_with_its_predecessor(app, new_user):
+    user_id = new_user('badge-back-dated')
+    save_score(app, user_id, 300, datetime(2024, 1, 10))
+    save_score(app, user_id, 250, datetime(2024, 1, 20))
+    assert 'improvement' not in badge_types(app, user_id)
+
+    # Earlier than every stored score, so there is nothing to improve on
+    save_score(app, user_id, 350, datetime(2024, 1, 5))
+    assert 'improvement' not in badge_types(app, user_id)
+
+    # Between the two: better than the score of January 10th
+    save_score(app, user_id, 320, datetime(2024, 1, 15))
+    assert 'improvement' in badge_types(app, user_id)
+
+
+def test_in_order_score_is_compared_with_the_latest(app, new_user):
+    user_id = new_user('badge-in-order')
+    save_score(app, user_id, 300, datetime(2024, 1, 10))
+    save_score(app, user_id, 310, datetime(2024, 1, 20))
+    assert 'improvement' in badge_types(app, user_id)
@@ -0,0 +1,129 @@
+"""
+The pooled OpenRouter client against a local keep-alive stub server
+
+Sequential requests reuse pooled connections, a model's circuit breaker opens
+after consecutive failures and is skipped while open, and a single half-open
+probe closes it again once the model recovers.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from ai_client import ModelStats, OpenRouterClient
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers each model with the HTTP status in server.status, counting hits per model"""
+    protocol_version = 'HTTP/1.1'
+    # Small keep-alive responses otherwise stall on delayed ACKs
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        model = json.loads(self.rfile.read(int(self.headers['Content-Length'])))['model']
+        self.server.hits[model] = self.server.hits.get(model, 0) + 1
+        status = self.server.status[model]
+        payload = json.dumps({'choices': [{'message': {'content': f"ok from {model}"}}]} if status == 200 else {}).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.status = {'healthy': 200, 'flaky': 503}
+    server.hits = {}
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client(stub):
+    return OpenRouterClient(f'http://127.0.0.1:{stub.server_port}', {}, failure_threshold=3, cooldown=0.2)
+
+
+def complete_ignoring_failure(client, model):
+    try:
+        client.complete(model, 'test', timeout=5)
+    except RuntimeError:
+        pass
+
+
+def test_connection_reuse(client):
+    before = client.connection_stats()
+    for _ in range(50):
+        assert client.complete('healthy', 'test', timeout=5) == 'ok from healthy'
+    after = client.connection_stats()
+    assert after['requests'] - before['requests'] == 50
+    assert after['connections_opened'] - before['connections_opened'] <= 1
+
+
+def test_open_breaker_skips_the_model(client, stub):
+    models = ['flaky', 'healthy']
+    for _ in range(client.failure_threshold):
+        assert client.hedged_completion(models, 'test', hedge_delay=1.0, deadline=5.0) == 'ok from healthy'
+    assert client.breakers['flaky'].state == 'open'
+
+    hits = stub.hits['flaky']
+    assert client.hedged_completion(models, 'test', hedge_delay=1.0, deadline=5.0) == 'ok from healthy'
+    assert stub.hits['flaky'] == hits, 'open breaker must skip the model'
+    assert client.stats['flaky'].skipped >= 1
+
+
+def test_half_open_probe_closes_the_breaker(client, stub):
+    models = ['flaky', 'healthy']
+    for _ in range(client.failure_threshold):
+        complete_ignoring_failure(client, 'flaky')
+    assert client.breakers['flaky'].state == 'open'
+
+    # Recovery: after the cool-down exactly one probe goes through and closes the breaker
+    stub.status['flaky'] = 200
+    time.sleep(client.cooldown + 0.05)
+    assert client.available_models(models) == models
+    assert client.breakers['flaky'].state == 'open', 'listing models must not take the probe'
+    # A race won before the probe is sent leaves it for the next request
+    assert client.hedged_completion(['healthy', 'flaky'], 'test', hedge_delay=1.0, deadline=5.0) == 'ok from healthy'
+    assert client.breakers['flaky'].state == 'open' and client.breakers['flaky'].ready(), 'unsent probe must stay available'
+    assert client.breakers['flaky'].allow()
+    assert client.breakers['flaky'].state == 'half_open'
+    assert client.available_models(['flaky']) == [], 'half-open breaker allows a single probe'
+    assert client.complete('flaky', 'test', timeout=5) == 'ok from flaky'
+    assert client.breakers['flaky'].state == 'closed'
+
+
+def test_failed_probe_reopens_the_breaker(client):
+    for _ in range(client.failure_threshold):
+        complete_ignoring_failure(client, 'flaky')
+    time.sleep(client.cooldown + 0.05)
+    assert client.available_models(['flaky']) == ['flaky']
+    complete_ignoring_failure(client, 'flaky')
+    assert client.breakers['flaky'].state == 'open'
+
+
+def test_stats_count_concurrent_updates():
+    stats = ModelStats()
+
+    def record():
+        for _ in range(10000):
+            stats.record_success(0.1)
+            stats.record_failure()
+            stats.record_skip()
+
+    threads = [threading.Thread(target=record) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    snapshot = stats.snapshot()
+    assert (snapshot['requests'], snapshot['successes'], snapshot['failures'], snapshot['skipped']) == (160000, 80000, 80000, 80000)
@@ -0,0 +1,73 @@
+"""
+Deterministic checks for the placement engine
+
+A hand-worked fixture with quota and tie cases, then seeded random markets
+compared against serial dictatorship (identical outcome under one common
+score priority), national vs regional runs, and repeatability.
+"""
+
+import math
+
+import numpy as np
+import pytest
+
+from placement import NO_SCHOOL, simulate_placement, serial_dictatorship
+
+A, B, C = 0, 1, 2
+FIXTURE_QUOTAS = [1, 2, 1]
+# (score, preferences); students 1 and 2 tie, so the lower index has priority
+FIXTURE_STUDENTS = [
+    (480, [A, B]),
+    (470, [A, C]),
+    (470, [A, B]),
+    (450, [C, B]),
+    (440, [C, A]),
+    (300, [B, NO_SCHOOL]),
+    (200, [C, NO_SCHOOL]),
+]
+FIXTURE_ASSIGNMENT = [A, C, B, B, NO_SCHOOL, NO_SCHOOL, NO_SCHOOL]
+FIXTURE_CUTOFFS = [480, 450, 470]
+
+
+def random_market(seed, students=3000, schools=60, width=8, regions=None):
+    rng = np.random.default_rng(seed)
+    scores = np.round(rng.uniform(100, 500, students), 0)  # coarse scores force many ties
+    quotas = rng.integers(0, 60, schools)
+    school_regions = rng.integers(0, regions, schools) if regions else None
+    preferences = np.full((students, width), NO_SCHOOL, dtype=np.int32)
+    for student in range(students):
+        pool = np.arange(schools) if regions is None else np.flatnonzero(school_regions == rng.integers(0, regions))
+        length = rng.integers(1, min(width, len(pool)) + 1) if len(pool) else 0
+        preferences[student, :length] = rng.choice(pool, length, replace=False)
+    return scores, preferences, quotas, school_regions
+
+
+def test_fixture():
+    scores = [score for score, _ in FIXTURE_STUDENTS]
+    preferences = np.array([choices for _, choices in FIXTURE_STUDENTS], dtype=np.int32)
+    result = simulate_placement(scores, preferences, FIXTURE_QUOTAS)
+    assert result['assignment'].tolist() == FIXTURE_ASSIGNMENT
+    assert result['cutoffs'].tolist() == FIXTURE_CUTOFFS
+    assert result['placed'].tolist() == [1, 2, 1]
+    assert result['unplaced'] == 3
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_random_market_matches_serial_dictatorship(seed):
+    scores, preferences, quotas, _ = random_market(seed)
+    result = simulate_placement(scores, preferences, quotas)
+    assert (result['assignment'] == serial_dictatorship(scores, preferences, quotas)).all()
+    assert (result['placed'] <= quotas).all()
+    again = simulate_placement(scores, preferences, quotas)
+    assert (again['assignment'] == result['assignment']).all()
+    for school, cutoff in enumerate(result['cutoffs'].tolist()):
+        placed_scores = scores[result['assignment'] == school]
+        assert (math.isnan(cutoff) and not len(placed_scores)) or cutoff == placed_scores.min(), school
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_regional_run_matches_national(seed):
+    scores, preferences, quotas, school_regions = random_market(100 + seed, regions=6)
+    national = simulate_placement(scores, preferences, quotas)
+    regional = simulate_placement(scores, preferences, quotas, school_regions=school_regions, processes=2)
+    assert (national['assignment'] == regional['assignment']).all()
@@ -0,0 +1,81 @@
+"""
+Query plan audit: run every per-user route and EXPLAIN QUERY PLAN each statement it issues
+
+Statements are captured from the engine while the routes run through the test
+client, then explained with their real parameters. No statement may read a
+table with a full scan (SQLite "SCAN <table>" without an index).
+"""
+
+import sqlalchemy as sa
+
+# Route calls in order: (method, path, json body)
+ROUTE_CALLS = [
+    ('POST', '/calculate', {'turkce_dogru': 15, 'matematik_dogru': 12, 'fen_dogru': 14}),
+    ('GET', '/dashboard', None),
+    ('GET', '/analytics', None),
+    ('GET', '/percentile?score=400', None),
+    ('POST', '/study-session', {'subject': 'matematik', 'duration': 45}),
+    ('GET', '/study-stats', None),
+    ('GET', '/school-recommendations', None),
+    ('POST', '/mock-exam', {'exam_name': 'Deneme', 'correct_answers': 70, 'wrong_answers': 10, 'empty_answers': 10}),
+    ('GET', '/mock-exam', None),
+    ('POST', '/study-plan', {'plan_name': 'Plan', 'target_date': '2026-06-01'}),
+    ('GET', '/study-plan', None),
+    ('GET', '/achievements', None),
+    ('GET', '/leaderboard?city=Ankara', None),
+    ('GET', '/dashboard/data', None),
+    ('GET', '/ai-recommendations?type=study_plan', None),
+    ('POST', '/ai-recommendations/jobs', {'type': 'motivation'}),
+]
+
+
+def full_scans(plan_rows):
+    """Plan details that read a whole table without an index"""
+    return [detail for _, _, _, detail in plan_rows
+            if detail.startswith('SCAN ') and 'INDEX' not in detail and 'CONSTANT ROW' not in detail]
+
+
+def test_routes_use_indexes(app, login, monkeypatch):
+    import app as app_module
+    from app import db
+
+    # Recommendations must not leave the machine; the fallback path runs the same queries
+    monkeypatch.setattr(app_module, 'request_ai_recommendation', lambda prompt: None)
+    client = login('plan-audit')
+
+    captured = []
+    current_route = [None]
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if current_route[0] and not executemany and statement.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE')):
+            captured.append((current_route[0], statement, parameters))
+
+    with app.app_context():
+        engine = db.engine
+        # One-time loads (the percentile, school and leaderboard indexes read whole tables) are not per-request queries
+        app_module.get_percentile_index()
+        app_module.get_school_index()
+        app_module.get_leaderboard()
+    sa.event.listen(engine, 'before_cursor_execute', capture)
+    try:
+        for method, path, body in ROUTE_CALLS:
+            current_route[0] = f'{method} {path}'
+            response = client.open(path, method=method, json=body)
+            if path == '/ai-recommendations/jobs':
+                job_path = f"/ai-recommendations/jobs/{response.get_json()['job']['id']}"
+                current_route[0] = f'GET {job_path}'
+                client.get(job_path)
+        current_route[0] = None
+        # The job's own queries run on the runner's threads
+        app_module.recommendation_jobs.shutdown(wait=True)
+    finally:
+        sa.event.remove(engine, 'before_cursor_execute', capture)
+
+    assert captured
+    failures = []
+    with engine.connect() as connection:
+        for route, statement, parameters in captured:
+            plan = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).fetchall()
+            if full_scans(plan):
+                failures.append((route, ' '.join(statement.split()), [row[3] for row in plan]))
+    assert not failures, failures
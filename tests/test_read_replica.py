@@ -0,0 +1,93 @@
+"""
+Routing checks for the read replica, with a second SQLite file standing in for the replica
+
+The replica is a snapshot of the primary; rows written afterwards only exist
+on the primary, so each response shows which database served it. Read-only
+routes read the replica, writes go to the primary, and a user's reads stay
+on the primary for REPLICA_STICKY_SECONDS after their own write.
+"""
+
+import sqlite3
+import time
+
+import pytest
+import sqlalchemy as sa
+
+STICKY_SECONDS = 1
+
+
+@pytest.fixture
+def replica(app, monkeypatch, tmp_path):
+    """Route read_replica requests to a file whose contents snapshot() copies from the primary"""
+    from app import db
+    path = str(tmp_path / 'replica.db')
+    with app.app_context():
+        primary = db.engine.url.database
+        engine = sa.create_engine(f'sqlite:///{path}')
+        monkeypatch.setitem(db.engines, 'replica', engine)
+    monkeypatch.setitem(app.config['SQLALCHEMY_BINDS'], 'replica', {'url': f'sqlite:///{path}'})
+    monkeypatch.setitem(app.config, 'REPLICA_STICKY_SECONDS', STICKY_SECONDS)
+
+    def snapshot():
+        source, target = sqlite3.connect(primary), sqlite3.connect(path)
+        source.backup(target)
+        source.close()
+        target.close()
+
+    snapshot.path = path
+    yield snapshot
+    engine.dispose()
+
+
+def wait_out_sticky_window():
+    time.sleep(STICKY_SECONDS + 0.1)
+
+
+def test_replica_routing(app, login, replica):
+    from app import db, Achievement, MockExam, User
+
+    client = login('replica-check')
+    client.post('/mock-exam', json={'exam_name': 'Replika öncesi'})
+    wait_out_sticky_window()
+    replica()
+
+    with app.app_context():
+        user_id = User.query.filter_by(username='replica-check').first().id
+        db.session.add(Achievement(user_id=user_id, achievement_type='check', title='Sadece primary',
+                                   description='Replikada yok', badge_icon='x'))
+        db.session.commit()
+
+    # Read-only route, no recent write: served by the replica snapshot
+    titles = [achievement['title'] for achievement in client.get('/achievements').get_json()['achievements']]
+    assert 'Sadece primary' not in titles
+
+    # The write lands on the primary only
+    assert client.post('/mock-exam', json={'exam_name': 'Replika sonrası'}).get_json()['success']
+    with app.app_context():
+        assert MockExam.query.filter_by(user_id=user_id).count() == 2
+    assert sqlite3.connect(replica.path).execute('SELECT COUNT(*) FROM mock_exam WHERE user_id = ?', (user_id,)).fetchone()[0] == 1
+
+    # Right after the write the user's reads stay on the primary...
+    assert len(client.get('/mock-exam').get_json()['exams']) == 2
+    titles = [achievement['title'] for achievement in client.get('/achievements').get_json()['achievements']]
+    assert 'Sadece primary' in titles
+    # ...and move back to the replica once the sticky window has passed
+    wait_out_sticky_window()
+    assert len(client.get('/mock-exam').get_json()['exams']) == 1
+
+
+def test_missing_aggregates_are_built_from_the_primary(login, replica):
+    client = login('replica-build')
+    replica()
+
+    # A study-stats row missing on the replica is built from the primary's sessions, not the replica's
+    assert client.post('/study-session', json={'subject': 'matematik', 'duration': 40}).get_json()['success']
+    wait_out_sticky_window()
+    stats = client.get('/study-stats').get_json()
+    assert stats['success'] and stats['total_minutes'] == 40
+
+    # Same for the analytics aggregate of a score saved after the snapshot
+    assert client.post('/calculate', json={'turkce_dogru': 15, 'matematik_dogru': 12}).get_json()['success']
+    wait_out_sticky_window()
+    assert len(client.get('/dashboard/data').get_json()['score_history']) == 1
+    assert len(client.get('/analytics').get_json()['score_history']) == 1
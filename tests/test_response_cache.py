@@ -0,0 +1,121 @@
+"""
+Invalidation checks for the per-user response cache
+
+Every cached route must answer a repeated request with 304, and every kind of
+write behind it (score, study session, mock exam, study plan, achievement, score import,
+analytics rebuild, a write from another worker) must change the ETag and the
+body. Another user's writes must not.
+"""
+
+import io
+
+import pytest
+
+CACHED_PATHS = ['/analytics', '/study-stats', '/achievements', '/mock-exam', '/study-plan', '/dashboard/data']
+
+
+def snapshot(client):
+    """{path: (etag, body)} for every cached route, checking that a revalidation is a 304"""
+    state = {}
+    for path in CACHED_PATHS:
+        response = client.get(path)
+        assert response.status_code == 200 and response.get_json()['success'], path
+        etag = response.headers['ETag']
+        revalidated = client.get(path, headers={'If-None-Match': etag})
+        assert revalidated.status_code == 304 and not revalidated.data, path
+        state[path] = (etag, response.get_json())
+    return state
+
+
+def primed(client):
+    """Snapshot of a user whose aggregates exist; the first /analytics and /study-stats reads build them, which is itself a write"""
+    first = client.get('/analytics')
+    assert 'ETag' not in first.headers
+    client.get('/study-stats')
+    return snapshot(client)
+
+
+def assert_changed(before, after, paths):
+    for path in CACHED_PATHS:
+        assert before[path][0] != after[path][0], f'{path} kept its ETag'
+    for path in paths:
+        assert before[path][1] != after[path][1], f'{path} served the old body'
+
+
+def user_id_of(username):
+    from app import User
+    return User.query.filter_by(username=username).first().id
+
+
+def test_repeated_reads_revalidate(login):
+    client = login('cache-reads')
+    state = primed(client)
+    assert client.get('/analytics').headers['ETag'] == state['/analytics'][0]
+    assert snapshot(client) == state
+
+
+WRITES = {
+    'score calculation': (['/analytics', '/dashboard/data'],
+                          lambda client: client.post('/calculate', json={'turkce_dogru': 15, 'matematik_dogru': 12})),
+    'study session': (['/study-stats'],
+                      lambda client: client.post('/study-session', json={'subject': 'fen', 'duration': 50})),
+    'mock exam': (['/mock-exam', '/dashboard/data'],
+                  lambda client: client.post('/mock-exam', json={'exam_name': 'Deneme', 'correct_answers': 70,
+                                                                 'wrong_answers': 10, 'empty_answers': 10})),
+    'study plan': (['/study-plan', '/dashboard/data'],
+                   lambda client: client.post('/study-plan', json={'plan_name': 'Plan', 'target_score': 450,
+                                                                   'target_date': '2025-06-15'})),
+    'score import': (['/analytics', '/dashboard/data'],
+                     lambda client: client.post('/import/scores', data={
+                         'file': (io.BytesIO(b'fen_dogru,created_at\n18,2024-01-01T10:00:00\n'), 'results.csv')})),
+}
+
+
+@pytest.mark.parametrize('action', WRITES)
+def test_write_invalidates(login, action):
+    paths, write = WRITES[action]
+    client = login(f"cache-{action.replace(' ', '-')}")
+    before = primed(client)
+    assert write(client).get_json()['success']
+    assert_changed(before, snapshot(client), paths)
+
+
+def test_write_outside_the_request_invalidates(app, login):
+    """A write made by another worker process only reaches this one through the database"""
+    from app import db, Achievement
+    client = login('cache-outside')
+    before = primed(client)
+    with app.app_context():
+        db.session.add(Achievement(user_id=user_id_of('cache-outside'), achievement_type='check', title='Kontrol',
+                                   description='Başka bir worker yazdı', badge_icon='x'))
+        db.session.commit()
+    assert_changed(before, snapshot(client), ['/achievements', '/dashboard/data'])
+
+
+def test_analytics_rebuild_invalidates(app, login):
+    from app import rebuild_all_analytics
+    client = login('cache-rebuild')
+    primed(client)
+    client.post('/calculate', json={'fen_dogru': 12})
+    before = snapshot(client)
+    with app.app_context():
+        rebuild_all_analytics()
+    assert_changed(before, snapshot(client), [])
+
+
+def test_other_users_writes_keep_the_cache(login):
+    client = login('cache-mine')
+    other = login('cache-other')
+    state = primed(client)
+    other.post('/calculate', json={'fen_dogru': 20})
+    other.post('/mock-exam', json={'exam_name': 'Diğer'})
+    assert snapshot(client) == state
+
+
+def test_cache_stats(login):
+    client = login('cache-check')
+    primed(client)
+    snapshot(client)
+    stats = client.get('/cache-stats').get_json()['response_cache']
+    assert stats['not_modified'] and stats['hits']
+    assert login('cache-not-admin').get('/cache-stats').status_code == 403
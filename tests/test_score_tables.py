@@ -0,0 +1,94 @@
+"""
+Property checks: table-backed calculate_score against the reference formula
+
+Every per-subject table entry is compared with its formula value, and the
+percentile table at every bin edge and at both sides of every step. End to
+end, each subject's whole (dogru, yanlis) space is swept with every other
+subject at each of its corners (empty, all correct, all wrong), then random
+rows are compared.
+"""
+
+import math
+from itertools import product
+
+import numpy as np
+
+from scoring import (SUBJECTS, MAX_QUESTIONS, COEFFICIENTS, BATCH_COLUMNS, MIN_TOTAL, MAX_TOTAL,
+                     SUBJECT_TABLES, percentile_table, approximate_percentile, table_percentile,
+                     calculate_score, calculate_score_formula)
+
+RANDOM_ROWS = 200000
+REPORTED_MISMATCHES = 10
+
+
+def random_rows(n, seed=42):
+    """n valid random result rows, like benchmarks/bench_batch_scoring.py generates"""
+    rng = np.random.default_rng(seed)
+    columns = []
+    for subject in SUBJECTS:
+        max_q = MAX_QUESTIONS[subject]
+        dogru = rng.integers(0, max_q + 1, n)
+        yanlis = (rng.random(n) * (max_q - dogru + 1)).astype(np.int64)
+        columns.extend([dogru, yanlis])
+    return (dict(zip(BATCH_COLUMNS, row)) for row in np.stack(columns, axis=1).tolist())
+
+
+def corners(subject):
+    max_q = MAX_QUESTIONS[subject]
+    return [(0, 0), (max_q, 0), (0, max_q)]
+
+
+def iter_sweep_rows():
+    """Each subject's full answer space crossed with the corners of all the others"""
+    for subject in SUBJECTS:
+        others = [other for other in SUBJECTS if other != subject]
+        max_q = MAX_QUESTIONS[subject]
+        for other_values in product(*(corners(other) for other in others)):
+            row = {}
+            for other, (dogru, yanlis) in zip(others, other_values):
+                row[f'{other}_dogru'], row[f'{other}_yanlis'] = dogru, yanlis
+            for dogru in range(max_q + 1):
+                for yanlis in range(max_q + 1 - dogru):
+                    yield {**row, f'{subject}_dogru': dogru, f'{subject}_yanlis': yanlis}
+
+
+def score_mismatches(rows):
+    return [row for row in rows if calculate_score(row) != calculate_score_formula(row)]
+
+
+def test_subject_tables():
+    mismatches = []
+    for subject in SUBJECTS:
+        max_q, stride, contributions, nets = SUBJECT_TABLES[subject]
+        for dogru in range(max_q + 1):
+            for yanlis in range(max_q + 1 - dogru):
+                net = max(0, dogru - (yanlis / 3))
+                index = dogru * stride + yanlis
+                if contributions[index] != net * COEFFICIENTS[subject] or nets[index] != round(net, 2):
+                    mismatches.append((subject, dogru, yanlis))
+    assert not mismatches, mismatches[:REPORTED_MISMATCHES]
+
+
+def test_percentile_table():
+    mismatches = []
+    for hundredths in range(MIN_TOTAL * 100, MAX_TOTAL * 100 + 1):
+        center = hundredths / 100
+        totals = [center, math.nextafter((hundredths - 0.5) / 100, math.inf), math.nextafter((hundredths + 0.5) / 100, -math.inf)]
+        entry = percentile_table()[hundredths - MIN_TOTAL * 100]
+        if entry and entry[1] is not None:
+            step = entry[1]
+            totals += [step, math.nextafter(step, -math.inf), math.nextafter(step, math.inf)]
+        for total in totals:
+            if MIN_TOTAL <= total <= MAX_TOTAL and table_percentile(total) != approximate_percentile(total):
+                mismatches.append(total)
+    assert not mismatches, mismatches[:REPORTED_MISMATCHES]
+
+
+def test_swept_rows():
+    mismatches = score_mismatches(iter_sweep_rows())
+    assert not mismatches, mismatches[:REPORTED_MISMATCHES]
+
+
+def test_random_rows():
+    mismatches = score_mismatches(random_rows(RANDOM_ROWS))
+    assert not mismatches, mismatches[:REPORTED_MISMATCHES]
@@ -0,0 +1,176 @@
+"""
+LGS Puan Hesaplama Sistemi - Write-behind buffer with group commit
+"""
+
+import queue
+import threading
+import time
+
+_STOP = object()
+
+
+class BufferUnavailable(Exception):
+    """The item was not queued, or was withdrawn before the writer took it; the caller writes it itself"""
+
+
+class PendingWrite:
+    """One submitted item; callers in durable mode wait on it until its batch committed"""
+
+    def __init__(self, item):
+        self.item = item
+        self.error = None
+        self.done = threading.Event()
+        self.state = 'queued'
+        self.lock = threading.Lock()
+
+    def claim(self):
+        """Called by the writer before flushing the item; False when the caller withdrew it"""
+        with self.lock:
+            if self.state == 'cancelled':
+                return False
+            self.state = 'claimed'
+            return True
+
+    def cancel(self):
+        """Withdraw the item unless the writer already took it"""
+        with self.lock:
+            if self.state == 'claimed':
+                return False
+            self.state = 'cancelled'
+            return True
+
+    def wait(self, timeout=None):
+        """Block until the item is committed (raises its error)
+
+        When that takes longer than timeout seconds, an item the writer has
+        not taken yet is withdrawn (BufferUnavailable); one it is still
+        writing raises TimeoutError, since it may yet be committed.
+        """
+        if not self.done.wait(timeout):
+            if self.cancel():
+                raise BufferUnavailable('write-behind flush timed out before the write started')
+            raise TimeoutError('write-behind flush timed out')
+        if self.error is not None:
+            raise self.error
+
+
+class WriteBehindBuffer:
+    """Bounded queue of pending writes, flushed by one background thread in group commits
+
+    The writer takes everything queued (up to max_batch), waits at most window
+    seconds for more, and hands the batch to handler inside the app context, so
+    one transaction and one fsync cover many requests. If a batch fails, its
+    items are retried one by one so a bad row only fails its own request.
+    """
+
+    def __init__(self, app, handler, max_batch=500, window=0.005, maxsize=10000, name='write-behind'):
+        self.app = app
+        self.handler = handler
+        self.max_batch = max_batch
+        self.window = window
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.closed = False
+        self.lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+        self.failures = 0
+        self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self.thread.start()
+
+    def submit(self, item, wait=False, timeout=None, flush_timeout=None):
+        """Queue an item; with wait=True block until it is committed (raises its error)
+
+        Raises BufferUnavailable when the buffer is closed, its writer thread is
+        not running, it stays full for timeout seconds or, with wait=True, the
+        item was not taken within flush_timeout seconds, so callers can fall
+        back to writing synchronously (see PendingWrite.wait).
+        """
+        if self.closed:
+            raise BufferUnavailable('write-behind buffer is closed')
+        if not self.thread.is_alive():
+            raise BufferUnavailable('write-behind writer is not running')
+        pending = PendingWrite(item)
+        try:
+            self.queue.put(pending, timeout=timeout)
+        except queue.Full:
+            raise BufferUnavailable('write-behind queue is full') from None
+        if wait:
+            pending.wait(flush_timeout)
+        return pending
+
+    def _collect(self, first):
+        batch = [first]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            first = self.queue.get()
+            if first is _STOP:
+                break
+            batch, stopping = self._collect(first)
+            batch = [pending for pending in batch if pending.claim()]
+            if batch:
+                self._flush(batch)
+
+    def _flush(self, batch):
+        try:
+            with self.app.app_context():
+                self.handler([pending.item for pending in batch])
+            errors = [None] * len(batch)
+            with self.lock:
+                self.batches += 1
+        except Exception as e:
+            print(f"Write-behind batch error: {e}")
+            errors = []
+            for pending in batch:
+                try:
+                    with self.app.app_context():
+                        self.handler([pending.item])
+                    errors.append(None)
+                    with self.lock:
+                        self.batches += 1
+                except Exception as item_error:
+                    errors.append(item_error)
+
+        with self.lock:
+            self.items += sum(1 for error in errors if error is None)
+            self.failures += sum(1 for error in errors if error is not None)
+        for pending, error in zip(batch, errors):
+            if error is not None:
+                print(f"Write-behind item error: {error}")
+            pending.error = error
+            pending.done.set()
+
+    def close(self, timeout=None):
+        """Stop accepting writes and flush everything already queued"""
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.put(_STOP)
+        self.thread.join(timeout)
+
+    def stats(self):
+        with self.lock:
+            return {
+                'queued': self.queue.qsize(),
+                'commits': self.batches,
+                'written': self.items,
+                'failed': self.failures,
+                'average_batch': round(self.items / self.batches, 2) if self.batches else 0.0
+            }